@@ -0,0 +1,29 @@
+"""Add Douglas-Peucker simplification tolerance to trackpoints
+
+Revision ID: 3c9e1f4a7b20
+Revises: 7603faeefe91
+Create Date: 2026-10-16 12:24:05.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f4a7b20'
+down_revision: Union[str, None] = '7603faeefe91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing trackpoints stay NULL here - filled by a9c4e2f7d158
+    op.add_column('trackpoints', sa.Column('simplify_tolerance_m', sa.Float(), nullable=True, comment='largest Douglas-Peucker tolerance (m) keeping this point'))
+    op.create_index('ix_sporter_trackpoints_activity_simplify', 'trackpoints', ['activity_id', 'simplify_tolerance_m'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sporter_trackpoints_activity_simplify', table_name='trackpoints')
+    op.drop_column('trackpoints', 'simplify_tolerance_m')
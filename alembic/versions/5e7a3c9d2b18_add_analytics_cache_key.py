@@ -0,0 +1,32 @@
+"""Add parameters hash cache key to analytics_cache
+
+Revision ID: 5e7a3c9d2b18
+Revises: 9d2b6e8c1f47
+Create Date: 2026-10-16 15:12:36.447209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7a3c9d2b18'
+down_revision: Union[str, None] = '9d2b6e8c1f47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Cached results are disposable - start from an empty table rather than rehashing
+    op.execute("DELETE FROM analytics_cache")
+    op.add_column('analytics_cache', sa.Column('parameters_hash', sa.String(length=64), nullable=False, comment='SHA-256 of parameters'))
+    op.drop_index('ix_sporter_analytics_cache_lookup', table_name='analytics_cache')
+    op.create_index('ix_sporter_analytics_cache_key', 'analytics_cache', ['activity_id', 'metric_type', 'parameters_hash', 'cache_version'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sporter_analytics_cache_key', table_name='analytics_cache')
+    op.create_index('ix_sporter_analytics_cache_lookup', 'analytics_cache', ['activity_id', 'metric_type', 'parameters'], unique=False)
+    op.drop_column('analytics_cache', 'parameters_hash')
@@ -0,0 +1,27 @@
+"""Add HR histogram to activities
+
+Revision ID: 6b1d4f8a2c35
+Revises: 5e7a3c9d2b18
+Create Date: 2026-10-16 17:42:10.318264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b1d4f8a2c35'
+down_revision: Union[str, None] = '5e7a3c9d2b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NULL for existing activities - filled by the first exclusion range edit
+    op.add_column('activities', sa.Column('hr_histogram', sa.LargeBinary(), nullable=True, comment='valid HR readings per bpm (uint32 LE)'))
+
+
+def downgrade() -> None:
+    op.drop_column('activities', 'hr_histogram')
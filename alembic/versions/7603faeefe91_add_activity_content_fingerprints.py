@@ -0,0 +1,33 @@
+"""Add content hash and track signature to activities
+
+Revision ID: 7603faeefe91
+Revises: eab0975ec95d
+Create Date: 2026-10-16 11:02:17.640912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7603faeefe91'
+down_revision: Union[str, None] = 'eab0975ec95d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing activities keep NULL fingerprints (their files may no longer exist)
+    op.add_column('activities', sa.Column('content_sha256', sa.String(length=64), nullable=True, comment='SHA-256 of the raw GPX bytes'))
+    op.add_column('activities', sa.Column('track_signature', sa.String(length=64), nullable=True, comment='SHA-256 of start time + first/last coordinates'))
+    op.create_index('ix_sporter_activities_user_content_sha256', 'activities', ['user_id', 'content_sha256'], unique=False)
+    op.create_index('ix_sporter_activities_user_track_signature', 'activities', ['user_id', 'track_signature'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sporter_activities_user_track_signature', table_name='activities')
+    op.drop_index('ix_sporter_activities_user_content_sha256', table_name='activities')
+    op.drop_column('activities', 'track_signature')
+    op.drop_column('activities', 'content_sha256')
@@ -0,0 +1,44 @@
+"""Add elapsed seconds to trackpoints
+
+Revision ID: 8f3a2d6c9e14
+Revises: 6b1d4f8a2c35
+Create Date: 2026-10-16 18:26:03.571940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a2d6c9e14'
+down_revision: Union[str, None] = '6b1d4f8a2c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('trackpoints', sa.Column('elapsed_seconds', sa.Float(), nullable=True, comment='seconds since the first trackpoint of the activity'))
+    
+    # Backfill existing trackpoints relative to each activity's first point
+    op.execute("""
+        UPDATE trackpoints t
+        SET elapsed_seconds = s.elapsed_seconds
+        FROM (
+            SELECT id, EXTRACT(EPOCH FROM recorded_at - FIRST_VALUE(recorded_at)
+                OVER (PARTITION BY activity_id ORDER BY point_order)) AS elapsed_seconds
+            FROM trackpoints
+        ) s
+        WHERE t.id = s.id
+    """)
+    
+    # Time filters (windows, exclusion ranges) go through elapsed_seconds. Databases
+    # upgraded while 6b1d4f8a2c35 still built an (activity_id, recorded_at) index drop it here
+    op.execute("DROP INDEX IF EXISTS ix_sporter_trackpoints_activity_recorded_at")
+    op.create_index('ix_sporter_trackpoints_activity_elapsed', 'trackpoints', ['activity_id', 'elapsed_seconds'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sporter_trackpoints_activity_elapsed', table_name='trackpoints')
+    op.drop_column('trackpoints', 'elapsed_seconds')
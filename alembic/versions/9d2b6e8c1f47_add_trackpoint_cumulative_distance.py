@@ -0,0 +1,38 @@
+"""Add cumulative distance to trackpoints
+
+Revision ID: 9d2b6e8c1f47
+Revises: 3c9e1f4a7b20
+Create Date: 2026-10-16 14:05:51.902716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2b6e8c1f47'
+down_revision: Union[str, None] = '3c9e1f4a7b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('trackpoints', sa.Column('cumulative_distance_m', sa.DECIMAL(precision=10, scale=3), nullable=True, comment='distance from activity start'))
+    
+    # Backfill existing trackpoints with a running sum per activity
+    op.execute("""
+        UPDATE trackpoints t
+        SET cumulative_distance_m = s.cumulative_distance_m
+        FROM (
+            SELECT id, SUM(COALESCE(distance_from_previous_m, 0))
+                OVER (PARTITION BY activity_id ORDER BY point_order) AS cumulative_distance_m
+            FROM trackpoints
+        ) s
+        WHERE t.id = s.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('trackpoints', 'cumulative_distance_m')
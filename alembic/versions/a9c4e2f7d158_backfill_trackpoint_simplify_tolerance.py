@@ -0,0 +1,70 @@
+"""Backfill Douglas-Peucker tolerances of trackpoints imported before they were stored
+
+Revision ID: a9c4e2f7d158
+Revises: e6c2a9d4f873
+Create Date: 2026-10-17 11:02:37.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import numpy as np
+
+# Same computation as the import (env.py puts the project on sys.path)
+from app.services.track_analysis import ROUTE_SRID, ROUTE_TOLERANCE_M, douglas_peucker_tolerances
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c4e2f7d158'
+down_revision: Union[str, None] = 'e6c2a9d4f873'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    activity_ids = conn.execute(sa.text(
+        "SELECT DISTINCT activity_id FROM trackpoints WHERE simplify_tolerance_m IS NULL"
+    )).scalars().all()
+    
+    # One activity at a time - bounded memory on long histories
+    for activity_id in activity_ids:
+        rows = conn.execute(sa.text("""
+            SELECT id, ST_Y(coordinates) AS latitude, ST_X(coordinates) AS longitude
+            FROM trackpoints
+            WHERE activity_id = :activity_id
+            ORDER BY point_order
+        """), {"activity_id": activity_id}).all()
+        
+        tolerances = douglas_peucker_tolerances(
+            np.array([row.latitude for row in rows], dtype=np.float64),
+            np.array([row.longitude for row in rows], dtype=np.float64)
+        )
+        conn.execute(sa.text("""
+            UPDATE trackpoints
+            SET simplify_tolerance_m = v.tolerance
+            FROM unnest(CAST(:ids AS integer[]), CAST(:tolerances AS double precision[])) AS v(id, tolerance)
+            WHERE trackpoints.id = v.id
+        """), {"ids": [row.id for row in rows], "tolerances": tolerances.tolist()})
+    
+    # Routes of these activities were built with ST_Simplify by e6c2a9d4f873 - rebuild them from the tolerances
+    if activity_ids:
+        conn.execute(sa.text(f"""
+            UPDATE activities a
+            SET route = CASE WHEN ST_NPoints(s.line) >= 2 THEN ST_SetSRID(s.line, {ROUTE_SRID}) END
+            FROM (
+                SELECT activity_id,
+                       ST_MakeLine(coordinates ORDER BY point_order)
+                           FILTER (WHERE simplify_tolerance_m > {ROUTE_TOLERANCE_M}) AS line
+                FROM trackpoints
+                WHERE activity_id = ANY(CAST(:activity_ids AS integer[]))
+                GROUP BY activity_id
+            ) s
+            WHERE a.id = s.activity_id
+        """), {"activity_ids": list(activity_ids)})
+
+
+def downgrade() -> None:
+    # Data only - the tolerances stay valid
+    pass
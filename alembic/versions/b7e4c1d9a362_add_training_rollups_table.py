@@ -0,0 +1,71 @@
+"""Add training_rollups table
+
+Revision ID: b7e4c1d9a362
+Revises: 8f3a2d6c9e14
+Create Date: 2026-10-16 19:04:12.640218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c1d9a362'
+down_revision: Union[str, None] = '8f3a2d6c9e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'training_rollups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('period', sa.String(10), nullable=False, comment='week (Monday start) or month'),
+        sa.Column('period_start', sa.Date(), nullable=False, comment='first day of the period (UTC)'),
+        sa.Column('activity_type', sa.String(50), nullable=False),
+        sa.Column('activity_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('distance_km', sa.DECIMAL(12, 3), nullable=False, server_default='0'),
+        sa.Column('duration_seconds', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('elevation_gain_m', sa.DECIMAL(12, 2), nullable=False, server_default='0'),
+        sa.Column('hr_duration_seconds', sa.BigInteger(), nullable=False, server_default='0',
+                  comment='duration of activities with HR data'),
+        sa.Column('hr_load', sa.BigInteger(), nullable=False, server_default='0',
+                  comment='sum of duration_seconds * avg HR'),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+    op.create_index(op.f('ix_training_rollups_id'), 'training_rollups', ['id'], unique=False)
+    op.create_index('ix_training_rollups_key', 'training_rollups',
+                    ['user_id', 'period', 'period_start', 'activity_type'], unique=True)
+
+    # Backfill from existing activities (same query as training_rollups.rebuild)
+    op.execute("""
+        INSERT INTO training_rollups (
+            user_id, period, period_start, activity_type, activity_count, distance_km, duration_seconds,
+            elevation_gain_m, hr_duration_seconds, hr_load, updated_at
+        )
+        SELECT
+            a.user_id,
+            p.period,
+            CAST(date_trunc(p.period, a.start_time AT TIME ZONE 'UTC') AS date),
+            COALESCE(a.activity_type, 'other'),
+            count(*),
+            COALESCE(sum(a.distance_km), 0),
+            COALESCE(sum(a.duration_seconds), 0),
+            COALESCE(sum(a.elevation_gain_m), 0),
+            COALESCE(sum(a.duration_seconds) FILTER (WHERE a.avg_heart_rate IS NOT NULL), 0),
+            COALESCE(sum(CAST(a.duration_seconds AS bigint) * a.avg_heart_rate), 0),
+            now()
+        FROM activities a
+        CROSS JOIN (VALUES ('week'), ('month')) AS p(period)
+        WHERE a.user_id IS NOT NULL AND a.start_time IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_training_rollups_key', table_name='training_rollups')
+    op.drop_index(op.f('ix_training_rollups_id'), table_name='training_rollups')
+    op.drop_table('training_rollups')
@@ -0,0 +1,82 @@
+"""Backfill elevation gain/loss of activities imported before it was computed
+
+Revision ID: c4f8b1e6a293
+Revises: a9c4e2f7d158
+Create Date: 2026-10-17 11:26:09.274415
+
+"""
+from typing import Optional, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+import numpy as np
+
+# Same computation as the import (env.py puts the project on sys.path)
+from app.services.track_analysis import elevation_gain_loss, smooth_elevation
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f8b1e6a293'
+down_revision: Union[str, None] = 'a9c4e2f7d158'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def elevation_gain_loss_m(elevations) -> Tuple[Optional[float], Optional[float]]:
+    """(gain, loss) rounded to the column scale from trackpoint elevations in point order,
+    (None, None) without at least two elevation samples"""
+    elevation = np.array([np.nan if value is None else float(value) for value in elevations], dtype=np.float64)
+    gain, loss = elevation_gain_loss(smooth_elevation(elevation))
+    if gain is None:
+        return None, None
+    return round(gain, 2), round(loss, 2)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    activity_ids = conn.execute(sa.text(
+        "SELECT id FROM activities WHERE elevation_gain_m IS NULL ORDER BY id"
+    )).scalars().all()
+    
+    # Full smoothed profile of each activity, as at import
+    for activity_id in activity_ids:
+        gain, loss = elevation_gain_loss_m(conn.execute(sa.text(
+            "SELECT elevation FROM trackpoints WHERE activity_id = :activity_id ORDER BY point_order"
+        ), {"activity_id": activity_id}).scalars())
+        if gain is None:
+            # Fewer than two elevation samples (no <ele>, indoor): stays NULL, as at import
+            continue
+        
+        # updated_at moves, so cached activity responses get a new version
+        conn.execute(sa.text("""
+            UPDATE activities
+            SET elevation_gain_m = :gain, elevation_loss_m = :loss, updated_at = now()
+            WHERE id = :activity_id
+        """), {"gain": gain, "loss": loss, "activity_id": activity_id})
+    
+    # Rollups counted the missing gain as 0 - resum the column for the periods of these activities
+    if activity_ids:
+        conn.execute(sa.text("""
+            UPDATE training_rollups r
+            SET elevation_gain_m = s.elevation_gain_m, updated_at = now()
+            FROM (
+                SELECT
+                    a.user_id,
+                    p.period,
+                    CAST(date_trunc(p.period, a.start_time AT TIME ZONE 'UTC') AS date) AS period_start,
+                    COALESCE(a.activity_type, 'other') AS activity_type,
+                    COALESCE(sum(a.elevation_gain_m), 0) AS elevation_gain_m
+                FROM activities a
+                CROSS JOIN (VALUES ('week'), ('month')) AS p(period)
+                WHERE a.user_id IS NOT NULL AND a.start_time IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+            ) s
+            WHERE r.user_id = s.user_id AND r.period = s.period
+              AND r.period_start = s.period_start AND r.activity_type = s.activity_type
+              AND r.elevation_gain_m <> s.elevation_gain_m
+        """))
+
+
+def downgrade() -> None:
+    # Data only - the values stay valid
+    pass
@@ -0,0 +1,42 @@
+"""Add activity TRIMP and training_load_days table
+
+Revision ID: d3a8f5b2e610
+Revises: b7e4c1d9a362
+Create Date: 2026-10-16 20:11:37.905112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f5b2e610'
+down_revision: Union[str, None] = 'b7e4c1d9a362'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing activities get TRIMP from: python scripts/rebuild_rollups.py --recompute-trimp
+    op.add_column('activities', sa.Column('trimp', sa.Float(), nullable=True, comment='zone-based TRIMP from the user HR profile'))
+    
+    op.create_table(
+        'training_load_days',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False, comment='UTC start day of the activities'),
+        sa.Column('trimp', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('ctl', sa.Float(), nullable=False, server_default='0', comment='chronic training load, 42-day EWMA'),
+        sa.Column('atl', sa.Float(), nullable=False, server_default='0', comment='acute training load, 7-day EWMA'),
+    )
+    op.create_index(op.f('ix_training_load_days_id'), 'training_load_days', ['id'], unique=False)
+    op.create_index('ix_training_load_days_user_day', 'training_load_days', ['user_id', 'day'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_training_load_days_user_day', table_name='training_load_days')
+    op.drop_index(op.f('ix_training_load_days_id'), table_name='training_load_days')
+    op.drop_table('training_load_days')
+    op.drop_column('activities', 'trimp')
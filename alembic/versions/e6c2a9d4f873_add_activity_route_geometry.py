@@ -0,0 +1,66 @@
+"""Add simplified route and bbox geometry to activities
+
+Revision ID: e6c2a9d4f873
+Revises: d3a8f5b2e610
+Create Date: 2026-10-17 09:14:52.318677
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import geoalchemy2
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6c2a9d4f873'
+down_revision: Union[str, None] = 'd3a8f5b2e610'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match track_analysis.ROUTE_TOLERANCE_M (meters) and ~its size in degrees
+ROUTE_TOLERANCE_M = 10.0
+ROUTE_TOLERANCE_DEG = 0.0001
+
+
+def upgrade() -> None:
+    op.add_column('activities', sa.Column('route', geoalchemy2.types.Geometry(geometry_type='LINESTRING', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True, comment='Douglas-Peucker simplified route'))
+    op.add_column('activities', sa.Column('bbox', geoalchemy2.types.Geometry(geometry_type='POLYGON', srid=4326, spatial_index=False, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True, comment='bounding box of all trackpoints'))
+    
+    # Backfill from trackpoints: precomputed Douglas-Peucker levels where present,
+    # PostGIS simplification (in degrees) for activities imported before them
+    op.execute(f"""
+        UPDATE activities a
+        SET route = s.route, bbox = s.bbox
+        FROM (
+            SELECT
+                activity_id,
+                CASE WHEN bool_or(simplify_tolerance_m IS NULL)
+                     THEN ST_Simplify(ST_MakeLine(coordinates ORDER BY point_order), {ROUTE_TOLERANCE_DEG})
+                     ELSE ST_MakeLine(coordinates ORDER BY point_order)
+                          FILTER (WHERE simplify_tolerance_m > {ROUTE_TOLERANCE_M})
+                END AS line,
+                ST_SetSRID(ST_MakeEnvelope(
+                    min(ST_X(coordinates)), min(ST_Y(coordinates)),
+                    max(ST_X(coordinates)), max(ST_Y(coordinates))
+                ), 4326) AS bbox
+            FROM trackpoints
+            GROUP BY activity_id
+        ) t
+        CROSS JOIN LATERAL (
+            SELECT
+                CASE WHEN ST_NPoints(t.line) >= 2 THEN ST_SetSRID(t.line, 4326) END AS route,
+                t.bbox
+        ) s
+        WHERE a.id = t.activity_id
+    """)
+    
+    op.create_index('ix_sporter_activities_route_gist', 'activities', ['route'], unique=False, postgresql_using='gist')
+    op.create_index('ix_sporter_activities_bbox_gist', 'activities', ['bbox'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sporter_activities_bbox_gist', table_name='activities', postgresql_using='gist')
+    op.drop_index('ix_sporter_activities_route_gist', table_name='activities', postgresql_using='gist')
+    op.drop_column('activities', 'bbox')
+    op.drop_column('activities', 'route')
@@ -1,23 +1,205 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, text
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, desc, func, select, text, update
+from sqlalchemy.orm import aliased
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from pydantic import BaseModel, Field
 import tempfile
+import hashlib
+import base64
 import os
 import json
 
-from ..core.database import get_sync_session
+import numpy as np
+
+from ..core.config import settings
+from ..core.database import get_db
 from ..models.activity import Activity
 from ..models.trackpoint import Trackpoint
-from ..services.gpx_service import GPXService
+from ..services import analytics_cache, hr_zones, import_queue, response_cache, tile_cache, training_load, training_rollups
+from ..services.series_format import (
+    COLUMNS_MEDIA_TYPE, POLYLINE_PRECISION, accepts_columns, encode_polyline, pack_columns
+)
+from ..services.track_analysis import (
+    HR_HISTOGRAM_BINS, datetime_to_epoch_us, detect_hr_outliers,
+    downsample_indices, histogram_stats, mask_runs, pack_hr_histogram,
+    ROUTE_SRID, range_exclusion_index, unpack_hr_histogram
+)
 
 router = APIRouter(prefix="/api/v1/activities", tags=["activities"])
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Response headers stored with cached responses
+_CACHED_HEADERS = ("x-next-cursor",)
+
+# Raw track data never changes after import (a re-import is a new activity id);
+# everything else is revalidated with its ETag on each use
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+def _columns_response(columns: Dict[str, np.ndarray], meta: Dict) -> Response:
+    """Series in the columnar binary format (see services.series_format)"""
+    return Response(
+        content=pack_columns(columns, meta),
+        media_type=COLUMNS_MEDIA_TYPE,
+        headers={"Vary": "Accept"}
+    )
+
+def _nullable(values, dtype=np.float32) -> np.ndarray:
+    """Column from DB values with None -> NaN"""
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=dtype)
+
+def _encode_cursor(point_order: int) -> str:
+    """Opaque next-page token for keyset pagination on (activity_id, point_order)"""
+    return base64.urlsafe_b64encode(f"po:{point_order}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        prefix, point_order = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(":")
+        if prefix != "po":
+            raise ValueError(prefix)
+        return int(point_order)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _check_window(from_seconds: Optional[float], to_seconds: Optional[float]) -> None:
+    if from_seconds is not None and to_seconds is not None and from_seconds >= to_seconds:
+        raise HTTPException(status_code=400, detail="from_seconds must be less than to_seconds")
+
+def _hr_origin(activity_id: int):
+    """Scalar subquery: elapsed_seconds of the first HR trackpoint
+    
+    Time zero of the HR series and of exclusion ranges; trackpoint and
+    elevation windows use elapsed_seconds (time since the first point) as is.
+    """
+    first = aliased(Trackpoint)
+    return select(first.elapsed_seconds).where(
+        first.activity_id == activity_id,
+        first.heart_rate.isnot(None)
+    ).order_by(first.point_order).limit(1).scalar_subquery()
+
+async def _hr_offset(db: AsyncSession, activity_id: int) -> Optional[float]:
+    return (await db.execute(select(_hr_origin(activity_id)))).scalar()
+
+def _page(rows, limit: Optional[int]):
+    """Split a LIMIT + 1 result into (page rows, next cursor)"""
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        return rows, _encode_cursor(rows[-1].point_order)
+    return rows, None
+
+def _activity_version(activity: Activity) -> str:
+    """Data version of an activity for response cache keys and ETags"""
+    return str(datetime_to_epoch_us(activity.updated_at)) if activity.updated_at else "0"
+
+async def _heart_rate_version(db: AsyncSession, activity: Activity) -> str:
+    """Activity version plus exclusion-range state (HR series depend on both)"""
+    from ..models import ExclusionRange
+    
+    count, last_id = (await db.execute(
+        select(func.count(ExclusionRange.id), func.max(ExclusionRange.id))
+        .where(ExclusionRange.activity_id == activity.id)
+    )).one()
+    return f"{_activity_version(activity)}-{count}-{last_id or 0}"
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against the current validators"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+async def _cached_response(request: Request, response: Response, namespace: str, version: str,
+                           tags, build, last_modified: Optional[datetime] = None,
+                           immutable: bool = False) -> Response:
+    """Serve a GET with validators, answering 304 or from the response cache before build() runs
+    
+    build() returns a dict/list or a Response. The key covers path, query
+    string and the negotiated format, so JSON and columnar variants are cached
+    (and tagged) separately. X-Cache reports local / redis / miss.
+    """
+    key = response_cache.make_key(
+        namespace, version, request.url.path, sorted(request.query_params.multi_items()),
+        accepts_columns(request.headers.get("accept"))
+    )
+    validators = {
+        "ETag": f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"',
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        "Vary": "Accept"
+    }
+    if last_modified is not None:
+        validators["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    
+    if _not_modified(request, validators["ETag"], last_modified):
+        return Response(status_code=304, headers=validators)
+    
+    entry, tier = await response_cache.lookup(key) if settings.response_cache_enabled else (None, None)
+    
+    if entry is None:
+        result = await build()
+        if isinstance(result, Response):
+            headers = result.headers
+        else:
+            headers = response.headers
+            result = JSONResponse(jsonable_encoder(result))
+        entry = response_cache.CachedResponse(
+            body=result.body,
+            media_type=result.media_type,
+            headers={name: headers[name] for name in _CACHED_HEADERS if name in headers},
+            tags=frozenset(tags)
+        )
+        if settings.response_cache_enabled:
+            await response_cache.store(key, entry)
+        tier = "miss"
+    
+    return Response(
+        content=entry.body,
+        media_type=entry.media_type,
+        headers={**entry.headers, **validators, "X-Cache": tier}
+    )
+
+async def _mark_activity_changed(db: AsyncSession, activity: Activity, rollup_before: Optional[Dict] = None) -> None:
+    """Derived data of an activity changed: bump updated_at and drop cached analytics (caller commits)
+    
+    rollup_before (training_rollups.contribution() taken before an HR
+    re-analysis) also recomputes TRIMP and moves the activity's share of the
+    rollups and of the training load series.
+    """
+    activity.updated_at = datetime.now(timezone.utc)
+    await analytics_cache.invalidate(db, activity.id, commit=False)
+    if rollup_before is not None:
+        activity.trimp = await hr_zones.refresh_activity(db, activity)
+        rollup_after = training_rollups.contribution(activity)
+        await training_rollups.apply(db, rollup_before, rollup_after)
+        await training_load.apply(db, rollup_before, rollup_after)
+
+async def _evict_activity(activity: Activity) -> None:
+    """Drop cached responses of an activity and of the activity lists showing it (after commit)"""
+    await response_cache.invalidate(
+        response_cache.activity_tag(activity.id), *response_cache.activity_list_tags(activity.user_id)
+    )
+
 # Pydantic models
 class ExclusionRangeCreate(BaseModel):
     start_time_seconds: int = Field(..., ge=0, description="Start time in seconds from activity start")
-    end_time_seconds: int = Field(..., gt=0, description="End time in seconds from activity start") 
+    end_time_seconds: int = Field(..., gt=0, description="End time in seconds from activity start")
     reason: Optional[str] = Field(None, max_length=100, description="Optional reason for exclusion")
     
     class Config:
@@ -25,179 +207,370 @@ class ExclusionRangeCreate(BaseModel):
         extra = "ignore"
 
 @router.get("/")
-async def get_activities(user_id: Optional[int] = None):
+async def get_activities(request: Request, response: Response, user_id: Optional[int] = None,
+                         db: AsyncSession = Depends(get_db)):
     """Get list of activities, optionally filtered by user_id"""
-    with get_sync_session() as db:
-        query = db.query(Activity)
-        
-        if user_id:
-            query = query.filter(Activity.user_id == user_id)
-            
-        activities = query.order_by(desc(Activity.start_time)).all()
-        
-        return [{
-            "id": activity.id,
-            "name": activity.name,
-            "activity_type": activity.activity_type,
-            "start_time": activity.start_time.isoformat() if activity.start_time else None,
-            "distance_km": float(activity.distance_km) if activity.distance_km else 0,
-            "duration_seconds": activity.duration_seconds,
-            "avg_heart_rate": activity.avg_heart_rate,
-            "max_heart_rate": activity.max_heart_rate,
-            "total_trackpoints": activity.total_trackpoints,
-            "created_at": activity.created_at.isoformat() if activity.created_at else None
-        } for activity in activities]
+    query = select(Activity)
+    version_query = select(func.count(Activity.id), func.max(Activity.updated_at))
+    
+    if user_id:
+        query = query.where(Activity.user_id == user_id)
+        version_query = version_query.where(Activity.user_id == user_id)
+    
+    # Count + latest update change with every import, delete and edit
+    count, last_updated = (await db.execute(version_query)).one()
+    version = f"{count}-{datetime_to_epoch_us(last_updated) if last_updated else 0}"
+    tag = f"activities:user:{user_id}" if user_id else "activities:all"
+    
+    async def build():
+        activities = (await db.execute(query.order_by(desc(Activity.start_time)))).scalars().all()
+        return [_activity_summary(activity) for activity in activities]
+    
+    return await _cached_response(request, response, tag, version, (tag,), build)
+
+def _activity_summary(activity: Activity) -> Dict:
+    return {
+        "id": activity.id,
+        "name": activity.name,
+        "activity_type": activity.activity_type,
+        "start_time": activity.start_time.isoformat() if activity.start_time else None,
+        "distance_km": float(activity.distance_km) if activity.distance_km else 0,
+        "duration_seconds": activity.duration_seconds,
+        "avg_heart_rate": activity.avg_heart_rate,
+        "max_heart_rate": activity.max_heart_rate,
+        "trimp": activity.trimp,
+        "total_trackpoints": activity.total_trackpoints,
+        "created_at": activity.created_at.isoformat() if activity.created_at else None
+    }
+
+# Meters per degree of latitude (WGS84 mean), for the index prefilter of radius searches
+METERS_PER_DEGREE = 111_320.0
+
+def _parse_bbox(bbox: str):
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox minimum must not exceed maximum")
+    return min_lon, min_lat, max_lon, max_lat
+
+@router.get("/search")
+async def search_activities(bbox: Optional[str] = Query(None, description="minLon,minLat,maxLon,maxLat"),
+                            lat: Optional[float] = Query(None, ge=-90, le=90),
+                            lon: Optional[float] = Query(None, ge=-180, le=180),
+                            radius_m: Optional[float] = Query(None, gt=0, le=100_000),
+                            user_id: Optional[int] = None, activity_type: Optional[str] = None,
+                            limit: int = Query(100, ge=1, le=1000),
+                            db: AsyncSession = Depends(get_db)):
+    """Activities whose route intersects a bounding box or passes within radius_m of a point.
+    
+    Both queries use the GiST indexes on activities.bbox / activities.route (&& prefilter)
+    before the exact check against the simplified route.
+    """
+    by_point = lat is not None or lon is not None or radius_m is not None
+    if (bbox is None) == (not by_point) or (by_point and None in (lat, lon, radius_m)):
+        raise HTTPException(status_code=400, detail="Provide either bbox or lat, lon and radius_m")
+    
+    query = select(Activity).where(Activity.route.isnot(None))
+    if user_id:
+        query = query.where(Activity.user_id == user_id)
+    if activity_type:
+        query = query.where(Activity.activity_type == activity_type)
+    
+    if bbox is not None:
+        envelope = func.ST_MakeEnvelope(*_parse_bbox(bbox), ROUTE_SRID)
+        query = query.where(
+            Activity.bbox.op("&&")(envelope),
+            func.ST_Intersects(Activity.route, envelope)
+        ).order_by(desc(Activity.start_time))
+        distances = None
+    else:
+        point = func.ST_SetSRID(func.ST_MakePoint(lon, lat), ROUTE_SRID)
+        # Degree box covering the radius, widened in longitude away from the equator
+        dy = radius_m / METERS_PER_DEGREE
+        dx = dy / max(float(np.cos(np.radians(lat))), 0.01)
+        distance = func.ST_Distance(func.geography(Activity.route), func.geography(point))
+        query = query.add_columns(distance.label("distance_m")).where(
+            Activity.route.op("&&")(func.ST_Expand(point, dx, dy)),
+            func.ST_DWithin(func.geography(Activity.route), func.geography(point), radius_m)
+        ).order_by(distance)
+    
+    rows = (await db.execute(query.limit(limit))).all()
+    if bbox is not None:
+        return [_activity_summary(activity) for activity, in rows]
+    return [
+        {**_activity_summary(activity), "distance_m": round(float(distance_m), 1)}
+        for activity, distance_m in rows
+    ]
 
 @router.get("/{activity_id}")
-async def get_activity(activity_id: int):
+async def get_activity(activity_id: int, request: Request, response: Response,
+                       db: AsyncSession = Depends(get_db)):
     """Get specific activity details"""
-    with get_sync_session() as db:
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
-        
-        return {
-            "id": activity.id,
-            "name": activity.name,
-            "activity_type": activity.activity_type,
-            "start_time": activity.start_time.isoformat() if activity.start_time else None,
-            "duration_seconds": activity.duration_seconds,
-            "distance_km": float(activity.distance_km) if activity.distance_km else 0,
-            "elevation_gain_m": float(activity.elevation_gain_m) if activity.elevation_gain_m else 0,
-            "elevation_loss_m": float(activity.elevation_loss_m) if activity.elevation_loss_m else 0,
-            "avg_speed_ms": float(activity.avg_speed_ms) if activity.avg_speed_ms else 0,
-            "max_speed_ms": float(activity.max_speed_ms) if activity.max_speed_ms else 0,
-            "avg_heart_rate": activity.avg_heart_rate,
-            "max_heart_rate": activity.max_heart_rate,
-            "min_heart_rate": activity.min_heart_rate,
-            "total_trackpoints": activity.total_trackpoints,
-            "valid_hr_trackpoints": activity.valid_hr_trackpoints,
-            "gpx_file_path": activity.gpx_file_path,
-            "created_at": activity.created_at.isoformat() if activity.created_at else None,
-            "updated_at": activity.updated_at.isoformat() if activity.updated_at else None
-        }
+    activity = await db.get(Activity, activity_id)
+    
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    async def build():
+        return _activity_details(activity)
+    
+    return await _cached_response(
+        request, response, response_cache.activity_tag(activity_id), _activity_version(activity),
+        (response_cache.activity_tag(activity_id),), build, last_modified=activity.updated_at
+    )
+
+def _activity_details(activity: Activity) -> Dict:
+    return {
+        "id": activity.id,
+        "name": activity.name,
+        "activity_type": activity.activity_type,
+        "start_time": activity.start_time.isoformat() if activity.start_time else None,
+        "duration_seconds": activity.duration_seconds,
+        "distance_km": float(activity.distance_km) if activity.distance_km else 0,
+        "elevation_gain_m": float(activity.elevation_gain_m) if activity.elevation_gain_m else 0,
+        "elevation_loss_m": float(activity.elevation_loss_m) if activity.elevation_loss_m else 0,
+        "avg_speed_ms": float(activity.avg_speed_ms) if activity.avg_speed_ms else 0,
+        "max_speed_ms": float(activity.max_speed_ms) if activity.max_speed_ms else 0,
+        "avg_heart_rate": activity.avg_heart_rate,
+        "max_heart_rate": activity.max_heart_rate,
+        "min_heart_rate": activity.min_heart_rate,
+        "trimp": activity.trimp,
+        "total_trackpoints": activity.total_trackpoints,
+        "valid_hr_trackpoints": activity.valid_hr_trackpoints,
+        "gpx_file_path": activity.gpx_file_path,
+        "created_at": activity.created_at.isoformat() if activity.created_at else None,
+        "updated_at": activity.updated_at.isoformat() if activity.updated_at else None
+    }
 
-@router.post("/upload")
-async def upload_gpx(file: UploadFile = File(...), user_id: Optional[int] = Form(None)):
-    """Upload and import GPX file"""
+@router.post("/upload", status_code=202)
+async def upload_gpx(file: UploadFile = File(...), user_id: Optional[int] = Form(None),
+                     db: AsyncSession = Depends(get_db)):
+    """Upload GPX file and queue it for background import"""
     
     # Validate file type
     if not file.filename.lower().endswith('.gpx'):
         raise HTTPException(status_code=400, detail="Only GPX files are allowed")
     
-    with get_sync_session() as db:
-        # Get the target user (from parameter or default)
-        from ..models.user import User
-        if user_id:
-            target_user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
-            if not target_user:
-                raise HTTPException(status_code=404, detail="User not found")
-        else:
-            target_user = db.query(User).filter(User.is_active == True).first()
-            if not target_user:
-                raise HTTPException(status_code=500, detail="No active users found")
-        
-        # Check for duplicate file path (per-user duplicate detection)
-        temp_path = f"uploads/{file.filename}"
-        existing = db.query(Activity).filter(
-            Activity.gpx_file_path == temp_path,
-            Activity.user_id == target_user.id
-        ).first()
-        if existing:
-            raise HTTPException(
-                status_code=409, 
-                detail=f"File '{file.filename}' already imported as activity ID {existing.id}"
-            )
+    # Back-pressure: refuse before reading the body when workers are saturated
+    if await import_queue.queue_depth(db) >= settings.import_queue_max_depth:
+        raise HTTPException(
+            status_code=429,
+            detail="Import queue is full, please retry shortly",
+            headers={"Retry-After": "10"}
+        )
+    
+    # Get the target user (from parameter or default)
+    from ..models.user import User
+    if user_id:
+        target_user = (await db.execute(
+            select(User).where(User.id == user_id, User.is_active == True)
+        )).scalars().first()
+        if not target_user:
+            raise HTTPException(status_code=404, detail="User not found")
+    else:
+        target_user = (await db.execute(
+            select(User).where(User.is_active == True)
+        )).scalars().first()
+        if not target_user:
+            raise HTTPException(status_code=500, detail="No active users found")
+    
+    # Stream the body to disk while hashing it (no full-file read into memory)
+    user_dir = os.path.join("uploads", str(target_user.id))
+    os.makedirs(user_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=user_dir, suffix=".gpx.part", delete=False) as buffer:
+        temp_path = buffer.name
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            buffer.write(chunk)
+    content_sha256 = digest.hexdigest()
+    
+    # Per-user duplicate detection by file content (before any parsing)
+    existing = (await db.execute(
+        select(Activity.id).where(
+            Activity.user_id == target_user.id,
+            Activity.content_sha256 == content_sha256
+        )
+    )).scalar()
+    if existing:
+        os.unlink(temp_path)
+        raise HTTPException(
+            status_code=409,
+            detail=f"File '{file.filename}' already imported as activity ID {existing}"
+        )
+    
+    # Content-addressed location keeps the original filename (used for name/type detection)
+    stored_path = os.path.join(user_dir, content_sha256, os.path.basename(file.filename))
+    pending = await import_queue.find_active_job(db, target_user.id, stored_path)
+    if pending:
+        os.unlink(temp_path)
+        raise HTTPException(
+            status_code=409,
+            detail=f"File '{file.filename}' is already queued for import (job {pending.id})"
+        )
+    
+    os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+    os.replace(temp_path, stored_path)
     
     try:
-        # Save uploaded file temporarily
-        os.makedirs("uploads", exist_ok=True)
-        temp_file_path = f"uploads/{file.filename}"
-        
-        with open(temp_file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Import using GPX service
-        with get_sync_session() as db:
-            service = GPXService(db)
-            activity = service.import_gpx_file(temp_file_path, user_id=target_user.id)
-            
-            return {
-                "success": True,
-                "activity_id": activity.id,
-                "message": f"Successfully imported {activity.name}",
-                "stats": {
-                    "distance_km": float(activity.distance_km) if activity.distance_km else 0,
-                    "duration_seconds": activity.duration_seconds,
-                    "trackpoints": activity.total_trackpoints,
-                    "avg_heart_rate": activity.avg_heart_rate
-                }
-            }
-            
-    except Exception as e:
-        # Clean up file on error
-        if os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
-        
-        raise HTTPException(status_code=400, detail=f"Failed to import GPX: {str(e)}")
+        job = await import_queue.enqueue_import(db, target_user.id, stored_path, file.filename)
+    except import_queue.ImportQueueFull:
+        os.unlink(stored_path)
+        _remove_empty_dir(os.path.dirname(stored_path))
+        raise HTTPException(
+            status_code=429,
+            detail="Import queue is full, please retry shortly",
+            headers={"Retry-After": "10"}
+        )
+    
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "message": f"Queued {file.filename} for import"
+    }
+
+@router.get("/import-jobs/{job_id}")
+async def get_import_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Get status of a background import job"""
+    from ..models import ImportJob
+    
+    job = await db.get(ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    
+    activity = await db.get(Activity, job.activity_id) if job.activity_id else None
+    
+    return import_queue.job_to_dict(job, activity)
+
+def _remove_empty_dir(path: str) -> None:
+    """Remove an upload's content-hash directory once it is empty"""
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass
 
 @router.delete("/{activity_id}")
-async def delete_activity(activity_id: int):
+async def delete_activity(activity_id: int, db: AsyncSession = Depends(get_db)):
     """Delete activity and its trackpoints"""
-    with get_sync_session() as db:
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
-        
-        # Delete associated file if it exists
-        if activity.gpx_file_path and os.path.exists(activity.gpx_file_path):
-            os.unlink(activity.gpx_file_path)
-        
-        db.delete(activity)  # Cascade will delete trackpoints
-        db.commit()
-        
-        return {"success": True, "message": f"Deleted activity {activity.name}"}
+    activity = await db.get(Activity, activity_id)
+    
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    # Delete associated file if it exists
+    if activity.gpx_file_path and os.path.exists(activity.gpx_file_path):
+        os.unlink(activity.gpx_file_path)
+        _remove_empty_dir(os.path.dirname(activity.gpx_file_path))
+    
+    # Database ON DELETE CASCADE removes trackpoints without loading them
+    await db.execute(delete(Activity).where(Activity.id == activity_id))
+    rollup_before = training_rollups.contribution(activity)
+    await training_rollups.apply(db, rollup_before, None)
+    await training_load.apply(db, rollup_before, None)
+    await db.commit()
+    await _evict_activity(activity)
+    await run_in_threadpool(tile_cache.invalidate_user, activity.user_id)
+    
+    return {"success": True, "message": f"Deleted activity {activity.name}"}
 
 @router.get("/{activity_id}/trackpoints")
-async def get_activity_trackpoints(activity_id: int, limit: Optional[int] = None):
-    """Get GPS trackpoints for map visualization - OPTIMIZED"""
-    with get_sync_session() as db:
-        # Check if activity exists
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
+async def get_activity_trackpoints(activity_id: int, request: Request, response: Response,
+                                   limit: Optional[int] = Query(None, ge=1),
+                                   after: Optional[str] = None,
+                                   from_seconds: Optional[float] = Query(None, ge=0),
+                                   to_seconds: Optional[float] = Query(None, ge=0),
+                                   tolerance_m: Optional[float] = Query(None, gt=0),
+                                   max_points: Optional[int] = Query(None, ge=2),
+                                   db: AsyncSession = Depends(get_db)):
+    """Get GPS trackpoints for map visualization - OPTIMIZED
+    
+    tolerance_m / max_points return a Douglas-Peucker simplified route
+    (precomputed at import). from_seconds / to_seconds select an elapsed-time
+    window; limit pages through the result, with the next page token in the
+    X-Next-Cursor header (pass it back as ?after=). With
+    Accept: application/vnd.sporter.columns coordinates come as an encoded
+    polyline and the other channels as packed typed arrays.
+    """
+    # Check if activity exists
+    activity = await db.get(Activity, activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    _check_window(from_seconds, to_seconds)
+    after_order = _decode_cursor(after)
+    if after_order is not None and max_points is not None:
+        raise HTTPException(status_code=400, detail="after cannot be combined with max_points")
+    
+    async def build():
+        params = {"activity_id": activity_id}
+        filters = ""
+        if tolerance_m is not None:
+            filters += " AND simplify_tolerance_m > :tolerance_m"
+            params["tolerance_m"] = tolerance_m
+        if after_order is not None:
+            filters += " AND point_order > :after_order"
+            params["after_order"] = after_order
+        if from_seconds is not None:
+            filters += " AND elapsed_seconds >= :from_seconds"
+            params["from_seconds"] = from_seconds
+        if to_seconds is not None:
+            filters += " AND elapsed_seconds <= :to_seconds"
+            params["to_seconds"] = to_seconds
         
         # Single optimized query with PostGIS functions
-        query_sql = """
-            SELECT 
+        query_sql = f"""
+            SELECT
                 point_order,
                 ST_Y(coordinates) as latitude,
                 ST_X(coordinates) as longitude,
                 elevation,
                 recorded_at,
+                elapsed_seconds,
                 heart_rate,
                 speed_ms
-            FROM trackpoints 
-            WHERE activity_id = :activity_id 
-            AND exclude_from_gps_analysis = false
-            ORDER BY point_order
+            FROM trackpoints
+            WHERE activity_id = :activity_id
+            AND exclude_from_gps_analysis = false{filters}
         """
         
-        # Add limit if specified
+        if max_points is not None:
+            # Most significant points first, then back to route order
+            query_sql = f"""
+                SELECT * FROM (
+                    {query_sql}
+                    ORDER BY simplify_tolerance_m DESC, point_order
+                    LIMIT :max_points
+                ) simplified
+                ORDER BY point_order
+            """
+            params["max_points"] = max_points
+        else:
+            # Keyset order - served by ix_sporter_trackpoints_activity_order
+            query_sql += " ORDER BY point_order"
+        
+        # One extra row tells whether another page exists
         if limit:
             query_sql += " LIMIT :limit"
+            params["limit"] = limit + 1
         
         # Execute single query
-        params = {"activity_id": activity_id}
-        if limit:
-            params["limit"] = limit
-            
-        result_rows = db.execute(text(query_sql), params).fetchall()
+        result_rows, next_cursor = _page((await db.execute(text(query_sql), params)).fetchall(), limit)
+        
+        if accepts_columns(request.headers.get("accept")):
+            columns_response = await run_in_threadpool(
+                _trackpoint_columns, activity_id, result_rows, activity.start_time, next_cursor
+            )
+            if next_cursor:
+                columns_response.headers["X-Next-Cursor"] = next_cursor
+            return columns_response
         
         # Transform to response format
+        response.headers["Vary"] = "Accept"
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return [{
             "point_order": row.point_order,
             "latitude": float(row.latitude) if row.latitude else None,
@@ -207,326 +580,615 @@ async def get_activity_trackpoints(activity_id: int, limit: Optional[int] = None
             "heart_rate": row.heart_rate,
             "speed_ms": float(row.speed_ms) if row.speed_ms else None
         } for row in result_rows]
+    
+    # Raw track is fixed at import: versioned by creation time only and cacheable as immutable
+    track_version = f"track-{datetime_to_epoch_us(activity.created_at) if activity.created_at else 0}"
+    return await _cached_response(
+        request, response, response_cache.activity_tag(activity_id), track_version,
+        (response_cache.activity_tag(activity_id),), build, last_modified=activity.created_at, immutable=True
+    )
+
+def _trackpoint_columns(activity_id: int, rows, start_time, next_cursor: Optional[str] = None) -> Response:
+    """Trackpoints as polyline + columnar channels (CPU-bound)"""
+    columns = {
+        "point_order": np.array([row.point_order for row in rows], dtype=np.int32),
+        "time_seconds": _nullable(row.elapsed_seconds for row in rows),
+        "elevation": _nullable(row.elevation for row in rows),
+        "heart_rate": _nullable(row.heart_rate for row in rows),
+        "speed_ms": _nullable(row.speed_ms for row in rows)
+    }
+    meta = {
+        "activity_id": activity_id,
+        "start_time": start_time.isoformat() if start_time else None,
+        "next_cursor": next_cursor,
+        "polyline": encode_polyline(
+            np.array([row.latitude for row in rows], dtype=np.float64),
+            np.array([row.longitude for row in rows], dtype=np.float64)
+        ),
+        "polyline_precision": POLYLINE_PRECISION
+    }
+    return _columns_response(columns, meta)
+
+def _range_exclusions(time_seconds: np.ndarray, exclusion_ranges):
+    """(range index per point or -1, ranges sorted by start) - see range_exclusion_index"""
+    ranges = sorted(exclusion_ranges, key=lambda r: (r.start_time_seconds, r.id or 0))
+    index = range_exclusion_index(
+        time_seconds,
+        np.array([r.start_time_seconds for r in ranges], dtype=np.float64),
+        np.array([r.end_time_seconds for r in ranges], dtype=np.float64)
+    )
+    return index, ranges
+
+def _elapsed_seconds(trackpoints, offset: float = 0.0) -> np.ndarray:
+    """Stored elapsed_seconds shifted to another time zero (e.g. the first HR point)"""
+    return _nullable((tp.elapsed_seconds for tp in trackpoints), np.float64) - offset
+
+def _downsampled_heart_rate(series: Dict[str, np.ndarray], max_points: int):
+    """LTTB-reduce HR series keeping peaks and excluded-span boundaries; returns (series, metadata)"""
+    excluded = series["excluded"]
+    time_seconds = series["time_seconds"]
+    first, last = mask_runs(excluded)
+    
+    # Longest excluded spans keep both boundaries (two points each, at most a quarter of the budget)
+    durations = time_seconds[last] - time_seconds[first]
+    longest = np.argsort(-durations, kind="stable")[:max(1, max_points // 8)]
+    selected = downsample_indices(
+        time_seconds, series["heart_rate"].astype(np.float64), max_points,
+        keep=np.concatenate([first[longest], last[longest]])
+    )
+    
+    metadata = {
+        "method": "lttb",
+        "source_points": len(excluded),
+        "returned_points": len(selected),
+        "excluded_spans": [{
+            "start_seconds": float(time_seconds[f]),
+            "end_seconds": float(time_seconds[l]),
+            "points": int(l - f + 1),
+            "reason": series["exclusion_reason"][f]
+        } for f, l in zip(first.tolist(), last.tolist())]
+    }
+    return {name: column[selected] for name, column in series.items()}, metadata
+
+# Column dtypes of the series endpoints in the columnar binary format
+HEART_RATE_DTYPES = {"time_seconds": np.float32, "heart_rate": np.uint16, "point_order": np.int32, "excluded": np.uint8}
+ELEVATION_DTYPES = {"distance_km": np.float32, "elevation_m": np.float32, "point_order": np.int32}
+
+def _render_series(computed: Dict, dtypes: Dict, as_columns: bool, response: Response,
+                   dictionary_columns=()):
+    """Serialize a computed {"payload", "series"} result as JSON rows or columnar binary"""
+    payload = dict(computed["payload"])
+    series = computed["series"]
+    
+    if as_columns:
+        columns = {name: np.array(series[name], dtype=dtype) for name, dtype in dtypes.items()}
+        dictionaries = {}
+        for name in dictionary_columns:
+            # Strings as dictionary codes (0 = none)
+            values = [None] + sorted({value for value in series[name] if value is not None})
+            codes = {value: code for code, value in enumerate(values)}
+            columns[name] = np.array(
+                [codes[value] for value in series[name]], dtype=np.uint8 if len(values) <= 256 else np.uint16
+            )
+            dictionaries[name] = values
+        if dictionaries:
+            payload["dictionaries"] = dictionaries
+        response = _columns_response(columns, payload)
+        result = response
+    else:
+        payload["data"] = [dict(zip(series, values)) for values in zip(*series.values())]
+        response.headers["Vary"] = "Accept"
+        result = payload
+    
+    if payload.get("next_cursor"):
+        response.headers["X-Next-Cursor"] = payload["next_cursor"]
+    return result
+
+def _is_full_series(limit, after, from_seconds, to_seconds) -> bool:
+    """Whole-activity requests are memoized in the analytics cache; windows and pages are not"""
+    return not limit and after is None and from_seconds is None and to_seconds is None
+
+def _build_heart_rate_series(activity_id: int, activity_stats: Dict, trackpoints, exclusion_ranges,
+                             hr_offset: float, next_cursor: Optional[str] = None,
+                             max_points: Optional[int] = None) -> Dict:
+    """Build HR chart data with combined point/range exclusion logic (CPU-bound, one vectorized pass)"""
+    time_seconds = _elapsed_seconds(trackpoints, hr_offset)
+    point_excluded = np.array([bool(tp.exclude_from_hr_analysis) for tp in trackpoints], dtype=bool)
+    point_reasons = np.array([tp.exclusion_reason for tp in trackpoints], dtype=object)
+    
+    # Range exclusions only add to points not already excluded individually
+    range_index, ranges = _range_exclusions(time_seconds, exclusion_ranges)
+    range_only = (range_index >= 0) & ~point_excluded
+    range_excluded_count = int(np.count_nonzero(range_only))
+    
+    excluded = point_excluded | (range_index >= 0)
+    exclusion_reasons = point_reasons.copy()
+    if range_excluded_count:
+        range_labels = np.array(
+            [f"Range: {r.reason}" if r.reason else "Range exclusion" for r in ranges], dtype=object
+        )
+        exclusion_reasons[range_only] = range_labels[range_index[range_only]]
+    
+    series = {
+        "time_seconds": time_seconds,
+        "heart_rate": np.array([tp.heart_rate for tp in trackpoints], dtype=np.int64),
+        "point_order": np.array([tp.point_order for tp in trackpoints], dtype=np.int64),
+        "excluded": excluded,
+        "exclusion_reason": exclusion_reasons
+    }
+    
+    is_startup = point_reasons == 'hr_startup'
+    is_outlier = point_reasons == 'hr_statistical_outlier'
+    
+    payload = {
+        "activity_id": activity_id,
+        "total_points": len(trackpoints),
+        "next_cursor": next_cursor,
+        "stats": {
+            **activity_stats,
+            "total_hr_points": len(trackpoints),
+            "excluded_points": int(np.count_nonzero(point_excluded)) + range_excluded_count,
+            "exclusion_breakdown": {
+                "hr_startup": int(np.count_nonzero(is_startup)),
+                "hr_statistical_outlier": int(np.count_nonzero(is_outlier)),
+                "range_exclusions": range_excluded_count,
+                "other": int(np.count_nonzero(point_excluded & ~is_startup & ~is_outlier))
+            }
+        }
+    }
+    
+    # Stats above cover every point; only the plotted series is reduced
+    if max_points and len(trackpoints) > max_points:
+        series, payload["downsampling"] = _downsampled_heart_rate(series, max_points)
+    
+    return {"payload": payload, "series": {name: column.tolist() for name, column in series.items()}}
 
 @router.get("/{activity_id}/heart-rate")
-async def get_activity_heart_rate(activity_id: int):
-    """Get heart rate data for chart visualization"""
-    with get_sync_session() as db:
-        from ..models import ExclusionRange
-        
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
-        
-        trackpoints = db.query(Trackpoint).filter(
+async def get_activity_heart_rate(activity_id: int, request: Request, response: Response,
+                                  limit: Optional[int] = Query(None, ge=1),
+                                  after: Optional[str] = None,
+                                  from_seconds: Optional[float] = Query(None, ge=0),
+                                  to_seconds: Optional[float] = Query(None, ge=0),
+                                  max_points: Optional[int] = Query(None, ge=3),
+                                  db: AsyncSession = Depends(get_db)):
+    """Get heart rate data for chart visualization (JSON or columnar binary by Accept)
+    
+    Time is counted from the first HR sample; from_seconds / to_seconds select
+    a window on that axis and limit / after page through it (next_cursor).
+    max_points reduces the series with LTTB (peaks and excluded-span
+    boundaries kept, spans listed under "downsampling").
+    """
+    from ..models import ExclusionRange
+    
+    activity = await db.get(Activity, activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    _check_window(from_seconds, to_seconds)
+    after_order = _decode_cursor(after)
+    
+    async def compute() -> Dict:
+        hr_offset = await _hr_offset(db, activity_id)
+        
+        query = select(
+            Trackpoint.point_order,
+            Trackpoint.elapsed_seconds,
+            Trackpoint.heart_rate,
+            Trackpoint.exclude_from_hr_analysis,
+            Trackpoint.exclusion_reason
+        ).where(
             Trackpoint.activity_id == activity_id,
             Trackpoint.heart_rate.isnot(None)
-        ).order_by(Trackpoint.point_order).all()
+        )
+        if after_order is not None:
+            query = query.where(Trackpoint.point_order > after_order)
+        if from_seconds is not None and hr_offset is not None:
+            query = query.where(Trackpoint.elapsed_seconds >= hr_offset + from_seconds)
+        if to_seconds is not None and hr_offset is not None:
+            query = query.where(Trackpoint.elapsed_seconds <= hr_offset + to_seconds)
+        query = query.order_by(Trackpoint.point_order)
+        if limit:
+            query = query.limit(limit + 1)
+        
+        trackpoints, next_cursor = _page((await db.execute(query)).all(), limit)
         
         if not trackpoints:
             return {
-                "activity_id": activity_id,
-                "total_points": 0,
-                "data": [],
-                "stats": {
-                    "avg_hr": None,
-                    "max_hr": None,
-                    "min_hr": None,
-                    "valid_hr_points": 0,
-                    "total_hr_points": 0,
-                    "excluded_points": 0,
-                    "exclusion_breakdown": {
-                        "hr_startup": 0,
-                        "hr_statistical_outlier": 0,
-                        "range_exclusions": 0,
-                        "other": 0
+                "payload": {
+                    "activity_id": activity_id,
+                    "total_points": 0,
+                    "next_cursor": None,
+                    "stats": {
+                        "avg_hr": None,
+                        "max_hr": None,
+                        "min_hr": None,
+                        "valid_hr_points": 0,
+                        "total_hr_points": 0,
+                        "excluded_points": 0,
+                        "exclusion_breakdown": {
+                            "hr_startup": 0,
+                            "hr_statistical_outlier": 0,
+                            "range_exclusions": 0,
+                            "other": 0
+                        }
                     }
-                }
+                },
+                "series": {name: [] for name in (*HEART_RATE_DTYPES, "exclusion_reason")}
             }
         
         # Get all exclusion ranges
-        exclusion_ranges = db.query(ExclusionRange).filter(
-            ExclusionRange.activity_id == activity_id
-        ).all()
-        
-        start_time = trackpoints[0].recorded_at
-        
-        # Build data points with combined exclusion logic
-        data_points = []
-        range_excluded_count = 0
+        exclusion_ranges = (await db.execute(
+            select(ExclusionRange).where(ExclusionRange.activity_id == activity_id)
+        )).scalars().all()
+        
+        activity_stats = {
+            "avg_hr": activity.avg_heart_rate,
+            "max_hr": activity.max_heart_rate,
+            "min_hr": activity.min_heart_rate,
+            "valid_hr_points": activity.valid_hr_trackpoints
+        }
         
-        for tp in trackpoints:
-            time_seconds = (tp.recorded_at - start_time).total_seconds() if tp.recorded_at and start_time else 0
-            
-            # Check if point is excluded by range
-            excluded_by_range = any(
-                range_obj.start_time_seconds <= time_seconds <= range_obj.end_time_seconds
-                for range_obj in exclusion_ranges
+        return await run_in_threadpool(
+            _build_heart_rate_series, activity_id, activity_stats, trackpoints, exclusion_ranges,
+            hr_offset, next_cursor, max_points
+        )
+    
+    async def build():
+        if _is_full_series(limit, after, from_seconds, to_seconds):
+            computed = await analytics_cache.get_or_compute(
+                db, activity_id, "heart_rate", {"max_points": max_points}, compute
             )
-            
-            # Determine final exclusion status and reason
-            excluded = tp.exclude_from_hr_analysis or excluded_by_range
-            exclusion_reason = tp.exclusion_reason
-            
-            if excluded_by_range and not tp.exclude_from_hr_analysis:
-                range_excluded_count += 1
-                # Find the range that excludes this point for the reason
-                excluding_range = next(
-                    (r for r in exclusion_ranges 
-                     if r.start_time_seconds <= time_seconds <= r.end_time_seconds),
-                    None
-                )
-                exclusion_reason = f"Range: {excluding_range.reason}" if excluding_range and excluding_range.reason else "Range exclusion"
-            
-            data_points.append({
-                "time_seconds": time_seconds,
-                "heart_rate": tp.heart_rate,
-                "point_order": tp.point_order,
-                "excluded": excluded,
-                "exclusion_reason": exclusion_reason
-            })
+        else:
+            computed = await compute()
         
-        return {
-            "activity_id": activity_id,
-            "total_points": len(trackpoints),
-            "data": data_points,
-            "stats": {
-                "avg_hr": activity.avg_heart_rate,
-                "max_hr": activity.max_heart_rate,
-                "min_hr": activity.min_heart_rate,
-                "valid_hr_points": activity.valid_hr_trackpoints,
-                "total_hr_points": len(trackpoints),
-                "excluded_points": len([tp for tp in trackpoints if tp.exclude_from_hr_analysis]) + range_excluded_count,
-                "exclusion_breakdown": {
-                    "hr_startup": len([tp for tp in trackpoints if tp.exclusion_reason == 'hr_startup']),
-                    "hr_statistical_outlier": len([tp for tp in trackpoints if tp.exclusion_reason == 'hr_statistical_outlier']),
-                    "range_exclusions": range_excluded_count,
-                    "other": len([tp for tp in trackpoints if tp.exclude_from_hr_analysis and tp.exclusion_reason not in ['hr_startup', 'hr_statistical_outlier']])
-                }
-            }
-        }
+        return _render_series(
+            computed, HEART_RATE_DTYPES, accepts_columns(request.headers.get("accept")), response,
+            dictionary_columns=("exclusion_reason",)
+        )
+    
+    return await _cached_response(
+        request, response, response_cache.activity_tag(activity_id), await _heart_rate_version(db, activity),
+        (response_cache.activity_tag(activity_id),), build, last_modified=activity.updated_at
+    )
 
 @router.get("/{activity_id}/elevation")
-async def get_activity_elevation(activity_id: int):
-    """Get elevation profile for chart visualization"""
-    with get_sync_session() as db:
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
-        
-        trackpoints = db.query(Trackpoint).filter(
+async def get_activity_elevation(activity_id: int, request: Request, response: Response,
+                                 limit: Optional[int] = Query(None, ge=1),
+                                 after: Optional[str] = None,
+                                 from_seconds: Optional[float] = Query(None, ge=0),
+                                 to_seconds: Optional[float] = Query(None, ge=0),
+                                 max_points: Optional[int] = Query(None, ge=3),
+                                 db: AsyncSession = Depends(get_db)):
+    """Get elevation profile for chart visualization (JSON or columnar binary by Accept)
+    
+    Supports the same from_seconds / to_seconds window and limit / after
+    paging as the trackpoints endpoint; distance_km stays measured from the
+    start of the activity. max_points reduces the profile with LTTB
+    (highest and lowest point kept).
+    """
+    activity = await db.get(Activity, activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    _check_window(from_seconds, to_seconds)
+    after_order = _decode_cursor(after)
+    
+    async def compute() -> Dict:
+        query = select(
+            Trackpoint.point_order,
+            Trackpoint.elevation,
+            Trackpoint.cumulative_distance_m
+        ).where(
             Trackpoint.activity_id == activity_id,
             Trackpoint.exclude_from_gps_analysis == False,
             Trackpoint.elevation.isnot(None)
-        ).order_by(Trackpoint.point_order).all()
+        )
+        if after_order is not None:
+            query = query.where(Trackpoint.point_order > after_order)
+        if from_seconds is not None:
+            query = query.where(Trackpoint.elapsed_seconds >= from_seconds)
+        if to_seconds is not None:
+            query = query.where(Trackpoint.elapsed_seconds <= to_seconds)
+        query = query.order_by(Trackpoint.point_order)
+        if limit:
+            query = query.limit(limit + 1)
         
-        # Calculate cumulative distance
-        cumulative_distance = 0
-        elevation_data = []
+        trackpoints, next_cursor = _page((await db.execute(query)).all(), limit)
         
-        for i, tp in enumerate(trackpoints):
-            if i > 0:
-                cumulative_distance += tp.distance_from_previous_m or 0
-                
-            elevation_data.append({
-                "distance_km": round(cumulative_distance / 1000, 3),
-                "elevation_m": float(tp.elevation),
-                "point_order": tp.point_order
-            })
+        # Cumulative distance is stored per point at import - pages and windows need no running sum
+        series = {
+            "distance_km": np.round(_nullable((tp.cumulative_distance_m for tp in trackpoints), np.float64) / 1000, 3),
+            "elevation_m": np.array([float(tp.elevation) for tp in trackpoints], dtype=np.float64),
+            "point_order": np.array([tp.point_order for tp in trackpoints], dtype=np.int64)
+        }
         
-        return {
+        payload = {
             "activity_id": activity_id,
             "total_points": len(trackpoints),
-            "data": elevation_data,
+            "next_cursor": next_cursor,
             "stats": {
-                "elevation_gain_m": float(activity.elevation_gain_m) if activity.elevation_gain_m else None,
-                "elevation_loss_m": float(activity.elevation_loss_m) if activity.elevation_loss_m else None,
+                "elevation_gain_m": float(activity.elevation_gain_m) if activity.elevation_gain_m is not None else None,
+                "elevation_loss_m": float(activity.elevation_loss_m) if activity.elevation_loss_m is not None else None,
                 "total_distance_km": float(activity.distance_km) if activity.distance_km else 0
             }
         }
+        
+        if max_points and len(trackpoints) > max_points:
+            selected = downsample_indices(series["distance_km"], series["elevation_m"], max_points)
+            series = {name: column[selected] for name, column in series.items()}
+            payload["downsampling"] = {
+                "method": "lttb",
+                "source_points": len(trackpoints),
+                "returned_points": len(selected)
+            }
+        
+        return {"payload": payload, "series": {name: column.tolist() for name, column in series.items()}}
+    
+    async def build():
+        if _is_full_series(limit, after, from_seconds, to_seconds):
+            computed = await analytics_cache.get_or_compute(
+                db, activity_id, "elevation_profile", {"max_points": max_points}, compute
+            )
+        else:
+            computed = await compute()
+        
+        return _render_series(computed, ELEVATION_DTYPES, accepts_columns(request.headers.get("accept")), response)
+    
+    return await _cached_response(
+        request, response, response_cache.activity_tag(activity_id), _activity_version(activity),
+        (response_cache.activity_tag(activity_id),), build, last_modified=activity.updated_at
+    )
+
+@router.get("/{activity_id}/hr-zones")
+async def get_activity_hr_zones(activity_id: int, request: Request, response: Response,
+                                db: AsyncSession = Depends(get_db)):
+    """Time and distance spent in each HR zone of the owner's profile (Karvonen)
+    
+    Excluded points and exclusion ranges are not counted. Results are
+    precomputed for all activities of a user when the HR profile changes.
+    """
+    from ..models.user import User
+    
+    activity = await db.get(Activity, activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    user = await db.get(User, activity.user_id) if activity.user_id else None
+    zones = user.hr_zones if user else None
+    if not zones:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot calculate HR zones. Please set your maximum heart rate or age."
+        )
+    
+    async def build() -> Dict:
+        distribution = await hr_zones.activity_hr_zones(db, activity_id, zones)
+        return {"activity_id": activity_id, **distribution}
+    
+    # The zone bounds are part of the version: a profile change is a new representation
+    version = f"{await _heart_rate_version(db, activity)}-{analytics_cache.parameters_hash(hr_zones.zone_parameters(zones))[:12]}"
+    return await _cached_response(
+        request, response, response_cache.activity_tag(activity_id), version,
+        (response_cache.activity_tag(activity_id),), build, last_modified=activity.updated_at
+    )
+
+def _histogram_from_rows(rows) -> np.ndarray:
+    """HR histogram from (heart_rate, points) GROUP BY rows"""
+    histogram = np.zeros(HR_HISTOGRAM_BINS, dtype=np.int64)
+    if rows:
+        np.add.at(
+            histogram,
+            np.clip([row.heart_rate for row in rows], 0, HR_HISTOGRAM_BINS - 1),
+            [row.points for row in rows]
+        )
+    return histogram
+
+async def _valid_hr_histogram(db: AsyncSession, activity_id: int) -> np.ndarray:
+    """Histogram of HR values not excluded by flags or exclusion ranges (one aggregate query)"""
+    rows = (await db.execute(text("""
+        SELECT tp.heart_rate, COUNT(*) AS points
+        FROM trackpoints tp
+        WHERE tp.activity_id = :activity_id
+        AND tp.heart_rate IS NOT NULL
+        AND tp.exclude_from_hr_analysis IS NOT TRUE
+        AND NOT EXISTS (
+            SELECT 1 FROM exclusion_ranges r
+            WHERE r.activity_id = :activity_id
+            AND tp.elapsed_seconds BETWEEN r.start_time_seconds + CAST(:hr_offset AS double precision)
+                                       AND r.end_time_seconds + CAST(:hr_offset AS double precision)
+        )
+        GROUP BY tp.heart_rate
+    """), {"activity_id": activity_id, "hr_offset": await _hr_offset(db, activity_id) or 0.0})).all()
+    return _histogram_from_rows(rows)
+
+async def _range_hr_histogram(db: AsyncSession, activity_id: int, exclusion_range) -> np.ndarray:
+    """Histogram of the HR points only this range decides about - O(points in the range)
+    
+    Counts points inside the range that are not flagged and not covered by
+    any other range, i.e. exactly those whose validity flips when the range
+    is added or removed. Served by ix_sporter_trackpoints_activity_elapsed.
+    """
+    hr_offset = await _hr_offset(db, activity_id)
+    if hr_offset is None:
+        return np.zeros(HR_HISTOGRAM_BINS, dtype=np.int64)
+    
+    rows = (await db.execute(text("""
+        SELECT tp.heart_rate, COUNT(*) AS points
+        FROM trackpoints tp
+        WHERE tp.activity_id = :activity_id
+        AND tp.heart_rate IS NOT NULL
+        AND tp.exclude_from_hr_analysis IS NOT TRUE
+        AND tp.elapsed_seconds BETWEEN :from_seconds AND :to_seconds
+        AND NOT EXISTS (
+            SELECT 1 FROM exclusion_ranges r
+            WHERE r.activity_id = :activity_id
+            AND r.id <> :range_id
+            AND tp.elapsed_seconds BETWEEN r.start_time_seconds + CAST(:hr_offset AS double precision)
+                                       AND r.end_time_seconds + CAST(:hr_offset AS double precision)
+        )
+        GROUP BY tp.heart_rate
+    """), {
+        "activity_id": activity_id,
+        "range_id": exclusion_range.id,
+        "hr_offset": hr_offset,
+        "from_seconds": exclusion_range.start_time_seconds + hr_offset,
+        "to_seconds": exclusion_range.end_time_seconds + hr_offset
+    })).all()
+    return _histogram_from_rows(rows)
+
+def _store_hr_histogram(activity: Activity, histogram: np.ndarray) -> None:
+    """Persist the valid-HR histogram and the activity HR stats derived from it"""
+    activity.hr_histogram = pack_hr_histogram(histogram)
+    for field, value in histogram_stats(histogram).items():
+        setattr(activity, field, value)
 
 @router.post("/{activity_id}/hr-exclusions/clear")
-async def clear_hr_exclusions(activity_id: int):
+async def clear_hr_exclusions(activity_id: int, db: AsyncSession = Depends(get_db)):
     """Clear all HR exclusions for an activity"""
-    with get_sync_session() as db:
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
-        
-        # Clear all HR exclusions
-        trackpoints = db.query(Trackpoint).filter(
+    activity = await db.get(Activity, activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    # Clear all HR exclusions in one statement
+    result = await db.execute(
+        update(Trackpoint).where(
             Trackpoint.activity_id == activity_id,
             Trackpoint.heart_rate.isnot(None)
-        ).all()
-        
-        for tp in trackpoints:
-            tp.exclude_from_hr_analysis = False
-            tp.exclusion_reason = None
-        
-        db.commit()
-        
-        return {
-            "success": True,
-            "message": f"Cleared HR exclusions for activity {activity.name}",
-            "cleared_trackpoints": len(trackpoints)
-        }
+        ).values(
+            exclude_from_hr_analysis=False,
+            exclusion_reason=None
+        ).execution_options(synchronize_session=False)
+    )
+    
+    # Stats now cover every point outside exclusion ranges - same transaction
+    rollup_before = training_rollups.contribution(activity)
+    _store_hr_histogram(activity, await _valid_hr_histogram(db, activity_id))
+    
+    await _mark_activity_changed(db, activity, rollup_before)
+    await db.commit()
+    await _evict_activity(activity)
+    
+    return {
+        "success": True,
+        "message": f"Cleared HR exclusions for activity {activity.name}",
+        "cleared_trackpoints": result.rowcount
+    }
+
+def _detect_hr_exclusions(rows):
+    """Automatic HR exclusion (same as in GPX import) over (id, elapsed_seconds, heart_rate) rows"""
+    heart_rate = np.array([row.heart_rate for row in rows], dtype=np.float64)
+    return detect_hr_outliers(_elapsed_seconds(rows), heart_rate)
 
 @router.post("/{activity_id}/hr-exclusions/reapply")
-async def reapply_hr_exclusions(activity_id: int):
+async def reapply_hr_exclusions(activity_id: int, db: AsyncSession = Depends(get_db)):
     """Clear existing HR exclusions and reapply automatic detection"""
-    import statistics
-    from datetime import datetime
+    activity = await db.get(Activity, activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
     
-    with get_sync_session() as db:
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
-        
-        # Get all trackpoints with HR data, ordered by time
-        trackpoints = db.query(Trackpoint).filter(
+    # Only the columns detection needs, no ORM objects
+    rows = (await db.execute(
+        select(
+            Trackpoint.id,
+            Trackpoint.elapsed_seconds,
+            Trackpoint.heart_rate
+        ).where(
             Trackpoint.activity_id == activity_id,
             Trackpoint.heart_rate.isnot(None)
-        ).order_by(Trackpoint.point_order).all()
-        
-        if len(trackpoints) < 10:
-            return {
-                "success": False,
-                "message": "Not enough HR data for exclusion analysis",
-                "trackpoints_count": len(trackpoints)
-            }
-        
-        # Clear existing exclusions
-        for tp in trackpoints:
-            tp.exclude_from_hr_analysis = False
-            tp.exclusion_reason = None
-        
-        # Apply HR exclusion logic (same as in GPX import)
-        
-        # Calculate overall average HR for the entire activity
-        overall_avg_hr = sum(tp.heart_rate for tp in trackpoints) / len(trackpoints)
-        
-        # Strategy 1: Smart startup exclusion - exclude points in first 5 minutes that are above overall average
-        startup_minutes = 5
-        start_time = trackpoints[0].recorded_at
-        
-        for tp in trackpoints:
-            if tp.recorded_at and start_time:
-                time_since_start = (tp.recorded_at - start_time).total_seconds()
-                
-                if time_since_start < startup_minutes * 60:
-                    # In first 5 minutes: exclude only if HR > overall average
-                    if tp.heart_rate > overall_avg_hr:
-                        tp.exclude_from_hr_analysis = True
-                        tp.exclusion_reason = 'hr_startup'
-                    else:
-                        tp.exclude_from_hr_analysis = False
-                else:
-                    tp.exclude_from_hr_analysis = False
-        
-        # Strategy 2: Statistical outliers (after startup period)
-        valid_hr_values = [
-            tp.heart_rate for tp in trackpoints 
-            if not tp.exclude_from_hr_analysis
-        ]
-        
-        if len(valid_hr_values) > 20:
-            median_hr = statistics.median(valid_hr_values)
-            mad = statistics.median([abs(hr - median_hr) for hr in valid_hr_values])
-            
-            # Mark extreme outliers (beyond 3 MAD from median)
-            threshold = 3 * mad if mad > 0 else 50  # fallback threshold
-            
-            for tp in trackpoints:
-                if tp.exclude_from_hr_analysis:
-                    continue  # Already excluded
-                
-                if abs(tp.heart_rate - median_hr) > threshold:
-                    tp.exclude_from_hr_analysis = True
-                    if tp.exclusion_reason != 'hr_startup':
-                        tp.exclusion_reason = 'hr_statistical_outlier'
-        
-        # Recalculate activity HR statistics
-        valid_hr_trackpoints = [tp for tp in trackpoints if not tp.exclude_from_hr_analysis]
-        
-        if valid_hr_trackpoints:
-            activity.avg_heart_rate = int(sum(tp.heart_rate for tp in valid_hr_trackpoints) / len(valid_hr_trackpoints))
-            activity.max_heart_rate = max(tp.heart_rate for tp in valid_hr_trackpoints)
-            activity.min_heart_rate = min(tp.heart_rate for tp in valid_hr_trackpoints)
-            activity.valid_hr_trackpoints = len(valid_hr_trackpoints)
-        
-        db.commit()
-        
-        # Count exclusions
-        excluded_count = sum(1 for tp in trackpoints if tp.exclude_from_hr_analysis)
-        startup_excluded = sum(1 for tp in trackpoints if tp.exclusion_reason == 'hr_startup')
-        outlier_excluded = sum(1 for tp in trackpoints if tp.exclusion_reason == 'hr_statistical_outlier')
-        
+        ).order_by(Trackpoint.point_order)
+    )).all()
+    
+    if len(rows) < 10:
         return {
-            "success": True,
-            "message": f"Reapplied HR exclusions for activity {activity.name}",
-            "total_hr_trackpoints": len(trackpoints),
-            "excluded_trackpoints": excluded_count,
-            "startup_excluded": startup_excluded,
-            "statistical_outliers": outlier_excluded,
-            "updated_stats": {
-                "avg_hr": activity.avg_heart_rate,
-                "max_hr": activity.max_heart_rate,
-                "min_hr": activity.min_heart_rate,
-                "valid_hr_points": activity.valid_hr_trackpoints
-            }
+            "success": False,
+            "message": "Not enough HR data for exclusion analysis",
+            "trackpoints_count": len(rows)
         }
+    
+    # Startup + statistical detection in one vectorized pass off the event loop
+    exclude, reasons = await run_in_threadpool(_detect_hr_exclusions, rows)
+    
+    # Replaces every HR point's flags in a single statement
+    await db.execute(text("""
+        UPDATE trackpoints
+        SET exclude_from_hr_analysis = v.exclude,
+            exclusion_reason = v.reason
+        FROM unnest(
+            CAST(:ids AS integer[]),
+            CAST(:exclude AS boolean[]),
+            CAST(:reasons AS text[])
+        ) AS v(id, exclude, reason)
+        WHERE trackpoints.id = v.id
+    """), {"ids": [row.id for row in rows], "exclude": exclude.tolist(), "reasons": reasons.tolist()})
+    
+    # Recalculate activity HR statistics in the same transaction
+    rollup_before = training_rollups.contribution(activity)
+    _store_hr_histogram(activity, await _valid_hr_histogram(db, activity_id))
+    
+    await _mark_activity_changed(db, activity, rollup_before)
+    await db.commit()
+    await _evict_activity(activity)
+    
+    return {
+        "success": True,
+        "message": f"Reapplied HR exclusions for activity {activity.name}",
+        "total_hr_trackpoints": len(rows),
+        "excluded_trackpoints": int(np.count_nonzero(exclude)),
+        "startup_excluded": int(np.count_nonzero(reasons == 'hr_startup')),
+        "statistical_outliers": int(np.count_nonzero(reasons == 'hr_statistical_outlier')),
+        "updated_stats": {
+            "avg_hr": activity.avg_heart_rate,
+            "max_hr": activity.max_heart_rate,
+            "min_hr": activity.min_heart_rate,
+            "valid_hr_points": activity.valid_hr_trackpoints
+        }
+    }
 
 # Exclusion Range Management Endpoints
 
 @router.get("/{activity_id}/hr-exclusions/ranges")
-async def get_exclusion_ranges(activity_id: int):
+async def get_exclusion_ranges(activity_id: int, db: AsyncSession = Depends(get_db)):
     """Get all exclusion ranges for an activity"""
-    with get_sync_session() as db:
-        from ..models import ExclusionRange
-        
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
-        
-        # Get all exclusion ranges for this activity
-        ranges = db.query(ExclusionRange).filter(
+    from ..models import ExclusionRange
+    
+    activity = await db.get(Activity, activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    # All ranges with their HR point counts in one query (index range scans on elapsed_seconds).
+    # points_affected keeps measuring from the first trackpoint, as it always has
+    rows = (await db.execute(
+        select(ExclusionRange, func.count(Trackpoint.id)).outerjoin(
+            Trackpoint,
+            (Trackpoint.activity_id == ExclusionRange.activity_id)
+            & Trackpoint.heart_rate.isnot(None)
+            & Trackpoint.elapsed_seconds.between(
+                ExclusionRange.start_time_seconds, ExclusionRange.end_time_seconds
+            )
+        ).where(
             ExclusionRange.activity_id == activity_id
-        ).order_by(ExclusionRange.start_time_seconds).all()
-        
-        # Count affected points for each range
-        range_data = []
-        for range_obj in ranges:
-            # Count trackpoints that fall within this range
-            trackpoints_in_range = db.execute(text("""
-                SELECT COUNT(*) 
-                FROM trackpoints 
-                WHERE activity_id = :activity_id 
-                AND heart_rate IS NOT NULL
-                AND EXTRACT(EPOCH FROM (recorded_at - (SELECT recorded_at FROM trackpoints WHERE activity_id = :activity_id ORDER BY point_order LIMIT 1))) 
-                    BETWEEN :start_time AND :end_time
-            """), {
-                'activity_id': activity_id,
-                'start_time': range_obj.start_time_seconds,
-                'end_time': range_obj.end_time_seconds
-            }).scalar()
-            
-            range_data.append({
-                'id': range_obj.id,
-                'start_time_seconds': range_obj.start_time_seconds,
-                'end_time_seconds': range_obj.end_time_seconds,
-                'reason': range_obj.reason,
-                'exclusion_type': range_obj.exclusion_type,
-                'points_affected': trackpoints_in_range or 0,
-                'created_at': range_obj.created_at.isoformat() if range_obj.created_at else None
-            })
-        
-        return {
-            'activity_id': activity_id,
-            'ranges': range_data
-        }
+        ).group_by(ExclusionRange.id).order_by(ExclusionRange.start_time_seconds)
+    )).all()
+    
+    range_data = []
+    for range_obj, trackpoints_in_range in rows:
+        range_data.append({
+            'id': range_obj.id,
+            'start_time_seconds': range_obj.start_time_seconds,
+            'end_time_seconds': range_obj.end_time_seconds,
+            'reason': range_obj.reason,
+            'exclusion_type': range_obj.exclusion_type,
+            'points_affected': trackpoints_in_range or 0,
+            'created_at': range_obj.created_at.isoformat() if range_obj.created_at else None
+        })
+    
+    return {
+        'activity_id': activity_id,
+        'ranges': range_data
+    }
 
 @router.post("/{activity_id}/hr-exclusions/ranges")
-async def create_exclusion_range(activity_id: int, request: Request):
+async def create_exclusion_range(activity_id: int, request: Request, db: AsyncSession = Depends(get_db)):
     """Create a new exclusion range for an activity"""
     # Get raw request body
     body = await request.body()
@@ -536,153 +1198,120 @@ async def create_exclusion_range(activity_id: int, request: Request):
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid JSON in request body")
     
-    with get_sync_session() as db:
-        from ..models import ExclusionRange
-        
-        # Verify activity exists
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
-        
-        # Extract values from request dict
-        start_time = request_data.get('start_time_seconds')
-        end_time = request_data.get('end_time_seconds')
-        reason = request_data.get('reason', 'User exclusion')
-        
-        # Manual validation
-        if start_time is None or end_time is None:
-            raise HTTPException(status_code=400, detail="start_time_seconds and end_time_seconds are required")
-        
-        # Convert to integers
-        try:
-            start_time = int(start_time)
-            end_time = int(end_time)
-        except (ValueError, TypeError) as e:
-            raise HTTPException(status_code=400, detail="start_time_seconds and end_time_seconds must be integers")
-        
-        # Additional validation
-        if start_time < 0:
-            raise HTTPException(status_code=400, detail="start_time_seconds must be >= 0")
-        
-        if start_time >= end_time:
-            raise HTTPException(status_code=400, detail="start_time_seconds must be less than end_time_seconds")
-        
-        try:
-            # Create new exclusion range
-            new_range = ExclusionRange(
-                activity_id=activity_id,
-                start_time_seconds=start_time,
-                end_time_seconds=end_time,
-                reason=reason[:100] if reason else None,  # Truncate to max length
-                exclusion_type='user_range'
-            )
-            
-            db.add(new_range)
-            db.commit()
-            db.refresh(new_range)
-            
-            # Recalculate activity HR statistics
-            await _recalculate_activity_hr_stats(activity_id, db)
-            
-            return {
-                'success': True,
-                'range': {
-                    'id': new_range.id,
-                    'start_time_seconds': new_range.start_time_seconds,
-                    'end_time_seconds': new_range.end_time_seconds,
-                    'reason': new_range.reason,
-                    'exclusion_type': new_range.exclusion_type
-                }
-            }
-            
-        except Exception as e:
-            db.rollback()
-            if "uq_exclusion_ranges_activity_time_type" in str(e):
-                raise HTTPException(status_code=400, detail="Exclusion range with these times already exists")
-            raise HTTPException(status_code=500, detail=f"Failed to create exclusion range: {str(e)}")
-
-@router.delete("/{activity_id}/hr-exclusions/ranges/{range_id}")
-async def delete_exclusion_range(activity_id: int, range_id: int):
-    """Delete an exclusion range"""
-    with get_sync_session() as db:
-        from ..models import ExclusionRange
-        
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            raise HTTPException(status_code=404, detail="Activity not found")
-        
-        range_obj = db.query(ExclusionRange).filter(
-            ExclusionRange.id == range_id,
-            ExclusionRange.activity_id == activity_id
-        ).first()
-        
-        if not range_obj:
-            raise HTTPException(status_code=404, detail="Exclusion range not found")
-        
-        # Only allow deletion of user-created ranges
-        if range_obj.exclusion_type != 'user_range':
-            raise HTTPException(status_code=403, detail="Cannot delete system-generated exclusion ranges")
+    from ..models import ExclusionRange
+    
+    # Verify activity exists
+    activity = await db.get(Activity, activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
+    
+    # Extract values from request dict
+    start_time = request_data.get('start_time_seconds')
+    end_time = request_data.get('end_time_seconds')
+    reason = request_data.get('reason', 'User exclusion')
+    
+    # Manual validation
+    if start_time is None or end_time is None:
+        raise HTTPException(status_code=400, detail="start_time_seconds and end_time_seconds are required")
+    
+    # Convert to integers
+    try:
+        start_time = int(start_time)
+        end_time = int(end_time)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="start_time_seconds and end_time_seconds must be integers")
+    
+    # Additional validation
+    if start_time < 0:
+        raise HTTPException(status_code=400, detail="start_time_seconds must be >= 0")
+    
+    if start_time >= end_time:
+        raise HTTPException(status_code=400, detail="start_time_seconds must be less than end_time_seconds")
+    
+    try:
+        # Create new exclusion range
+        new_range = ExclusionRange(
+            activity_id=activity_id,
+            start_time_seconds=start_time,
+            end_time_seconds=end_time,
+            reason=reason[:100] if reason else None,  # Truncate to max length
+            exclusion_type='user_range'
+        )
         
-        db.delete(range_obj)
-        db.commit()
+        db.add(new_range)
+        await db.flush()
         
-        # Recalculate activity HR statistics
-        await _recalculate_activity_hr_stats(activity_id, db)
+        # Update activity HR statistics in the same transaction
+        rollup_before = training_rollups.contribution(activity)
+        await _update_hr_stats_for_range(db, activity, new_range, added=True)
+        await _mark_activity_changed(db, activity, rollup_before)
+        await db.commit()
+        await _evict_activity(activity)
         
         return {
             'success': True,
-            'message': f'Deleted exclusion range {range_obj.start_time_seconds}-{range_obj.end_time_seconds}s'
+            'range': {
+                'id': new_range.id,
+                'start_time_seconds': new_range.start_time_seconds,
+                'end_time_seconds': new_range.end_time_seconds,
+                'reason': new_range.reason,
+                'exclusion_type': new_range.exclusion_type
+            }
         }
+    
+    except Exception as e:
+        await db.rollback()
+        if "uq_exclusion_ranges_activity_time_type" in str(e):
+            raise HTTPException(status_code=400, detail="Exclusion range with these times already exists")
+        raise HTTPException(status_code=500, detail=f"Failed to create exclusion range: {str(e)}")
 
-async def _recalculate_activity_hr_stats(activity_id: int, db):
-    """Helper function to recalculate HR statistics considering both point and range exclusions"""
+@router.delete("/{activity_id}/hr-exclusions/ranges/{range_id}")
+async def delete_exclusion_range(activity_id: int, range_id: int, db: AsyncSession = Depends(get_db)):
+    """Delete an exclusion range"""
     from ..models import ExclusionRange
     
-    # Get all trackpoints with HR data
-    trackpoints = db.query(Trackpoint).filter(
-        Trackpoint.activity_id == activity_id,
-        Trackpoint.heart_rate.isnot(None)
-    ).order_by(Trackpoint.point_order).all()
+    activity = await db.get(Activity, activity_id)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Activity not found")
     
-    if not trackpoints:
-        return
-        
-    # Get activity start time
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
-    start_time = trackpoints[0].recorded_at
-    
-    # Get all exclusion ranges
-    exclusion_ranges = db.query(ExclusionRange).filter(
-        ExclusionRange.activity_id == activity_id
-    ).all()
-    
-    # Determine which points are excluded
-    valid_hr_values = []
-    for tp in trackpoints:
-        # Check if point is excluded by individual exclusion
-        if tp.exclude_from_hr_analysis:
-            continue
-            
-        # Check if point is excluded by range exclusion
-        point_time = (tp.recorded_at - start_time).total_seconds()
-        excluded_by_range = any(
-            range_obj.start_time_seconds <= point_time <= range_obj.end_time_seconds
-            for range_obj in exclusion_ranges
+    range_obj = (await db.execute(
+        select(ExclusionRange).where(
+            ExclusionRange.id == range_id,
+            ExclusionRange.activity_id == activity_id
         )
-        
-        if not excluded_by_range:
-            valid_hr_values.append(tp.heart_rate)
-    
-    # Update activity statistics
-    if valid_hr_values:
-        activity.avg_heart_rate = int(sum(valid_hr_values) / len(valid_hr_values))
-        activity.max_heart_rate = max(valid_hr_values)
-        activity.min_heart_rate = min(valid_hr_values)
-        activity.valid_hr_trackpoints = len(valid_hr_values)
+    )).scalars().first()
+    
+    if not range_obj:
+        raise HTTPException(status_code=404, detail="Exclusion range not found")
+    
+    # Only allow deletion of user-created ranges
+    if range_obj.exclusion_type != 'user_range':
+        raise HTTPException(status_code=403, detail="Cannot delete system-generated exclusion ranges")
+    
+    await db.delete(range_obj)
+    await db.flush()
+    
+    # Update activity HR statistics in the same transaction
+    rollup_before = training_rollups.contribution(activity)
+    await _update_hr_stats_for_range(db, activity, range_obj, added=False)
+    await _mark_activity_changed(db, activity, rollup_before)
+    await db.commit()
+    await _evict_activity(activity)
+    
+    return {
+        'success': True,
+        'message': f'Deleted exclusion range {range_obj.start_time_seconds}-{range_obj.end_time_seconds}s'
+    }
+
+async def _update_hr_stats_for_range(db: AsyncSession, activity: Activity, exclusion_range, added: bool):
+    """Apply one added/removed exclusion range to the HR histogram and stats (range state already flushed)"""
+    histogram = unpack_hr_histogram(activity.hr_histogram)
+    
+    if histogram is None:
+        # Imported before histograms were stored: one full pass, incremental afterwards
+        histogram = await _valid_hr_histogram(db, activity.id)
     else:
-        activity.avg_heart_rate = None
-        activity.max_heart_rate = None
-        activity.min_heart_rate = None
-        activity.valid_hr_trackpoints = 0
-        
-    db.commit()
\ No newline at end of file
+        delta = await _range_hr_histogram(db, activity.id, exclusion_range)
+        histogram = histogram - delta if added else histogram + delta
+    
+    _store_hr_histogram(activity, histogram)
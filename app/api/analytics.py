@@ -0,0 +1,101 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Dict, Optional
+from datetime import date, datetime, timedelta, timezone
+
+from ..core.database import get_db
+from ..models.training_load import TrainingLoadDay
+from ..models.training_rollup import TrainingRollup
+from ..services import training_load, training_rollups
+
+router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
+
+TRAINING_LOAD_DEFAULT_DAYS = 90
+TRAINING_LOAD_MAX_DAYS = 3 * 366
+
+def _rollup_summary(rollup: TrainingRollup) -> Dict:
+    hr_minutes = rollup.hr_duration_seconds / 60
+    return {
+        "period_start": rollup.period_start.isoformat(),
+        "activity_type": rollup.activity_type,
+        "activity_count": rollup.activity_count,
+        "distance_km": float(rollup.distance_km),
+        "duration_seconds": rollup.duration_seconds,
+        "elevation_gain_m": float(rollup.elevation_gain_m),
+        "hr_duration_seconds": rollup.hr_duration_seconds,
+        "hr_load": round(rollup.hr_load / 60),  # heartbeats
+        "avg_heart_rate": round(rollup.hr_load / 60 / hr_minutes) if hr_minutes else None
+    }
+
+@router.get("/rollups")
+async def get_training_rollups(user_id: int, period: str = Query("week"),
+                               activity_type: Optional[str] = None,
+                               from_date: Optional[date] = None, to_date: Optional[date] = None,
+                               db: AsyncSession = Depends(get_db)):
+    """Weekly or monthly training totals per activity type
+    
+    Read from the training_rollups table (one indexed range scan), so the
+    cost depends on the number of periods shown, not on the history size.
+    from_date / to_date select periods by their first day.
+    """
+    if period not in training_rollups.PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(training_rollups.PERIODS)}")
+    
+    query = select(TrainingRollup).where(
+        TrainingRollup.user_id == user_id,
+        TrainingRollup.period == period
+    )
+    if from_date is not None:
+        query = query.where(TrainingRollup.period_start >= training_rollups.period_start(period, from_date))
+    if to_date is not None:
+        query = query.where(TrainingRollup.period_start <= to_date)
+    if activity_type:
+        query = query.where(TrainingRollup.activity_type == activity_type)
+    
+    rollups = (await db.execute(
+        query.order_by(TrainingRollup.period_start, TrainingRollup.activity_type)
+    )).scalars().all()
+    
+    return {
+        "user_id": user_id,
+        "period": period,
+        "rollups": [_rollup_summary(rollup) for rollup in rollups]
+    }
+
+@router.get("/training-load")
+async def get_training_load(user_id: int, from_date: Optional[date] = None, to_date: Optional[date] = None,
+                            db: AsyncSession = Depends(get_db)):
+    """Daily TRIMP with fitness (CTL), fatigue (ATL) and form (TSB)
+    
+    Defaults to the last 90 days. The stored series is maintained when
+    activities change, so this reads the requested days plus one earlier row.
+    """
+    to_date = to_date or datetime.now(timezone.utc).date()
+    from_date = from_date or to_date - timedelta(days=TRAINING_LOAD_DEFAULT_DAYS - 1)
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="from_date must not be after to_date")
+    if (to_date - from_date).days >= TRAINING_LOAD_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {TRAINING_LOAD_MAX_DAYS} days per request")
+    
+    anchor = (await db.execute(
+        select(TrainingLoadDay).where(
+            TrainingLoadDay.user_id == user_id,
+            TrainingLoadDay.day < from_date
+        ).order_by(TrainingLoadDay.day.desc()).limit(1)
+    )).scalars().first()
+    stored = (await db.execute(
+        select(TrainingLoadDay).where(
+            TrainingLoadDay.user_id == user_id,
+            TrainingLoadDay.day.between(from_date, to_date)
+        )
+    )).scalars().all()
+    
+    series = training_load.daily_series(anchor, stored, from_date, to_date)
+    return {
+        "user_id": user_id,
+        "ctl_days": training_load.CTL_DAYS,
+        "atl_days": training_load.ATL_DAYS,
+        "current": series[-1],
+        "data": series
+    }
@@ -0,0 +1,111 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, text
+from typing import Optional
+
+from ..core.database import get_db
+from ..models.activity import Activity
+from ..services import tile_cache
+from ..services.track_analysis import ROUTE_SRID
+
+router = APIRouter(prefix="/api/v1/tiles", tags=["tiles"])
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+MVT_LAYER = "activities"
+MAX_ZOOM = 20
+
+# Tile grid (ST_AsMVTGeom extent) and clip buffer, in tile units
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+# Web Mercator world width in meters; a 256 px tile at zoom z spans WORLD_METERS / 2^z
+WORLD_METERS = 40075016.686
+TILE_PIXELS = 256
+
+def simplify_tolerance_m(z: int) -> float:
+    """Size of one screen pixel at zoom z: route detail below it is not visible"""
+    return WORLD_METERS / (TILE_PIXELS * 2 ** z)
+
+# Route geometries are stored in ROUTE_SRID (&& on the route GiST index), tiles are
+# rendered in Web Mercator; the envelope is widened by the clip buffer so lines
+# just outside the tile still join up with their neighbours
+_TILE_SQL = """
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(:z, :x, :y) AS env,
+               ST_Transform(ST_Expand(ST_TileEnvelope(:z, :x, :y), :buffer_m), {srid}) AS search
+    ),
+    features AS (
+        SELECT
+            a.id,
+            a.name,
+            a.activity_type,
+            a.user_id,
+            CAST(extract(epoch FROM a.start_time) AS bigint) AS start_time,
+            CAST(a.distance_km AS double precision) AS distance_km,
+            ST_AsMVTGeom(
+                ST_Simplify(ST_Transform(a.route, 3857), :tolerance_m),
+                bounds.env, {extent}, {buffer}, true
+            ) AS geom
+        FROM activities a, bounds
+        WHERE a.route && bounds.search
+          {filters}
+    )
+    SELECT ST_AsMVT(features, '{layer}', {extent}, 'geom')
+    FROM features
+    WHERE geom IS NOT NULL
+"""
+
+async def _tiles_version(db: AsyncSession, user_id: Optional[int]) -> str:
+    """Count + highest id of the scope's activities: changes with every import and delete"""
+    query = select(func.count(Activity.id), func.max(Activity.id))
+    if user_id:
+        query = query.where(Activity.user_id == user_id)
+    count, last_id = (await db.execute(query)).one()
+    return f"{count}-{last_id or 0}"
+
+@router.get("/{z}/{x}/{y}.mvt")
+async def get_tile(z: int, x: int, y: int, request: Request, user_id: Optional[int] = None,
+                   activity_type: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    """Mapbox Vector Tile with the simplified routes of all (or one user's) activities
+    
+    One "activities" layer of LineStrings with id, name, activity_type, user_id,
+    start_time (epoch seconds) and distance_km. Routes are simplified to one
+    screen pixel of the zoom level; rendered tiles are kept in the disk tile
+    cache until an activity of the user is imported or deleted.
+    """
+    if not 0 <= z <= MAX_ZOOM:
+        raise HTTPException(status_code=404, detail=f"Zoom must be between 0 and {MAX_ZOOM}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile outside the zoom level grid")
+    
+    version = await _tiles_version(db, user_id)
+    etag = f'"{version}-{activity_type or ""}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    path = tile_cache.tile_path(user_id, version, activity_type, z, x, y)
+    tile = await run_in_threadpool(tile_cache.read, path)
+    if tile is not None:
+        return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers={**headers, "X-Tile-Cache": "hit"})
+    
+    filters = []
+    params = {
+        "z": z, "x": x, "y": y,
+        "tolerance_m": simplify_tolerance_m(z),
+        "buffer_m": simplify_tolerance_m(z) * TILE_PIXELS * TILE_BUFFER / TILE_EXTENT
+    }
+    if user_id:
+        filters.append("AND a.user_id = :user_id")
+        params["user_id"] = user_id
+    if activity_type:
+        filters.append("AND a.activity_type = :activity_type")
+        params["activity_type"] = activity_type
+    
+    sql = _TILE_SQL.format(srid=ROUTE_SRID, extent=TILE_EXTENT, buffer=TILE_BUFFER,
+                           layer=MVT_LAYER, filters="\n          ".join(filters))
+    tile = bytes((await db.execute(text(sql), params)).scalar() or b"")
+    
+    await run_in_threadpool(tile_cache.write, path, tile)
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers={**headers, "X-Tile-Cache": "miss"})
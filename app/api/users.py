@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from pydantic import BaseModel, Field
 
-from ..core.database import get_sync_session
+from ..core.database import get_db
 from ..models.user import User
+from ..services import analytics_cache, hr_zones
 
 router = APIRouter(prefix="/api/v1/users", tags=["users"])
 
@@ -50,148 +53,167 @@ class HRZonesResponse(BaseModel):
     vo2max: dict
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def create_user(user_data: UserCreate):
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Create a new user profile"""
     
-    with get_sync_session() as db:
-        # Check if email already exists
-        if user_data.email:
-            existing_user = db.query(User).filter(User.email == user_data.email).first()
-            if existing_user:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="User with this email already exists"
-                )
-        
-        # Validate HR values
-        if user_data.hr_max and user_data.hr_resting:
-            if user_data.hr_resting >= user_data.hr_max:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Resting heart rate must be lower than maximum heart rate"
-                )
-        
-        db_user = User(**user_data.dict())
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        
-        return db_user
+    # Check if email already exists
+    if user_data.email:
+        existing_user = (await db.execute(
+            select(User).where(User.email == user_data.email)
+        )).scalars().first()
+        if existing_user:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User with this email already exists"
+            )
+    
+    # Validate HR values
+    if user_data.hr_max and user_data.hr_resting:
+        if user_data.hr_resting >= user_data.hr_max:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Resting heart rate must be lower than maximum heart rate"
+            )
+    
+    db_user = User(**user_data.dict())
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    
+    return db_user
 
 @router.get("/", response_model=list[UserResponse])
-async def list_users():
+async def list_users(db: AsyncSession = Depends(get_db)):
     """List all users (for now, later add pagination)"""
-    with get_sync_session() as db:
-        users = db.query(User).filter(User.is_active == True).all()
-        return users
+    users = (await db.execute(select(User).where(User.is_active == True))).scalars().all()
+    return users
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """Get user by ID"""
-    with get_sync_session() as db:
-        user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        return user
+    user = (await db.execute(
+        select(User).where(User.id == user_id, User.is_active == True)
+    )).scalars().first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return user
 
 @router.put("/{user_id}", response_model=UserResponse)
-async def update_user(user_id: int, user_data: UserUpdate):
+async def update_user(user_id: int, user_data: UserUpdate, background_tasks: BackgroundTasks,
+                      db: AsyncSession = Depends(get_db)):
     """Update user profile"""
-    with get_sync_session() as db:
-        user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
+    user = (await db.execute(
+        select(User).where(User.id == user_id, User.is_active == True)
+    )).scalars().first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    update_data = user_data.dict(exclude_unset=True)
+    
+    # Validate HR values if both are being updated
+    hr_max = update_data.get("hr_max", user.hr_max)
+    hr_resting = update_data.get("hr_resting", user.hr_resting)
+    
+    if hr_max and hr_resting and hr_resting >= hr_max:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Resting heart rate must be lower than maximum heart rate"
+        )
+    
+    # Check email uniqueness if updating email
+    if "email" in update_data and update_data["email"]:
+        existing_user = (await db.execute(
+            select(User).where(
+                User.email == update_data["email"],
+                User.id != user_id
             )
-        
-        update_data = user_data.dict(exclude_unset=True)
-        
-        # Validate HR values if both are being updated
-        hr_max = update_data.get("hr_max", user.hr_max)
-        hr_resting = update_data.get("hr_resting", user.hr_resting)
-        
-        if hr_max and hr_resting and hr_resting >= hr_max:
+        )).scalars().first()
+        if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Resting heart rate must be lower than maximum heart rate"
+                detail="User with this email already exists"
             )
-        
-        # Check email uniqueness if updating email
-        if "email" in update_data and update_data["email"]:
-            existing_user = db.query(User).filter(
-                User.email == update_data["email"],
-                User.id != user_id
-            ).first()
-            if existing_user:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="User with this email already exists"
-                )
-        
-        for field, value in update_data.items():
-            setattr(user, field, value)
-        
-        db.commit()
-        db.refresh(user)
-        
-        return user
+    
+    # Zone-based metrics of all activities depend on the HR profile
+    hr_profile_changed = any(
+        field in update_data and update_data[field] != getattr(user, field)
+        for field in ("hr_max", "hr_resting", "birth_year")
+    )
+    
+    for field, value in update_data.items():
+        setattr(user, field, value)
+    
+    if hr_profile_changed:
+        await analytics_cache.invalidate_user(db, user_id, analytics_cache.HR_PROFILE_METRICS, commit=False)
+    
+    await db.commit()
+    await db.refresh(user)
+    
+    # Recompute zone distributions of all activities in bulk after the response
+    if hr_profile_changed:
+        background_tasks.add_task(hr_zones.recompute_user_hr_zones, user_id)
+    
+    return user
 
 @router.get("/{user_id}/hr-zones", response_model=HRZonesResponse)
-async def get_user_hr_zones(user_id: int):
+async def get_user_hr_zones(user_id: int, db: AsyncSession = Depends(get_db)):
     """Get user's HR zones based on their profile"""
-    with get_sync_session() as db:
-        user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        hr_zones = user.hr_zones
-        if not hr_zones:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot calculate HR zones. Please set your maximum heart rate or age."
-            )
-        
-        return hr_zones
+    user = (await db.execute(
+        select(User).where(User.id == user_id, User.is_active == True)
+    )).scalars().first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    hr_zones = user.hr_zones
+    if not hr_zones:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot calculate HR zones. Please set your maximum heart rate or age."
+        )
+    
+    return hr_zones
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: int):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """Soft delete user"""
-    with get_sync_session() as db:
-        user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        user.is_active = False
-        db.commit()
+    user = (await db.execute(
+        select(User).where(User.id == user_id, User.is_active == True)
+    )).scalars().first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    user.is_active = False
+    await db.commit()
 
 # Convenience endpoint to get/create default user
 @router.get("/default/profile", response_model=UserResponse)
-async def get_or_create_default_user():
+async def get_or_create_default_user(db: AsyncSession = Depends(get_db)):
     """Get or create a default user profile for single-user setup"""
     
-    with get_sync_session() as db:
-        # Look for existing default user
-        user = db.query(User).filter(User.is_active == True).first()
-        
-        if not user:
-            # Create default user
-            user = User(
-                name="Default User",
-                default_activity_type="running",
-                use_metric_units=True
-            )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-        
-        return user
\ No newline at end of file
+    # Look for existing default user
+    user = (await db.execute(select(User).where(User.is_active == True))).scalars().first()
+    
+    if not user:
+        # Create default user
+        user = User(
+            name="Default User",
+            default_activity_type="running",
+            use_metric_units=True
+        )
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+    
+    return user
\ No newline at end of file
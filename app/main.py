@@ -2,13 +2,23 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from .api.activities import router as activities_router
+from .api.analytics import router as analytics_router
+from .api.tiles import router as tiles_router
 from .api.users import router as users_router
+from .core.database import get_pool_stats, dispose_engines
+from .services import analytics_cache, response_cache
 
 app = FastAPI(title="Sporter", description="GPX Training Analysis Platform")
 
 # Include API routes
 app.include_router(activities_router)
 app.include_router(users_router)
+app.include_router(analytics_router)
+app.include_router(tiles_router)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await dispose_engines()
 
 # Serve static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -20,4 +30,17 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/health/db")
+async def health_db():
+    """Connection pool statistics for this worker"""
+    return {"pool": get_pool_stats()}
+
+@app.get("/health/cache")
+async def health_cache():
+    """Analytics and response cache hit/miss counters for this worker"""
+    return {
+        "analytics_cache": analytics_cache.get_stats(),
+        "response_cache": response_cache.get_stats()
+    }
\ No newline at end of file
@@ -4,5 +4,8 @@ from .trackpoint import Trackpoint
 from .analysis_segment import AnalysisSegment
 from .analytics_cache import AnalyticsCache
 from .exclusion_range import ExclusionRange
+from .import_job import ImportJob
+from .training_rollup import TrainingRollup
+from .training_load import TrainingLoadDay
 
-__all__ = ["User", "Activity", "Trackpoint", "AnalysisSegment", "AnalyticsCache", "ExclusionRange"]
\ No newline at end of file
+__all__ = ["User", "Activity", "Trackpoint", "AnalysisSegment", "AnalyticsCache", "ExclusionRange", "ImportJob", "TrainingRollup", "TrainingLoadDay"]
\ No newline at end of file
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, DECIMAL, ForeignKey, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, TIMESTAMP, DECIMAL, ForeignKey, Index, LargeBinary, func
+from sqlalchemy.orm import deferred, relationship
+from geoalchemy2 import Geometry
 from ..core.database import Base
 
 class Activity(Base):
@@ -26,6 +27,17 @@ class Activity(Base):
     gpx_file_path = Column(String(500))
     total_trackpoints = Column(Integer)
     valid_hr_trackpoints = Column(Integer)
+    hr_histogram = Column(LargeBinary)  # liczba ważnych odczytów HR na bpm (uint32 LE) - przyrostowe statystyki
+    trimp = Column(Float)  # obciążenie treningowe (TRIMP ze stref HR użytkownika), NULL bez profilu HR
+    
+    # Uproszczona trasa (Douglas-Peucker, ROUTE_TOLERANCE_M) i jej bbox - wyszukiwanie przestrzenne
+    # (deferred: ładowane tylko w zapytaniach przestrzennych, nie z każdą aktywnością)
+    route = deferred(Column(Geometry('LINESTRING', srid=4326)))
+    bbox = deferred(Column(Geometry('POLYGON', srid=4326)))
+    
+    # Deduplikacja importów
+    content_sha256 = Column(String(64))   # SHA-256 of the raw GPX bytes
+    track_signature = Column(String(64))  # SHA-256 of start time + first/last coordinates
     
     created_at = Column(TIMESTAMP(timezone=True), default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), default=func.now(), onupdate=func.now())
@@ -35,4 +47,11 @@ class Activity(Base):
     trackpoints = relationship("Trackpoint", back_populates="activity", cascade="all, delete-orphan")
     analysis_segments = relationship("AnalysisSegment", back_populates="activity", cascade="all, delete-orphan")
     analytics_cache = relationship("AnalyticsCache", back_populates="activity", cascade="all, delete-orphan")
-    exclusion_ranges = relationship("ExclusionRange", back_populates="activity", cascade="all, delete-orphan")
\ No newline at end of file
+    exclusion_ranges = relationship("ExclusionRange", back_populates="activity", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index('ix_sporter_activities_user_content_sha256', 'user_id', 'content_sha256'),
+        Index('ix_sporter_activities_user_track_signature', 'user_id', 'track_signature'),
+        Index('ix_sporter_activities_route_gist', 'route', postgresql_using='gist'),
+        Index('ix_sporter_activities_bbox_gist', 'bbox', postgresql_using='gist'),
+    )
\ No newline at end of file
@@ -10,6 +10,7 @@ class AnalyticsCache(Base):
     activity_id = Column(Integer, ForeignKey("activities.id", ondelete="CASCADE"), nullable=False)
     metric_type = Column(String(100), nullable=False)  # 'hr_zones', 'pace_analysis', 'elevation_profile'
     parameters = Column(JSONB)  # parametry analizy (np. strefy HR, filtry)
+    parameters_hash = Column(String(64), nullable=False)  # SHA-256 parametrów - klucz cache
     computed_data = Column(JSONB)  # wyniki analizy
     cache_version = Column(Integer, default=1)
     computed_at = Column(TIMESTAMP(timezone=True), default=func.now())
@@ -18,7 +19,7 @@ class AnalyticsCache(Base):
     # Relationship
     activity = relationship("Activity", back_populates="analytics_cache")
     
-    # Index for lookup with unique name
+    # Cache key (unique, used for upserts)
     __table_args__ = (
-        Index('ix_sporter_analytics_cache_lookup', 'activity_id', 'metric_type', 'parameters'),
+        Index('ix_sporter_analytics_cache_key', 'activity_id', 'metric_type', 'parameters_hash', 'cache_version', unique=True),
     )
\ No newline at end of file
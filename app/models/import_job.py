@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, Index, func
+from sqlalchemy.orm import relationship
+from ..core.database import Base
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    file_path = Column(String(500), nullable=False)        # stored upload, processed by worker
+    original_filename = Column(String(255))
+    status = Column(String(20), nullable=False, default='queued')  # queued, running, done, failed
+    activity_id = Column(Integer, ForeignKey("activities.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    
+    created_at = Column(TIMESTAMP(timezone=True), default=func.now())
+    started_at = Column(TIMESTAMP(timezone=True))
+    finished_at = Column(TIMESTAMP(timezone=True))
+    
+    # Relationships
+    user = relationship("User")
+    activity = relationship("Activity")
+    
+    # Workers claim the oldest queued job
+    __table_args__ = (
+        Index('ix_import_jobs_status_id', 'status', 'id'),
+    )
+    
+    def __repr__(self):
+        return f"<ImportJob(id={self.id}, status={self.status}, file={self.original_filename})>"
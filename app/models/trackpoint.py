@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, DECIMAL, Boolean, Text, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, TIMESTAMP, DECIMAL, Boolean, Text, ForeignKey, Index, Float
 from sqlalchemy.orm import relationship
 from geoalchemy2 import Geometry
 from ..core.database import Base
@@ -12,6 +12,7 @@ class Trackpoint(Base):
     coordinates = Column(Geometry('POINT'), nullable=False)  # PostGIS POINT(longitude, latitude)
     elevation = Column(DECIMAL(7, 2))
     recorded_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    elapsed_seconds = Column(Float)  # sekundy od pierwszego punktu aktywności - filtry czasowe po indeksie
     
     # Sensor data
     heart_rate = Column(Integer)
@@ -28,8 +29,12 @@ class Trackpoint(Base):
     # Automatyczne znaczniki
     is_stationary = Column(Boolean, default=False)
     distance_from_previous_m = Column(DECIMAL(8, 3))
+    cumulative_distance_m = Column(DECIMAL(10, 3))  # dystans od startu aktywności
     time_gap_seconds = Column(Integer)
     
+    # Poziom szczegółowości mapy: największa tolerancja Douglas-Peucker (m), przy której punkt zostaje
+    simplify_tolerance_m = Column(Float)  # NULL = nie policzone (stare importy)
+    
     created_at = Column(TIMESTAMP(timezone=True), default="now()")
     
     # Relationship
@@ -41,4 +46,6 @@ class Trackpoint(Base):
         Index('ix_sporter_trackpoints_coords_gist', 'coordinates', postgresql_using='gist'),
         Index('ix_sporter_trackpoints_recorded_at', 'recorded_at'),
         Index('ix_sporter_trackpoints_hr_analysis', 'activity_id', 'exclude_from_hr_analysis'),
+        Index('ix_sporter_trackpoints_activity_simplify', 'activity_id', 'simplify_tolerance_m'),
+        Index('ix_sporter_trackpoints_activity_elapsed', 'activity_id', 'elapsed_seconds'),
     )
\ No newline at end of file
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey, Index
+from ..core.database import Base
+
+class TrainingLoadDay(Base):
+    """Daily TRIMP sum with fitness (CTL) and fatigue (ATL) at the end of the day.
+
+    Only days that had activities are stored; values between them decay
+    exponentially (see services.training_load).
+    """
+    __tablename__ = "training_load_days"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)  # dzień startu aktywności (UTC)
+    trimp = Column(Float, nullable=False, default=0)  # suma TRIMP aktywności z tego dnia
+    ctl = Column(Float, nullable=False, default=0)    # chronic training load - EWMA 42 dni
+    atl = Column(Float, nullable=False, default=0)    # acute training load - EWMA 7 dni
+    
+    # Upsert key and range scans of the series
+    __table_args__ = (
+        Index('ix_training_load_days_user_day', 'user_id', 'day', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<TrainingLoadDay(user_id={self.user_id}, {self.day}, trimp={self.trimp:.1f})>"
\ No newline at end of file
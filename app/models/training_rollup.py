@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DECIMAL, TIMESTAMP, ForeignKey, Index, func
+from ..core.database import Base
+
+class TrainingRollup(Base):
+    """Activity totals per user × period × activity type, maintained incrementally"""
+    __tablename__ = "training_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    period = Column(String(10), nullable=False)         # 'week' (od poniedziałku) lub 'month'
+    period_start = Column(Date, nullable=False)         # pierwszy dzień okresu (UTC)
+    activity_type = Column(String(50), nullable=False)  # 'other' gdy aktywność nie ma typu
+    
+    # Sumy aktywności z okresu
+    activity_count = Column(Integer, nullable=False, default=0)
+    distance_km = Column(DECIMAL(12, 3), nullable=False, default=0)
+    duration_seconds = Column(BigInteger, nullable=False, default=0)
+    elevation_gain_m = Column(DECIMAL(12, 2), nullable=False, default=0)
+    hr_duration_seconds = Column(BigInteger, nullable=False, default=0)  # czas aktywności z pomiarem HR
+    hr_load = Column(BigInteger, nullable=False, default=0)  # suma duration_seconds × avg HR (uderzenia × 60)
+    
+    updated_at = Column(TIMESTAMP(timezone=True), default=func.now(), onupdate=func.now())
+    
+    # Upsert key; also serves user/period range scans of the dashboard
+    __table_args__ = (
+        Index('ix_training_rollups_key', 'user_id', 'period', 'period_start', 'activity_type', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<TrainingRollup(user_id={self.user_id}, {self.period} {self.period_start}, {self.activity_type}, {self.activity_count})>"
\ No newline at end of file
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+import hashlib
+import inspect
+import json
+import threading
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.activity import Activity
+from ..models.analytics_cache import AnalyticsCache
+
+# Bump to drop every cached result after an analysis algorithm changes
+CACHE_VERSION = 1
+
+# Metrics depending on the user's HR profile (hr_max / hr_resting / birth_year)
+HR_PROFILE_METRICS = ('hr_zones',)
+
+# Per-process hit/miss counters (exposed by /health/cache)
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _count(metric_type: str, event: str, amount: int = 1) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(metric_type, {"hits": 0, "misses": 0, "invalidations": 0})
+        counters[event] += amount
+
+
+def get_stats() -> Dict:
+    """Hit/miss counters of this process, in total and per metric type"""
+    with _stats_lock:
+        by_metric = {metric: dict(counters) for metric, counters in _stats.items()}
+    hits = sum(counters["hits"] for counters in by_metric.values())
+    misses = sum(counters["misses"] for counters in by_metric.values())
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        "by_metric": by_metric
+    }
+
+
+def parameters_hash(parameters: Optional[Dict]) -> str:
+    """Stable SHA-256 of analysis parameters (key order independent)"""
+    canonical = json.dumps(parameters or {}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _row(activity_id: int, metric_type: str, key_hash: str, parameters: Optional[Dict], result: Any,
+         now: datetime, ttl_seconds: Optional[int]) -> Dict:
+    return {
+        "activity_id": activity_id,
+        "metric_type": metric_type,
+        "parameters_hash": key_hash,
+        "cache_version": CACHE_VERSION,
+        "parameters": parameters or {},
+        "computed_data": result,
+        "computed_at": now,
+        "expires_at": now + timedelta(seconds=ttl_seconds) if ttl_seconds else None
+    }
+
+
+def _upsert(rows: List[Dict]):
+    query = insert(AnalyticsCache).values(rows)
+    return query.on_conflict_do_update(
+        index_elements=['activity_id', 'metric_type', 'parameters_hash', 'cache_version'],
+        set_={column: query.excluded[column] for column in ('parameters', 'computed_data', 'computed_at', 'expires_at')}
+    )
+
+
+async def get_or_compute(db: AsyncSession, activity_id: int, metric_type: str, parameters: Optional[Dict],
+                         compute: Callable[[], Any], ttl_seconds: Optional[int] = None, commit: bool = True) -> Any:
+    """Return the cached result for (activity, metric, parameters, version) or compute and store it.
+
+    compute may be a plain function or a coroutine function and must return
+    JSON-serializable data. With commit=False a computed result is only
+    written to the session and the caller owns the transaction.
+    """
+    key_hash = parameters_hash(parameters)
+    now = datetime.now(timezone.utc)
+
+    cached = (await db.execute(
+        select(AnalyticsCache.computed_data).where(
+            AnalyticsCache.activity_id == activity_id,
+            AnalyticsCache.metric_type == metric_type,
+            AnalyticsCache.parameters_hash == key_hash,
+            AnalyticsCache.cache_version == CACHE_VERSION,
+            or_(AnalyticsCache.expires_at.is_(None), AnalyticsCache.expires_at > now)
+        )
+    )).first()
+    if cached is not None:
+        _count(metric_type, "hits")
+        return cached.computed_data
+
+    _count(metric_type, "misses")
+    result = compute()
+    if inspect.isawaitable(result):
+        result = await result
+
+    await db.execute(_upsert([_row(activity_id, metric_type, key_hash, parameters, result, now, ttl_seconds)]))
+    if commit:
+        await db.commit()
+
+    return result
+
+
+async def store_many(db: AsyncSession, metric_type: str, parameters: Optional[Dict], results: Dict[int, Any],
+                     ttl_seconds: Optional[int] = None, commit: bool = True) -> int:
+    """Store precomputed results of many activities ({activity_id: result}) in one statement"""
+    if not results:
+        return 0
+    key_hash = parameters_hash(parameters)
+    now = datetime.now(timezone.utc)
+    await db.execute(_upsert([
+        _row(activity_id, metric_type, key_hash, parameters, result, now, ttl_seconds)
+        for activity_id, result in results.items()
+    ]))
+    if commit:
+        await db.commit()
+    return len(results)
+
+
+async def invalidate(db: AsyncSession, activity_id: int, metric_types: Optional[Iterable[str]] = None,
+                     commit: bool = True) -> int:
+    """Drop cached results of an activity (all metrics or the given ones)"""
+    query = delete(AnalyticsCache).where(AnalyticsCache.activity_id == activity_id)
+    if metric_types is not None:
+        query = query.where(AnalyticsCache.metric_type.in_(tuple(metric_types)))
+
+    result = await db.execute(query.returning(AnalyticsCache.metric_type))
+    removed = result.scalars().all()
+    if commit:
+        await db.commit()
+
+    for metric_type in removed:
+        _count(metric_type, "invalidations")
+    return len(removed)
+
+
+async def invalidate_user(db: AsyncSession, user_id: int, metric_types: Optional[Iterable[str]] = None,
+                          commit: bool = True) -> int:
+    """Drop cached results of all activities of a user (e.g. after an HR profile change)"""
+    query = delete(AnalyticsCache).where(
+        AnalyticsCache.activity_id.in_(select(Activity.id).where(Activity.user_id == user_id))
+    )
+    if metric_types is not None:
+        query = query.where(AnalyticsCache.metric_type.in_(tuple(metric_types)))
+
+    result = await db.execute(query.returning(AnalyticsCache.metric_type))
+    removed = result.scalars().all()
+    if commit:
+        await db.commit()
+
+    for metric_type in removed:
+        _count(metric_type, "invalidations")
+    return len(removed)
@@ -14,12 +14,12 @@ class GPXService:
         self.db = db
         self.parser = GPXParser()
     
-    def import_gpx_file(self, file_path: str, user_id: int = 1) -> Activity:
+    def import_gpx_file(self, file_path: str, user_id: int = 1, commit: bool = True) -> Activity:
         """Import GPX file using existing parser logic"""
         
         # Use existing GPXImporter from CLI script
         importer = GPXImporter(self.db)
-        activity = importer.import_file(file_path, user_id)
+        activity = importer.import_file(file_path, user_id, commit=commit)
         
         return activity
     
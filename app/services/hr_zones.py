@@ -0,0 +1,153 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+import logging
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_async_session_local
+from ..models.activity import Activity
+from ..models.exclusion_range import ExclusionRange
+from ..models.trackpoint import Trackpoint
+from ..models.user import User
+from . import analytics_cache, response_cache, training_load
+from .track_analysis import hr_zone_breakdown
+
+logger = logging.getLogger(__name__)
+
+METRIC_TYPE = "hr_zones"
+
+# Activities loaded per query by the bulk recompute (bounds memory for long histories)
+RECOMPUTE_BATCH_ACTIVITIES = 25
+
+
+def zone_parameters(zones: Dict) -> Dict:
+    """Analytics cache parameters: the zone bounds the distribution was computed with"""
+    return {"zones": {key: [zone["min"], zone["max"]] for key, zone in zones.items()}}
+
+
+async def _load_inputs(db: AsyncSession, activity_ids: List[int]) -> Dict[int, Dict]:
+    """Per-activity NumPy inputs of hr_zone_breakdown, two queries for the whole batch"""
+    rows = (await db.execute(
+        select(
+            Trackpoint.activity_id,
+            Trackpoint.elapsed_seconds,
+            Trackpoint.heart_rate,
+            Trackpoint.distance_from_previous_m,
+            Trackpoint.exclude_from_hr_analysis
+        ).where(
+            Trackpoint.activity_id.in_(activity_ids)
+        ).order_by(Trackpoint.activity_id, Trackpoint.point_order)
+    )).all()
+
+    ranges: Dict[int, list] = {activity_id: [] for activity_id in activity_ids}
+    for r in (await db.execute(
+        select(ExclusionRange.activity_id, ExclusionRange.start_time_seconds, ExclusionRange.end_time_seconds)
+        .where(ExclusionRange.activity_id.in_(activity_ids))
+    )).all():
+        ranges[r.activity_id].append((r.start_time_seconds, r.end_time_seconds))
+
+    def column(index: int) -> np.ndarray:
+        return np.array([np.nan if row[index] is None else float(row[index]) for row in rows], dtype=np.float64)
+
+    owner = np.array([row.activity_id for row in rows], dtype=np.int64)
+    elapsed, heart_rate, distance = column(1), column(2), column(3)
+    excluded = np.array([bool(row.exclude_from_hr_analysis) for row in rows], dtype=bool)
+
+    # Rows are grouped by activity: split at the boundaries
+    inputs = {}
+    bounds = np.flatnonzero(np.diff(owner)) + 1
+    for start, end in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(rows)]])):
+        if start == end:
+            continue
+        activity_id = int(owner[start])
+        inputs[activity_id] = {
+            "elapsed_seconds": elapsed[start:end],
+            "heart_rate": heart_rate[start:end],
+            "distance_m": distance[start:end],
+            "excluded": excluded[start:end],
+            "exclusion_ranges": ranges[activity_id]
+        }
+    return inputs
+
+
+def _compute_many(zones: Dict, activity_ids: Iterable[int], inputs: Dict[int, Dict]) -> Dict[int, Dict]:
+    empty = np.empty(0, dtype=np.float64)
+    results = {}
+    for activity_id in activity_ids:
+        data = inputs.get(activity_id) or {
+            "elapsed_seconds": empty, "heart_rate": empty, "distance_m": empty,
+            "excluded": np.empty(0, dtype=bool), "exclusion_ranges": []
+        }
+        results[activity_id] = hr_zone_breakdown(zones, **data)
+    return results
+
+
+async def user_zones(db: AsyncSession, user_id: Optional[int]) -> Optional[Dict]:
+    user = await db.get(User, user_id) if user_id else None
+    return user.hr_zones if user else None
+
+
+async def refresh_activity(db: AsyncSession, activity: Activity) -> Optional[float]:
+    """Recompute the zone distribution after an HR re-analysis (caller commits).
+
+    Stores it in the analytics cache and returns the activity's new TRIMP
+    (None without an HR profile).
+    """
+    zones = await user_zones(db, activity.user_id)
+    if not zones:
+        return None
+    inputs = await _load_inputs(db, [activity.id])
+    distribution = (await run_in_threadpool(_compute_many, zones, [activity.id], inputs))[activity.id]
+    await analytics_cache.store_many(db, METRIC_TYPE, zone_parameters(zones), {activity.id: distribution},
+                                     commit=False)
+    return distribution["trimp"]
+
+
+async def activity_hr_zones(db: AsyncSession, activity_id: int, zones: Dict) -> Dict:
+    """Zone distribution of one activity, from the analytics cache when present"""
+    async def compute() -> Dict:
+        inputs = await _load_inputs(db, [activity_id])
+        return (await run_in_threadpool(_compute_many, zones, [activity_id], inputs))[activity_id]
+
+    return await analytics_cache.get_or_compute(db, activity_id, METRIC_TYPE, zone_parameters(zones), compute)
+
+
+async def recompute_user_hr_zones(user_id: int) -> int:
+    """Background job after an HR profile change: recompute the zone distribution
+    and TRIMP of every activity of the user in batches (one load, one cache
+    upsert and one TRIMP update per RECOMPUTE_BATCH_ACTIVITIES activities),
+    then rebuild the user's fitness/fatigue series
+    """
+    async with get_async_session_local()() as db:
+        zones = await user_zones(db, user_id)
+        parameters = zone_parameters(zones) if zones else None
+
+        activity_ids = (await db.execute(
+            select(Activity.id).where(Activity.user_id == user_id).order_by(Activity.id)
+        )).scalars().all()
+
+        for offset in range(0, len(activity_ids), RECOMPUTE_BATCH_ACTIVITIES):
+            batch = list(activity_ids[offset:offset + RECOMPUTE_BATCH_ACTIVITIES])
+            results = {}
+            if zones:
+                inputs = await _load_inputs(db, batch)
+                results = await run_in_threadpool(_compute_many, zones, batch, inputs)
+                await analytics_cache.store_many(db, METRIC_TYPE, parameters, results, commit=False)
+
+            await db.execute(
+                update(Activity),
+                [{"id": activity_id, "trimp": results[activity_id]["trimp"] if results else None,
+                  "updated_at": datetime.now(timezone.utc)} for activity_id in batch]
+            )
+            await db.commit()
+            await response_cache.invalidate(*(response_cache.activity_tag(activity_id) for activity_id in batch))
+
+        await response_cache.invalidate(*response_cache.activity_list_tags(user_id))
+        days = await training_load.rebuild_user(db, user_id)
+
+        logger.info("HR zones and TRIMP recomputed for %d activities of user %s (%d training load days)",
+                    len(activity_ids), user_id, days)
+        return len(activity_ids)
@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+import logging
+import os
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import get_sync_session
+from ..models.activity import Activity
+from ..models.import_job import ImportJob
+from . import tile_cache
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Advisory lock key serializing enqueue depth checks
+_ENQUEUE_LOCK_KEY = 0x5350_4F52  # "SPOR"
+
+
+class ImportQueueFull(Exception):
+    """Raised when the import queue already holds import_queue_max_depth jobs"""
+
+    def __init__(self, depth: int):
+        super().__init__(f"Import queue is full ({depth} jobs pending)")
+        self.depth = depth
+
+
+async def queue_depth(db: AsyncSession) -> int:
+    """Number of queued or running import jobs"""
+    return (await db.execute(
+        select(func.count(ImportJob.id)).where(ImportJob.status.in_(ACTIVE_STATUSES))
+    )).scalar() or 0
+
+
+async def find_active_job(db: AsyncSession, user_id: int, file_path: str) -> Optional[ImportJob]:
+    """Queued/running job for the same stored file, if any"""
+    return (await db.execute(
+        select(ImportJob).where(
+            ImportJob.user_id == user_id,
+            ImportJob.file_path == file_path,
+            ImportJob.status.in_(ACTIVE_STATUSES)
+        )
+    )).scalars().first()
+
+
+async def enqueue_import(db: AsyncSession, user_id: int, file_path: str,
+                         original_filename: Optional[str] = None) -> ImportJob:
+    """Insert a queued job, enforcing the maximum queue depth"""
+    # Serialize depth check + insert so concurrent uploads cannot overshoot the bound
+    await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ENQUEUE_LOCK_KEY})
+
+    depth = await queue_depth(db)
+    if depth >= settings.import_queue_max_depth:
+        await db.rollback()
+        raise ImportQueueFull(depth)
+
+    job = ImportJob(
+        user_id=user_id,
+        file_path=file_path,
+        original_filename=original_filename,
+        status='queued'
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    return job
+
+
+def job_to_dict(job: ImportJob, activity: Optional[Activity] = None) -> Dict:
+    """Serialize job status (with imported activity stats when done)"""
+    data = {
+        "job_id": job.id,
+        "status": job.status,
+        "filename": job.original_filename,
+        "activity_id": job.activity_id,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+    if activity is not None:
+        data["message"] = f"Successfully imported {activity.name}"
+        data["stats"] = {
+            "distance_km": float(activity.distance_km) if activity.distance_km else 0,
+            "duration_seconds": activity.duration_seconds,
+            "trackpoints": activity.total_trackpoints,
+            "avg_heart_rate": activity.avg_heart_rate
+        }
+    return data
+
+
+# Worker side (sync engine, runs in worker processes)
+
+def claim_next_job(db: Session) -> Optional[int]:
+    """Atomically mark the oldest queued job as running and return its id"""
+    job = db.execute(
+        select(ImportJob)
+        .where(ImportJob.status == 'queued')
+        .order_by(ImportJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalars().first()
+
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = 'running'
+    job.started_at = datetime.now(timezone.utc)
+    job.attempts = (job.attempts or 0) + 1
+    db.commit()
+
+    return job.id
+
+
+def requeue_stale_jobs(db: Session, timeout_seconds: int) -> int:
+    """Put jobs left 'running' by a dead worker back in the queue"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=timeout_seconds)
+    result = db.execute(
+        update(ImportJob)
+        .where(ImportJob.status == 'running', ImportJob.started_at < cutoff)
+        .values(status='queued')
+    )
+    db.commit()
+    return result.rowcount
+
+
+def run_import_job(job_id: int) -> None:
+    """Run the GPX parse + import pipeline for one claimed job"""
+    from .gpx_service import GPXService
+
+    with get_sync_session() as db:
+        job = db.get(ImportJob, job_id)
+        if job is None or job.status != 'running':
+            return
+
+        try:
+            service = GPXService(db)
+            activity = service.import_gpx_file(job.file_path, user_id=job.user_id, commit=False)
+
+            # Activity, trackpoints and job status commit together
+            job.status = 'done'
+            job.activity_id = activity.id
+            job.error = None
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            tile_cache.invalidate_user(job.user_id)
+
+        except Exception as e:
+            db.rollback()
+            logger.exception("Import job %s failed", job_id)
+
+            job = db.get(ImportJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)[:1000]
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+
+            # Clean up file on error
+            if job.file_path and os.path.exists(job.file_path):
+                os.unlink(job.file_path)
+                try:
+                    os.rmdir(os.path.dirname(job.file_path))
+                except OSError:
+                    pass
@@ -0,0 +1,242 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from ..core.config import settings
+
+# Two-tier cache of serialized API responses:
+#   1. bounded LRU in this worker process (entries and bytes)
+#   2. Redis shared by all workers (settings.redis_url)
+# Keys embed the version of the cached data (e.g. Activity.updated_at), so a
+# change seen by any worker makes stale entries unreachable everywhere; tags
+# let the writing worker also drop them eagerly from both tiers.
+KEY_PREFIX = "sporter:response:v1"
+
+logger = logging.getLogger(__name__)
+
+# Seconds to skip Redis after a connection error
+_REDIS_RETRY_SECONDS = 30
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    media_type: Optional[str]
+    headers: Dict[str, str] = field(default_factory=dict)
+    tags: FrozenSet[str] = frozenset()
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def dumps(self) -> bytes:
+        header = json.dumps({"media_type": self.media_type, "headers": self.headers, "tags": sorted(self.tags)})
+        return header.encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, data: bytes) -> "CachedResponse":
+        header, body = data.split(b"\n", 1)
+        meta = json.loads(header)
+        return cls(body=body, media_type=meta["media_type"], headers=meta["headers"], tags=frozenset(meta["tags"]))
+
+
+class LRUCache:
+    """Thread-safe LRU bounded by entry count and total body bytes"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        tags = set(tags)
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.tags & tags]
+            for key in keys:
+                self._bytes -= self._entries.pop(key).size
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions
+            }
+
+
+_local = LRUCache(settings.response_cache_max_entries, settings.response_cache_max_bytes)
+
+_redis = None
+_redis_retry_at = 0.0
+_redis_down = False  # logged once per outage
+
+_stats_lock = threading.Lock()
+_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0, "redis_errors": 0}
+
+
+def _count(event: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[event] += amount
+
+
+def get_stats() -> Dict:
+    """Hit/miss counters and local tier usage of this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+    hits = stats["local_hits"] + stats["redis_hits"]
+    return {
+        **stats,
+        "enabled": settings.response_cache_enabled,
+        "redis_enabled": settings.response_cache_redis_enabled,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        "local": _local.stats()
+    }
+
+
+def make_key(namespace: str, version: str, *parts) -> str:
+    """Cache key for a response of namespace (e.g. activity:12) at a data version"""
+    digest = hashlib.sha256(json.dumps(parts, default=str, separators=(',', ':')).encode()).hexdigest()
+    return f"{KEY_PREFIX}:{namespace}:{version}:{digest[:32]}"
+
+
+def _tag_key(tag: str) -> str:
+    return f"{KEY_PREFIX}:tag:{tag}"
+
+
+def _get_redis():
+    """Shared async Redis client, or None while Redis is disabled or unreachable"""
+    global _redis
+    if not settings.response_cache_redis_enabled or time.monotonic() < _redis_retry_at:
+        return None
+    if _redis is None:
+        import redis.asyncio as aioredis
+        _redis = aioredis.from_url(settings.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _redis
+
+
+def _redis_failed(error: Exception) -> None:
+    global _redis_retry_at, _redis_down
+    _count("redis_errors")
+    _redis_retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+    if not _redis_down:
+        _redis_down = True
+        logger.warning("Response cache: Redis unavailable (%s), using local tier only", error)
+
+
+def _redis_ok() -> None:
+    global _redis_down
+    if _redis_down:
+        _redis_down = False
+        logger.info("Response cache: Redis available again")
+
+
+async def lookup(key: str) -> Tuple[Optional[CachedResponse], Optional[str]]:
+    """(entry, tier) - tier is "local" or "redis", entry None on a miss"""
+    entry = _local.get(key)
+    if entry is not None:
+        _count("local_hits")
+        return entry, "local"
+
+    client = _get_redis()
+    if client is not None:
+        try:
+            data = await client.get(key)
+            _redis_ok()
+        except Exception as e:
+            _redis_failed(e)
+            data = None
+        if data is not None:
+            entry = CachedResponse.loads(data)
+            _local.set(key, entry)
+            _count("redis_hits")
+            return entry, "redis"
+
+    _count("misses")
+    return None, None
+
+
+async def store(key: str, entry: CachedResponse) -> None:
+    """Store in both tiers (entries above response_cache_max_entry_bytes are not cached)"""
+    if entry.size > settings.response_cache_max_entry_bytes:
+        return
+    _local.set(key, entry)
+
+    client = _get_redis()
+    if client is None:
+        return
+    ttl = settings.response_cache_ttl_seconds
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.set(key, entry.dumps(), ex=ttl)
+            for tag in entry.tags:
+                pipe.sadd(_tag_key(tag), key)
+                pipe.expire(_tag_key(tag), ttl)
+            await pipe.execute()
+        _redis_ok()
+    except Exception as e:
+        _redis_failed(e)
+
+
+async def invalidate(*tags: str) -> int:
+    """Drop entries carrying any of the tags from both tiers"""
+    removed = _local.invalidate(tags)
+
+    client = _get_redis()
+    if client is not None:
+        try:
+            for tag in tags:
+                keys = await client.smembers(_tag_key(tag))
+                await client.delete(_tag_key(tag), *keys)
+                removed += len(keys)
+            _redis_ok()
+        except Exception as e:
+            _redis_failed(e)
+
+    _count("invalidations", removed)
+    return removed
+
+
+def activity_tag(activity_id: int) -> str:
+    return f"activity:{activity_id}"
+
+
+def activity_list_tags(user_id: Optional[int]) -> Tuple[str, ...]:
+    """Tags of activity list responses affected by a change to one of the user's activities"""
+    return ("activities:all", f"activities:user:{user_id}")
@@ -0,0 +1,86 @@
+import json
+import struct
+from typing import Dict, Optional
+
+import numpy as np
+
+# Columnar binary format for trackpoint series (decoded by ApiClient.decodeColumns in api.js):
+#   b"SPC1" | uint32 LE header length | UTF-8 JSON header | padding to 8 bytes | column data
+# Header: {"length": n, "columns": [{"name", "dtype", "offset"}], ...meta}. Column offsets are
+# relative to the start of the data section and 8-byte aligned so typed arrays can view them.
+COLUMNS_MEDIA_TYPE = "application/vnd.sporter.columns"
+COLUMNS_MAGIC = b"SPC1"
+
+POLYLINE_PRECISION = 5
+
+_ALIGNMENT = 8
+_DTYPES = ('float64', 'float32', 'int32', 'uint32', 'int16', 'uint16', 'uint8')
+
+
+def accepts_columns(accept: Optional[str]) -> bool:
+    """True when the Accept header asks for the columnar binary format"""
+    if not accept:
+        return False
+    return any(part.split(';')[0].strip() == COLUMNS_MEDIA_TYPE for part in accept.split(','))
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGNMENT
+
+
+def pack_columns(columns: Dict[str, np.ndarray], meta: Optional[Dict] = None) -> bytes:
+    """Serialize equally long NumPy columns (+ JSON metadata) into the SPC1 format"""
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns differ in length: {sorted(lengths)}")
+
+    descriptors = []
+    blocks = []
+    offset = 0
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if values.dtype.name not in _DTYPES:
+            raise ValueError(f"Unsupported dtype {values.dtype} for column {name}")
+
+        data = values.astype(values.dtype.newbyteorder('<'), copy=False).tobytes()
+        descriptors.append({"name": name, "dtype": values.dtype.name, "offset": offset})
+        blocks.append(data + b"\0" * _padding(len(data)))
+        offset += len(data) + _padding(len(data))
+
+    header = json.dumps(
+        {**(meta or {}), "length": lengths.pop() if lengths else 0, "columns": descriptors},
+        separators=(',', ':')
+    ).encode()
+    prefix_size = len(COLUMNS_MAGIC) + 4 + len(header)
+
+    return b"".join([
+        COLUMNS_MAGIC,
+        struct.pack('<I', len(header)),
+        header,
+        b" " * _padding(prefix_size),  # JSON-safe padding
+        *blocks
+    ])
+
+
+def encode_polyline(latitude: np.ndarray, longitude: np.ndarray, precision: int = POLYLINE_PRECISION) -> str:
+    """Google encoded polyline of coordinate arrays (vectorized)"""
+    if not len(latitude):
+        return ""
+
+    factor = 10 ** precision
+    coords = np.empty((len(latitude), 2), dtype=np.int64)
+    coords[:, 0] = np.round(np.asarray(latitude, dtype=np.float64) * factor)
+    coords[:, 1] = np.round(np.asarray(longitude, dtype=np.float64) * factor)
+
+    # Deltas from the previous point, interleaved lat, lon, lat, lon...
+    deltas = np.diff(coords, axis=0, prepend=0).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    # Split into 5-bit groups, least significant first; all but the last get the 0x20 flag
+    position = np.arange(7)
+    groups = (values[:, None] >> (5 * position)) & 0x1F
+    counts = 1 + (values[:, None] >= (np.int64(1) << (5 * position[1:]))).sum(axis=1)
+    chars = groups + 63
+    chars[position < (counts[:, None] - 1)] += 0x20
+
+    return chars[position < counts[:, None]].astype(np.uint8).tobytes().decode('ascii')
@@ -0,0 +1,64 @@
+from typing import Optional
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+
+from ..core.config import settings
+
+# Layout: {tile_cache_dir}/{scope}/{version}/{filter}/{z}/{x}/{y}.mvt
+#   scope   - "user-<id>" or "all" (tiles of every user)
+#   version - activity count + highest id of the scope: changes with every
+#             import and delete, so a process that missed an eager purge
+#             (e.g. the CLI importer) still never serves a stale tile
+#   filter  - digest of the activity type filter (user input, not a path)
+ALL_SCOPE = "all"
+
+logger = logging.getLogger(__name__)
+
+
+def _scope(user_id: Optional[int]) -> str:
+    return f"user-{user_id}" if user_id else ALL_SCOPE
+
+
+def _filter_dir(activity_type: Optional[str]) -> str:
+    if not activity_type:
+        return "any"
+    return hashlib.sha256(activity_type.encode()).hexdigest()[:16]
+
+
+def tile_path(user_id: Optional[int], version: str, activity_type: Optional[str], z: int, x: int, y: int) -> str:
+    return os.path.join(
+        settings.tile_cache_dir, _scope(user_id), version, _filter_dir(activity_type), str(z), str(x), f"{y}.mvt"
+    )
+
+
+def read(path: str) -> Optional[bytes]:
+    if not settings.tile_cache_enabled:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write(path: str, tile: bytes) -> None:
+    """Store a tile atomically (concurrent workers may render the same tile)"""
+    if not settings.tile_cache_enabled:
+        return
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".part", delete=False) as f:
+            f.write(tile)
+        os.replace(f.name, path)
+    except OSError as e:
+        logger.warning("Tile cache: could not write %s (%s)", path, e)
+
+
+def invalidate_user(user_id: Optional[int]) -> None:
+    """Drop cached tiles showing the user's activities (their scope and "all") after an import or delete"""
+    for scope in {_scope(user_id), ALL_SCOPE}:
+        shutil.rmtree(os.path.join(settings.tile_cache_dir, scope), ignore_errors=True)
@@ -0,0 +1,611 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000  # Earth radius in meters
+
+# HR outlier detection parameters (shared by import and reapply)
+HR_MIN_POINTS_FOR_OUTLIERS = 10
+HR_MIN_POINTS_FOR_MAD = 20
+HR_STARTUP_SECONDS = 5 * 60
+HR_MAD_MULTIPLIER = 3
+HR_FALLBACK_THRESHOLD = 50
+
+# HR histogram: one bin per bpm, values above the last bin are counted in it
+HR_HISTOGRAM_BINS = 256
+
+# HR zone distribution: longer gaps between samples are pauses, not time in a zone
+HR_ZONE_MAX_GAP_SECONDS = 30
+
+# Zone-based TRIMP (Edwards): minutes in zone i (1 = lowest) count i times
+TRIMP_ZONE_WEIGHTS = (1, 2, 3, 4, 5)
+
+# Activity route geometry (activities.route): Douglas-Peucker tolerance and SRID
+ROUTE_TOLERANCE_M = 10.0
+ROUTE_SRID = 4326
+
+# Elevation gain/loss parameters
+ELEVATION_SMOOTHING_WINDOW = 5    # points in the centered rolling mean
+ELEVATION_HYSTERESIS_M = 3.0      # minimum climb/descent counted
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+
+
+def datetime_to_epoch_us(value: datetime) -> int:
+    """Convert timezone-aware datetime to integer microseconds since epoch (exact)"""
+    return (value - _EPOCH) // _ONE_US
+
+
+def epoch_us_to_datetime(value: int) -> datetime:
+    """Convert microseconds since epoch back to a UTC datetime"""
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Vectorized Haversine distance between coordinate arrays (in meters)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return EARTH_RADIUS_M * c
+
+
+def detect_hr_outliers(elapsed_seconds: np.ndarray, heart_rate: np.ndarray):
+    """Vectorized HR outlier detection (startup spikes + MAD outliers).
+
+    heart_rate uses NaN for points without HR. Returns (exclude, reasons) where
+    reasons is an object array holding None, 'hr_startup' or
+    'hr_statistical_outlier'. Points are only flagged when there are at least
+    HR_MIN_POINTS_FOR_OUTLIERS HR readings.
+    """
+    n = len(heart_rate)
+    exclude = np.zeros(n, dtype=bool)
+    reasons = np.full(n, None, dtype=object)
+
+    has_hr = ~np.isnan(heart_rate)
+    if np.count_nonzero(has_hr) < HR_MIN_POINTS_FOR_OUTLIERS:
+        return exclude, reasons
+
+    # Strategy 1: Smart startup exclusion - points in first 5 minutes above overall average
+    overall_avg_hr = heart_rate[has_hr].mean()
+    startup = has_hr & (elapsed_seconds < HR_STARTUP_SECONDS) & (heart_rate > overall_avg_hr)
+    exclude |= startup
+    reasons[startup] = 'hr_startup'
+
+    # Strategy 2: Statistical outliers (beyond 3 MAD from median)
+    valid = has_hr & ~exclude
+    valid_hr_values = heart_rate[valid]
+    if len(valid_hr_values) > HR_MIN_POINTS_FOR_MAD:
+        median_hr = np.median(valid_hr_values)
+        mad = np.median(np.abs(valid_hr_values - median_hr))
+        threshold = HR_MAD_MULTIPLIER * mad if mad > 0 else HR_FALLBACK_THRESHOLD
+
+        outliers = valid & (np.abs(heart_rate - median_hr) > threshold)
+        exclude |= outliers
+        reasons[outliers] = 'hr_statistical_outlier'
+
+    return exclude, reasons
+
+
+def smooth_elevation(elevation: np.ndarray, window: int = ELEVATION_SMOOTHING_WINDOW) -> np.ndarray:
+    """Centered rolling mean over points with elevation (NaN stays NaN)"""
+    smoothed = np.full(len(elevation), np.nan)
+    valid = ~np.isnan(elevation)
+    values = elevation[valid]
+    if not len(values):
+        return smoothed
+
+    # Divide by the number of samples actually in the window so the ends are not pulled down.
+    # Centered slice of the full convolution - mode='same' returns `window` values for shorter tracks
+    kernel = np.ones(window)
+    centered = slice((window - 1) // 2, (window - 1) // 2 + len(values))
+    sums = np.convolve(values, kernel)[centered]
+    counts = np.convolve(np.ones(len(values)), kernel)[centered]
+    smoothed[valid] = sums / counts
+    return smoothed
+
+
+def elevation_gain_loss(elevation: np.ndarray, threshold: float = ELEVATION_HYSTERESIS_M):
+    """Total (gain, loss) in meters with hysteresis: direction changes count only past threshold.
+
+    The profile is first reduced to its turning points (vectorized); the
+    hysteresis state machine then only walks the local extrema.
+    """
+    values = elevation[~np.isnan(elevation)]
+    if len(values) < 2:
+        return None, None
+
+    # Drop flat repeats, keep endpoints and local extrema
+    values = values[np.concatenate(([True], np.diff(values) != 0))]
+    if len(values) > 2:
+        step = np.diff(values)
+        turning = np.concatenate(([True], step[:-1] * step[1:] < 0, [True]))
+        values = values[turning]
+
+    gain = loss = 0.0
+    low = high = anchor = extreme = values[0]
+    direction = 0
+    for value in values[1:].tolist():
+        if direction == 0:
+            # Undecided until the first move beyond the threshold
+            low, high = min(low, value), max(high, value)
+            if value - low >= threshold:
+                anchor, extreme, direction = low, value, 1
+            elif high - value >= threshold:
+                anchor, extreme, direction = high, value, -1
+        elif direction == 1:
+            if value > extreme:
+                extreme = value
+            elif extreme - value >= threshold:
+                gain += extreme - anchor
+                anchor, extreme, direction = extreme, value, -1
+        else:
+            if value < extreme:
+                extreme = value
+            elif value - extreme >= threshold:
+                loss += anchor - extreme
+                anchor, extreme, direction = extreme, value, 1
+
+    if direction == 1:
+        gain += extreme - anchor
+    elif direction == -1:
+        loss += anchor - extreme
+
+    return float(gain), float(loss)
+
+
+def range_exclusion_index(elapsed_seconds: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Index of the first exclusion range (inclusive bounds) covering each point, -1 if none.
+
+    Ranges must be sorted by start; "first" means lowest index. The prefix
+    maximum of the end times is the merged-interval envelope: the first range
+    whose running max end reaches t is the first range ending at or after t,
+    and it covers t exactly when it also starts at or before t. Both lookups
+    are a single searchsorted pass, O((points + ranges) log ranges).
+    """
+    index = np.full(len(elapsed_seconds), -1, dtype=np.int64)
+    if not len(starts) or not len(elapsed_seconds):
+        return index
+
+    envelope = np.maximum.accumulate(ends)
+    started = np.searchsorted(starts, elapsed_seconds, side='right')   # ranges with start <= t
+    candidate = np.searchsorted(envelope, elapsed_seconds, side='left')  # first range with end >= t
+
+    covered = candidate < started
+    index[covered] = candidate[covered]
+    return index
+
+
+def hr_histogram(heart_rate: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Counts of the HR values selected by the valid mask per bpm (int64, HR_HISTOGRAM_BINS)"""
+    values = heart_rate[valid & ~np.isnan(heart_rate)].astype(np.int64)
+    return np.bincount(np.clip(values, 0, HR_HISTOGRAM_BINS - 1), minlength=HR_HISTOGRAM_BINS)
+
+
+def histogram_stats(histogram: np.ndarray) -> Dict:
+    """Avg/max/min/count of the HR values counted in a histogram - O(bins)"""
+    present = np.flatnonzero(histogram)
+    count = int(histogram.sum())
+    if not count:
+        return {
+            'avg_heart_rate': None,
+            'max_heart_rate': None,
+            'min_heart_rate': None,
+            'valid_hr_trackpoints': 0
+        }
+    return {
+        'avg_heart_rate': int(np.dot(np.arange(len(histogram)), histogram) // count),
+        'max_heart_rate': int(present[-1]),
+        'min_heart_rate': int(present[0]),
+        'valid_hr_trackpoints': count
+    }
+
+
+def hr_stats(heart_rate: np.ndarray, valid: np.ndarray) -> Dict:
+    """Avg/max/min/count of HR values selected by the valid mask"""
+    return histogram_stats(hr_histogram(heart_rate, valid))
+
+
+def pack_hr_histogram(histogram: np.ndarray) -> bytes:
+    """Histogram as stored in Activity.hr_histogram (uint32 LE per bin)"""
+    return np.asarray(histogram, dtype='<u4').tobytes()
+
+
+def unpack_hr_histogram(data: Optional[bytes]) -> Optional[np.ndarray]:
+    if not data:
+        return None
+    return np.frombuffer(data, dtype='<u4').astype(np.int64)
+
+
+def hr_zone_distribution(elapsed_seconds: np.ndarray, heart_rate: np.ndarray, distance_m: np.ndarray,
+                         valid: np.ndarray, zone_edges: np.ndarray,
+                         max_gap_seconds: float = HR_ZONE_MAX_GAP_SECONDS):
+    """(seconds, meters) spent in each HR zone - one vectorized pass over the track.
+
+    Each point accounts for the interval since the previous trackpoint (time
+    gap and distance_from_previous). zone_edges are the ascending lower bounds
+    of zones 2..n: a bpm equal to an edge belongs to the upper zone and values
+    outside the profile fall into the first/last zone. Intervals ending in an
+    invalid point (no HR, excluded) and gaps above max_gap_seconds are skipped.
+    """
+    zones = len(zone_edges) + 1
+    gaps = np.diff(elapsed_seconds, prepend=elapsed_seconds[:1])
+    counted = valid & ~np.isnan(heart_rate) & ~np.isnan(gaps) & (gaps > 0) & (gaps <= max_gap_seconds)
+
+    zone = np.searchsorted(zone_edges, heart_rate[counted], side='right')
+    seconds = np.bincount(zone, weights=gaps[counted], minlength=zones)
+    meters = np.bincount(zone, weights=np.nan_to_num(distance_m[counted]), minlength=zones)
+    return seconds, meters
+
+
+def zone_trimp(zone_seconds: np.ndarray, weights=TRIMP_ZONE_WEIGHTS) -> float:
+    """Training impulse of an activity from its seconds per HR zone (low to high)"""
+    return float(np.dot(np.asarray(zone_seconds, dtype=np.float64), np.asarray(weights, dtype=np.float64)) / 60)
+
+
+def hr_zone_edges(zones: Dict) -> np.ndarray:
+    """Lower bounds of the zones after the first (User.hr_zones is ordered low to high)"""
+    return np.array([zone["min"] for zone in list(zones.values())[1:]], dtype=np.float64)
+
+
+def hr_zone_breakdown(zones: Dict, elapsed_seconds: np.ndarray, heart_rate: np.ndarray,
+                      distance_m: np.ndarray, excluded: np.ndarray, exclusion_ranges) -> Dict:
+    """Time and distance per zone of one activity (CPU-bound; arrays ordered by point_order)
+
+    Exclusion ranges are relative to the first HR point, like the HR series.
+    """
+    has_hr = ~np.isnan(heart_rate)
+    valid = has_hr & ~excluded
+    if np.any(has_hr) and len(exclusion_ranges):
+        ranges = sorted(exclusion_ranges, key=lambda r: r[0])
+        hr_time = elapsed_seconds - elapsed_seconds[np.argmax(has_hr)]
+        valid &= range_exclusion_index(
+            hr_time,
+            np.array([r[0] for r in ranges], dtype=np.float64),
+            np.array([r[1] for r in ranges], dtype=np.float64)
+        ) < 0
+
+    seconds, meters = hr_zone_distribution(elapsed_seconds, heart_rate, distance_m, valid, hr_zone_edges(zones))
+    total_seconds = float(seconds.sum())
+
+    return {
+        "zones": [{
+            "zone": key,
+            "name": zone["name"],
+            "min_hr": zone["min"],
+            "max_hr": zone["max"],
+            "seconds": round(float(zone_seconds), 1),
+            "distance_km": round(float(zone_meters) / 1000, 3),
+            "time_percent": round(100 * float(zone_seconds) / total_seconds, 1) if total_seconds else 0.0
+        } for (key, zone), zone_seconds, zone_meters in zip(zones.items(), seconds, meters)],
+        "total_seconds": round(total_seconds, 1),
+        "total_distance_km": round(float(meters.sum()) / 1000, 3),
+        "counted_points": int(np.count_nonzero(valid)),
+        "trimp": round(zone_trimp(seconds), 1)
+    }
+
+
+def douglas_peucker_tolerances(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Douglas-Peucker significance of every point (in meters).
+
+    Returns, for each point, the largest tolerance at which Douglas-Peucker
+    still keeps it: simplifying with tolerance t is simply
+    ``tolerance > t``. Endpoints get +inf. Values are capped by the parent
+    split so levels are nested (coarser sets are subsets of finer ones).
+    """
+    n = len(latitude)
+    tolerances = np.zeros(n)
+    if not n:
+        return tolerances
+    tolerances[0] = tolerances[-1] = np.inf
+    if n < 3:
+        return tolerances
+
+    # Local equirectangular projection - accurate enough at track scale
+    lat0 = np.radians(np.mean(latitude))
+    x = np.radians(longitude) * np.cos(lat0) * EARTH_RADIUS_M
+    y = np.radians(latitude) * EARTH_RADIUS_M
+
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        first, last, parent_tolerance = stack.pop()
+        if last - first < 2:
+            continue
+
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = np.hypot(dx, dy)
+        if length > 0:
+            distance = np.abs(dx * py - dy * px) / length
+        else:
+            distance = np.hypot(px, py)
+
+        split = int(np.argmax(distance))
+        index = first + 1 + split
+        tolerance = min(float(distance[split]), parent_tolerance)
+        tolerances[index] = tolerance
+
+        stack.append((first, index, tolerance))
+        stack.append((index, last, tolerance))
+
+    return tolerances
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points preserving the visual shape"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = a = 0
+
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        # Triangle between the last selected point, this bucket and the next bucket's average
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    selected[-1] = n - 1
+    return selected
+
+
+def mask_runs(mask: np.ndarray):
+    """(first, last) index arrays of consecutive True runs in a boolean mask"""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    return np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0] - 1
+
+
+def downsample_indices(x: np.ndarray, y: np.ndarray, max_points: int,
+                       keep: Optional[np.ndarray] = None) -> np.ndarray:
+    """LTTB indices plus points that must survive (global min/max and `keep`), sorted.
+
+    The forced points come out of the max_points budget, so the result only
+    exceeds max_points when the forced points alone do.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    forced = [np.array([np.nanargmax(y), np.nanargmin(y)], dtype=np.int64)]
+    if keep is not None:
+        forced.append(np.asarray(keep, dtype=np.int64))
+    forced = np.unique(np.concatenate(forced))
+
+    selected = lttb_indices(x, y, max(3, max_points - len(forced)))
+    return np.union1d(selected, forced)
+
+
+def points_to_wkb_hex(longitude: np.ndarray, latitude: np.ndarray) -> np.ndarray:
+    """Encode coordinate arrays as hex WKB POINTs (little endian, no SRID)"""
+    wkb = np.empty(len(longitude), dtype=[('order', 'u1'), ('type', '<u4'), ('x', '<f8'), ('y', '<f8')])
+    wkb['order'] = 1  # little endian
+    wkb['type'] = 1   # POINT
+    wkb['x'] = longitude
+    wkb['y'] = latitude
+
+    record_size = wkb.dtype.itemsize * 2
+    encoded = wkb.tobytes().hex()
+    return np.array([encoded[i:i + record_size] for i in range(0, len(encoded), record_size)], dtype=object)
+
+
+def linestring_ewkt(longitude: np.ndarray, latitude: np.ndarray, srid: int = ROUTE_SRID) -> Optional[str]:
+    """EWKT LINESTRING of coordinate arrays (None below two points)"""
+    if len(longitude) < 2:
+        return None
+    coords = ",".join(f"{x:.7f} {y:.7f}" for x, y in zip(longitude.tolist(), latitude.tolist()))
+    return f"SRID={srid};LINESTRING({coords})"
+
+
+def bbox_ewkt(longitude: np.ndarray, latitude: np.ndarray, srid: int = ROUTE_SRID) -> Optional[str]:
+    """EWKT POLYGON of the bounding box of coordinate arrays (None when empty)"""
+    if not len(longitude):
+        return None
+    west, east = float(np.min(longitude)), float(np.max(longitude))
+    south, north = float(np.min(latitude)), float(np.max(latitude))
+    return (f"SRID={srid};POLYGON(({west:.7f} {south:.7f},{east:.7f} {south:.7f},"
+            f"{east:.7f} {north:.7f},{west:.7f} {north:.7f},{west:.7f} {south:.7f}))")
+
+
+def to_decimal(value: float, places: int) -> Decimal:
+    """Round a float and convert it to Decimal for DECIMAL columns"""
+    return Decimal(str(round(float(value), places)))
+
+
+class TrackpointColumns:
+    """Columnar trackpoint storage backed by NumPy arrays.
+
+    Missing elevation / HR values are stored as NaN. Time is kept as integer
+    microseconds since epoch so gaps and durations stay exact.
+    """
+
+    def __init__(self, latitude: np.ndarray, longitude: np.ndarray, elevation: np.ndarray,
+                 time_us: np.ndarray, heart_rate: np.ndarray):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.elevation = elevation
+        self.time_us = time_us
+        self.heart_rate = heart_rate
+
+        n = len(latitude)
+        self.point_order = np.arange(n, dtype=np.int64)
+
+        # Derived columns, filled by compute_metrics()
+        self.distance_m = np.full(n, np.nan)
+        self.time_gap_seconds = np.full(n, np.nan)
+        self.speed_ms = np.full(n, np.nan)
+        self.exclude_from_hr_analysis = np.zeros(n, dtype=bool)
+        self.exclusion_reason = np.full(n, None, dtype=object)
+        self.simplify_tolerance_m = np.full(n, np.inf)
+        self.cumulative_distance_m = np.zeros(n)
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[List[Dict]]) -> 'TrackpointColumns':
+        """Build columns from the parser's trackpoint dict chunks"""
+        parts = {'latitude': [], 'longitude': [], 'elevation': [], 'time_us': [], 'heart_rate': []}
+
+        for chunk in chunks:
+            parts['latitude'].append(np.array([float(tp['latitude']) for tp in chunk]))
+            parts['longitude'].append(np.array([float(tp['longitude']) for tp in chunk]))
+            parts['elevation'].append(np.array(
+                [float(tp['elevation']) if tp['elevation'] is not None else np.nan for tp in chunk]
+            ))
+            parts['time_us'].append(np.array(
+                [datetime_to_epoch_us(tp['recorded_at']) for tp in chunk], dtype=np.int64
+            ))
+            parts['heart_rate'].append(np.array(
+                [tp['heart_rate'] if tp['heart_rate'] is not None else np.nan for tp in chunk],
+                dtype=np.float64
+            ))
+
+        def concat(name, dtype):
+            return np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+
+        return cls(
+            latitude=concat('latitude', np.float64),
+            longitude=concat('longitude', np.float64),
+            elevation=concat('elevation', np.float64),
+            time_us=concat('time_us', np.int64),
+            heart_rate=concat('heart_rate', np.float64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.latitude)
+
+    @property
+    def elapsed_seconds(self) -> np.ndarray:
+        """Seconds since the first trackpoint"""
+        if not len(self):
+            return np.empty(0)
+        return (self.time_us - self.time_us[0]) / 1e6
+
+    @property
+    def start_time(self) -> Optional[datetime]:
+        return epoch_us_to_datetime(self.time_us[0]) if len(self) else None
+
+    @property
+    def end_time(self) -> Optional[datetime]:
+        return epoch_us_to_datetime(self.time_us[-1]) if len(self) else None
+
+    def track_signature(self) -> Optional[str]:
+        """SHA-256 of start time and first/last coordinates (matches re-exports of a track)"""
+        if not len(self):
+            return None
+        signature = "|".join([
+            str(int(self.time_us[0])),
+            f"{self.latitude[0]:.6f},{self.longitude[0]:.6f}",
+            f"{self.latitude[-1]:.6f},{self.longitude[-1]:.6f}"
+        ])
+        return hashlib.sha256(signature.encode()).hexdigest()
+
+    def compute_metrics(self) -> Dict:
+        """Compute per-point and activity metrics in a single vectorized pass.
+
+        Fills distance (per point and cumulative), time gap, speed, HR
+        exclusion and simplification columns and returns
+        activity-level aggregates as floats/ints (Decimal conversion is left
+        to the DB boundary).
+        """
+        n = len(self)
+        metrics = {'total_trackpoints': n}
+        if not n:
+            return metrics
+
+        metrics['duration_seconds'] = int((self.time_us[-1] - self.time_us[0]) / 1e6)
+
+        # Distance, time gaps and speed between consecutive points
+        if n > 1:
+            distance = haversine_m(self.latitude[:-1], self.longitude[:-1],
+                                   self.latitude[1:], self.longitude[1:])
+            time_diff = np.diff(self.time_us) / 1e6
+
+            self.distance_m[1:] = distance
+            self.time_gap_seconds[1:] = np.trunc(time_diff)
+
+            moving = (time_diff > 0) & (distance > 0)
+            self.speed_ms[1:][moving] = distance[moving] / time_diff[moving]
+
+        self.cumulative_distance_m = np.cumsum(np.nan_to_num(self.distance_m))
+        metrics['total_distance_m'] = float(np.nansum(self.distance_m))
+        speeds = self.speed_ms[~np.isnan(self.speed_ms)]
+        if len(speeds):
+            metrics['avg_speed_ms'] = float(speeds.mean())
+            metrics['max_speed_ms'] = float(speeds.max())
+
+        # HR outliers and HR statistics excluding outliers
+        self.exclude_from_hr_analysis, self.exclusion_reason = detect_hr_outliers(
+            self.elapsed_seconds, self.heart_rate
+        )
+        metrics['hr_histogram'] = hr_histogram(self.heart_rate, ~self.exclude_from_hr_analysis)
+        metrics.update(histogram_stats(metrics['hr_histogram']))
+
+        # Elevation gain/loss on the smoothed profile
+        metrics['elevation_gain_m'], metrics['elevation_loss_m'] = elevation_gain_loss(
+            smooth_elevation(self.elevation)
+        )
+
+        # Level of detail for map rendering (see douglas_peucker_tolerances)
+        self.simplify_tolerance_m = douglas_peucker_tolerances(self.latitude, self.longitude)
+
+        # Simplified route and its bounding box for spatial search (activities.route / bbox)
+        kept = self.simplify_tolerance_m > ROUTE_TOLERANCE_M
+        metrics['route'] = linestring_ewkt(self.longitude[kept], self.latitude[kept])
+        metrics['bbox'] = bbox_ewkt(self.longitude, self.latitude)
+
+        return metrics
+
+    def hr_exclusion_summary(self) -> Dict:
+        """Counts of HR points and exclusions by reason"""
+        has_hr = ~np.isnan(self.heart_rate)
+        return {
+            'total_hr': int(np.count_nonzero(has_hr)),
+            'excluded': int(np.count_nonzero(self.exclude_from_hr_analysis & has_hr)),
+            'hr_startup': int(np.count_nonzero(self.exclusion_reason == 'hr_startup')),
+            'hr_statistical_outlier': int(np.count_nonzero(self.exclusion_reason == 'hr_statistical_outlier'))
+        }
+
+    def iter_rows(self) -> Iterator[Dict]:
+        """Yield DB-ready trackpoint dicts (Decimal/datetime conversion happens here)"""
+        elapsed = self.elapsed_seconds
+        for i in range(len(self)):
+            elevation = self.elevation[i]
+            heart_rate = self.heart_rate[i]
+            distance = self.distance_m[i]
+            time_gap = self.time_gap_seconds[i]
+            speed = self.speed_ms[i]
+            simplify_tolerance = self.simplify_tolerance_m[i]
+            cumulative_distance = self.cumulative_distance_m[i]
+
+            yield {
+                'point_order': int(self.point_order[i]),
+                'longitude': Decimal(repr(float(self.longitude[i]))),
+                'latitude': Decimal(repr(float(self.latitude[i]))),
+                'elevation': Decimal(repr(float(elevation))) if not np.isnan(elevation) else None,
+                'recorded_at': epoch_us_to_datetime(self.time_us[i]),
+                'elapsed_seconds': float(elapsed[i]),
+                'heart_rate': int(heart_rate) if not np.isnan(heart_rate) else None,
+                'distance_from_previous_m': float(distance) if not np.isnan(distance) else None,
+                'cumulative_distance_m': float(cumulative_distance),
+                'time_gap_seconds': int(time_gap) if not np.isnan(time_gap) else None,
+                'speed_ms': to_decimal(speed, 3) if not np.isnan(speed) else None,
+                'exclude_from_hr_analysis': bool(self.exclude_from_hr_analysis[i]),
+                'exclusion_reason': self.exclusion_reason[i],
+                'simplify_tolerance_m': float(simplify_tolerance)
+            }
@@ -0,0 +1,206 @@
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+import math
+
+from sqlalchemy import delete, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.training_load import TrainingLoadDay
+
+# Fitness/fatigue as exponentially weighted moving averages of daily TRIMP:
+#   CTL_d = CTL_(d-1) + (TRIMP_d - CTL_(d-1)) / CTL_DAYS    (ATL likewise)
+# The recurrence is linear, so changing day D's load by delta adds
+# delta * k * (1 - k)^(d - D) to every later day d: an activity added,
+# removed or re-analysed is one UPDATE of the following days, never a
+# replay of the history. Only days with activities are stored; between
+# them both values decay by (1 - k) per day.
+CTL_DAYS = 42
+ATL_DAYS = 7
+CTL_K = 1 / CTL_DAYS
+ATL_K = 1 / ATL_DAYS
+
+# Days after which a load change no longer matters (weight below 1e-12);
+# also keeps power() far from double precision underflow
+_NEGLIGIBLE_WEIGHT = 1e-12
+CTL_HORIZON_DAYS = math.ceil(math.log(_NEGLIGIBLE_WEIGHT) / math.log(1 - CTL_K))
+ATL_HORIZON_DAYS = math.ceil(math.log(_NEGLIGIBLE_WEIGHT) / math.log(1 - ATL_K))
+
+_LOCK_SQL = "LOCK TABLE training_load_days IN EXCLUSIVE MODE"
+
+# Row for the day (no load yet) with CTL/ATL decayed from the previous stored day
+_ENSURE_DAY_SQL = """
+    INSERT INTO training_load_days (user_id, day, trimp, ctl, atl)
+    SELECT
+        :user_id, CAST(:day AS date), 0,
+        CASE WHEN CAST(:day AS date) - p.day <= :ctl_horizon
+             THEN p.ctl * power(1 - CAST(:ctl_k AS double precision), CAST(:day AS date) - p.day) ELSE 0 END,
+        CASE WHEN CAST(:day AS date) - p.day <= :atl_horizon
+             THEN p.atl * power(1 - CAST(:atl_k AS double precision), CAST(:day AS date) - p.day) ELSE 0 END
+    FROM (SELECT 1) AS one
+    LEFT JOIN LATERAL (
+        SELECT day, ctl, atl FROM training_load_days
+        WHERE user_id = :user_id AND day < CAST(:day AS date)
+        ORDER BY day DESC
+        LIMIT 1
+    ) p ON true
+    ON CONFLICT (user_id, day) DO NOTHING
+"""
+
+_SHIFT_SQL = """
+    UPDATE training_load_days
+    SET trimp = trimp + CASE WHEN day = CAST(:day AS date) THEN CAST(:delta AS double precision) ELSE 0 END,
+        ctl = ctl + CAST(:delta AS double precision) * CAST(:ctl_k AS double precision)
+                  * power(1 - CAST(:ctl_k AS double precision), day - CAST(:day AS date)),
+        atl = atl + CASE WHEN day - CAST(:day AS date) <= :atl_horizon
+                         THEN CAST(:delta AS double precision) * CAST(:atl_k AS double precision)
+                              * power(1 - CAST(:atl_k AS double precision), day - CAST(:day AS date))
+                         ELSE 0 END
+    WHERE user_id = :user_id
+      AND day >= CAST(:day AS date)
+      AND day <= CAST(:day AS date) + :ctl_horizon
+"""
+
+# A day left without load carries exactly the decayed values, so it can go
+_PRUNE_SQL = """
+    DELETE FROM training_load_days
+    WHERE user_id = :user_id AND day = CAST(:day AS date) AND abs(trimp) < 1e-9
+"""
+
+_DAILY_LOADS_SQL = """
+    SELECT user_id, CAST(start_time AT TIME ZONE 'UTC' AS date) AS day, sum(trimp) AS trimp
+    FROM activities
+    WHERE trimp IS NOT NULL
+      AND user_id IS NOT NULL
+      AND start_time IS NOT NULL
+      AND (CAST(:user_id AS integer) IS NULL OR user_id = :user_id)
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+
+def _day_deltas(before: Optional[Dict], after: Optional[Dict]) -> Dict[Tuple[int, date], float]:
+    """TRIMP change per (user, day) between two training_rollups.contribution() snapshots"""
+    deltas: Dict[Tuple[int, date], float] = {}
+    for values, sign in ((before, -1), (after, 1)):
+        if values is None or not values.get('trimp'):
+            continue
+        key = (values['user_id'], values['day'])
+        deltas[key] = deltas.get(key, 0.0) + sign * values['trimp']
+    return {key: delta for key, delta in deltas.items() if abs(delta) > 1e-9}
+
+
+def _statements(before: Optional[Dict], after: Optional[Dict]) -> List[Tuple[str, Dict]]:
+    statements = []
+    for (user_id, day), delta in _day_deltas(before, after).items():
+        params = {
+            'user_id': user_id, 'day': day, 'delta': delta,
+            'ctl_k': CTL_K, 'atl_k': ATL_K,
+            'ctl_horizon': CTL_HORIZON_DAYS, 'atl_horizon': ATL_HORIZON_DAYS
+        }
+        statements += [(_ENSURE_DAY_SQL, params), (_SHIFT_SQL, params), (_PRUNE_SQL, params)]
+    return statements
+
+
+async def apply(db: AsyncSession, before: Optional[Dict], after: Optional[Dict]) -> None:
+    """Move an activity's TRIMP in the daily series in the caller's transaction (no commit).
+
+    Takes the same snapshots as training_rollups.apply().
+    """
+    for sql, params in _statements(before, after):
+        await db.execute(text(sql), params)
+
+
+def apply_sync(db: Session, before: Optional[Dict], after: Optional[Dict]) -> None:
+    """apply() for sync sessions (imports)"""
+    for sql, params in _statements(before, after):
+        db.execute(text(sql), params)
+
+
+def series_rows(daily_loads) -> List[Dict]:
+    """Stored rows of a full recompute from (user_id, day, trimp) sorted by user and day"""
+    rows = []
+    previous = None
+    for user_id, day, trimp in daily_loads:
+        if previous is None or previous['user_id'] != user_id:
+            ctl = atl = 0.0
+        else:
+            gap = (day - previous['day']).days
+            ctl = previous['ctl'] * (1 - CTL_K) ** gap
+            atl = previous['atl'] * (1 - ATL_K) ** gap
+        previous = {
+            'user_id': user_id,
+            'day': day,
+            'trimp': float(trimp),
+            'ctl': ctl + CTL_K * float(trimp),
+            'atl': atl + ATL_K * float(trimp)
+        }
+        rows.append(previous)
+    return rows
+
+
+def _replace_query(user_id: Optional[int]):
+    query = delete(TrainingLoadDay)
+    if user_id is not None:
+        query = query.where(TrainingLoadDay.user_id == user_id)
+    return query
+
+
+def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute the series from Activity.trimp (all users or one) and commit; returns rows written.
+
+    The table lock makes concurrent incremental updates wait for the rebuild.
+    """
+    db.execute(text(_LOCK_SQL))
+    rows = series_rows(db.execute(text(_DAILY_LOADS_SQL), {'user_id': user_id}).all())
+    db.execute(_replace_query(user_id))
+    if rows:
+        db.execute(insert(TrainingLoadDay), rows)
+    db.commit()
+    return len(rows)
+
+
+async def rebuild_user(db: AsyncSession, user_id: int) -> int:
+    """rebuild() of one user for async sessions (after all TRIMP values changed)"""
+    await db.execute(text(_LOCK_SQL))
+    rows = series_rows((await db.execute(text(_DAILY_LOADS_SQL), {'user_id': user_id})).all())
+    await db.execute(_replace_query(user_id))
+    if rows:
+        await db.execute(insert(TrainingLoadDay), rows)
+    await db.commit()
+    return len(rows)
+
+
+def daily_series(anchor: Optional[TrainingLoadDay], stored: List[TrainingLoadDay],
+                 start: date, end: date) -> List[Dict]:
+    """Every day of [start, end] from the stored days in it and the last stored day before it.
+
+    TSB (form) of a day is the previous day's CTL - ATL, i.e. freshness going
+    into that day's training.
+    """
+    by_day = {row.day: row for row in stored}
+    if anchor is not None:
+        gap = (start - anchor.day).days - 1
+        ctl = anchor.ctl * (1 - CTL_K) ** gap
+        atl = anchor.atl * (1 - ATL_K) ** gap
+    else:
+        ctl = atl = 0.0
+
+    series = []
+    day = start
+    while day <= end:
+        tsb = ctl - atl
+        row = by_day.get(day)
+        if row is not None:
+            trimp, ctl, atl = row.trimp, row.ctl, row.atl
+        else:
+            trimp, ctl, atl = 0.0, ctl * (1 - CTL_K), atl * (1 - ATL_K)
+        series.append({
+            "date": day.isoformat(),
+            "trimp": round(trimp, 1),
+            "ctl": round(ctl, 1),
+            "atl": round(atl, 1),
+            "tsb": round(tsb, 1)
+        })
+        day += timedelta(days=1)
+    return series
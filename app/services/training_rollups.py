@@ -0,0 +1,151 @@
+from datetime import date, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.activity import Activity
+from ..models.training_rollup import TrainingRollup
+from .track_analysis import to_decimal
+
+# Rollups are kept per ISO week (starting Monday) and calendar month, in UTC
+PERIODS = ('week', 'month')
+
+UNKNOWN_ACTIVITY_TYPE = 'other'
+
+# Summed columns; a contribution holds one value per column
+SUM_COLUMNS = ('activity_count', 'distance_km', 'duration_seconds', 'elevation_gain_m',
+               'hr_duration_seconds', 'hr_load')
+
+# Serializes rebuilds against incremental updates (see rebuild)
+_REBUILD_LOCK_SQL = "LOCK TABLE training_rollups IN EXCLUSIVE MODE"
+
+
+def period_start(period: str, day: date) -> date:
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def contribution(activity: Activity) -> Optional[Dict]:
+    """What the activity adds to its rollup rows (None if it belongs to no user/period).
+
+    Take it before changing an activity and pass it to apply() as `before`
+    together with the contribution afterwards.
+    """
+    if activity.user_id is None or activity.start_time is None:
+        return None
+    duration = int(activity.duration_seconds or 0)
+    hr_duration = duration if activity.avg_heart_rate else 0
+    return {
+        'user_id': activity.user_id,
+        'day': activity.start_time.astimezone(timezone.utc).date(),
+        'activity_type': activity.activity_type or UNKNOWN_ACTIVITY_TYPE,
+        'activity_count': 1,
+        'distance_km': to_decimal(float(activity.distance_km or 0), 3),
+        'duration_seconds': duration,
+        'elevation_gain_m': to_decimal(float(activity.elevation_gain_m or 0), 2),
+        'hr_duration_seconds': hr_duration,
+        'hr_load': hr_duration * int(activity.avg_heart_rate or 0),
+        'trimp': activity.trimp  # not summed here - daily series of services.training_load
+    }
+
+
+def _deltas(before: Optional[Dict], after: Optional[Dict]) -> Dict[Tuple, Dict]:
+    """Signed column changes per rollup key; keys whose changes cancel out are dropped"""
+    deltas: Dict[Tuple, Dict] = {}
+    for values, sign in ((before, -1), (after, 1)):
+        if values is None:
+            continue
+        for period in PERIODS:
+            key = (values['user_id'], period, period_start(period, values['day']), values['activity_type'])
+            row = deltas.setdefault(key, {column: 0 for column in SUM_COLUMNS})
+            for column in SUM_COLUMNS:
+                row[column] += sign * values[column]
+    return {key: row for key, row in deltas.items() if any(row.values())}
+
+
+def _statements(before: Optional[Dict], after: Optional[Dict]) -> List:
+    deltas = _deltas(before, after)
+    if not deltas:
+        return []
+
+    query = insert(TrainingRollup).values([
+        {'user_id': user_id, 'period': period, 'period_start': start, 'activity_type': activity_type, **row}
+        for (user_id, period, start, activity_type), row in deltas.items()
+    ])
+    statements = [query.on_conflict_do_update(
+        index_elements=['user_id', 'period', 'period_start', 'activity_type'],
+        set_={
+            **{column: getattr(TrainingRollup, column) + query.excluded[column] for column in SUM_COLUMNS},
+            'updated_at': text('now()')
+        }
+    )]
+
+    # Rows of periods left without activities are removed
+    statements.append(delete(TrainingRollup).where(
+        tuple_(
+            TrainingRollup.user_id, TrainingRollup.period, TrainingRollup.period_start, TrainingRollup.activity_type
+        ).in_(list(deltas)),
+        TrainingRollup.activity_count <= 0
+    ))
+    return statements
+
+
+async def apply(db: AsyncSession, before: Optional[Dict], after: Optional[Dict]) -> None:
+    """Move an activity's contribution in the caller's transaction (no commit).
+
+    before=None adds an activity, after=None removes it.
+    """
+    for statement in _statements(before, after):
+        await db.execute(statement)
+
+
+def apply_sync(db: Session, before: Optional[Dict], after: Optional[Dict]) -> None:
+    """apply() for sync sessions (imports)"""
+    for statement in _statements(before, after):
+        db.execute(statement)
+
+
+_REBUILD_SQL = """
+    INSERT INTO training_rollups (
+        user_id, period, period_start, activity_type, activity_count, distance_km, duration_seconds,
+        elevation_gain_m, hr_duration_seconds, hr_load, updated_at
+    )
+    SELECT
+        a.user_id,
+        p.period,
+        CAST(date_trunc(p.period, a.start_time AT TIME ZONE 'UTC') AS date),
+        COALESCE(a.activity_type, :unknown_type),
+        count(*),
+        COALESCE(sum(a.distance_km), 0),
+        COALESCE(sum(a.duration_seconds), 0),
+        COALESCE(sum(a.elevation_gain_m), 0),
+        COALESCE(sum(a.duration_seconds) FILTER (WHERE a.avg_heart_rate IS NOT NULL), 0),
+        COALESCE(sum(CAST(a.duration_seconds AS bigint) * a.avg_heart_rate), 0),
+        now()
+    FROM activities a
+    CROSS JOIN (VALUES ('week'), ('month')) AS p(period)
+    WHERE a.user_id IS NOT NULL
+      AND a.start_time IS NOT NULL
+      AND (CAST(:user_id AS integer) IS NULL OR a.user_id = :user_id)
+    GROUP BY 1, 2, 3, 4
+"""
+
+
+def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute rollups from activities (all users or one) and commit; returns rows written.
+
+    The table lock makes concurrent imports/deletes wait, so no contribution is
+    counted twice or lost while the rows are replaced.
+    """
+    db.execute(text(_REBUILD_LOCK_SQL))
+    query = delete(TrainingRollup)
+    if user_id is not None:
+        query = query.where(TrainingRollup.user_id == user_id)
+    db.execute(query)
+    rows = db.execute(text(_REBUILD_SQL), {'user_id': user_id, 'unknown_type': UNKNOWN_ACTIVITY_TYPE}).rowcount
+    db.commit()
+    return rows
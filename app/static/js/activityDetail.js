@@ -255,7 +255,9 @@ class ActivityDetail extends Component {
             this.loadingStates.map = true;
             container.innerHTML = '<div class="loading-placeholder">📍 Loading GPS trackpoints...</div>';
             
-            const trackpoints = await api.getTrackpoints(this.currentActivity.id);
+            const trackpoints = await api.getTrackpointSeries(this.currentActivity.id, {
+                maxPoints: Config.MAP_MAX_POINTS
+            });
             
             // TODO: Initialize actual map component
             container.innerHTML = `
@@ -263,7 +265,7 @@ class ActivityDetail extends Component {
                     <div class="viz-header">
                         <h4>📍 GPS Route Map</h4>
                         <div class="viz-stats">
-                            <span class="stat">${trackpoints.length} GPS points</span>
+                            <span class="stat">${trackpoints.length} of ${this.currentActivity.total_trackpoints} GPS points</span>
                         </div>
                     </div>
                     <div class="viz-content">
@@ -296,7 +298,9 @@ class ActivityDetail extends Component {
             this.loadingStates.heartRate = true;
             container.innerHTML = '<div class="loading-placeholder">💓 Loading heart rate data...</div>';
             
-            const hrData = await api.getHeartRateData(this.currentActivity.id);
+            const hrData = await api.getHeartRateData(this.currentActivity.id, {
+                maxPoints: Config.CHART_MAX_POINTS
+            });
             
             // Get exclusion ranges for chart visualization
             const rangesResponse = await api.getExclusionRanges(this.currentActivity.id);
@@ -308,6 +312,7 @@ class ActivityDetail extends Component {
                     <h4>💓 Heart Rate Analysis</h4>
                     <div class="chart-controls">
                         ${this.userProfile?.hr_max ? '<span class="hr-zones-indicator">🎯 HR Zones Enabled</span>' : '<span class="no-zones">ℹ️ Set HR Max for zones</span>'}
+                        <span class="zoom-hint">🔍 Drag to zoom, double-click to reset</span>
                     </div>
                 </div>
                 <div class="chart-canvas-container">
@@ -412,7 +417,9 @@ class ActivityDetail extends Component {
             this.loadingStates.elevation = true;
             container.innerHTML = '<div class="loading-placeholder">⛰️ Loading elevation data...</div>';
             
-            const elevData = await api.getElevationData(this.currentActivity.id);
+            const elevData = await api.getElevationSeries(this.currentActivity.id, {
+                maxPoints: Config.CHART_MAX_POINTS
+            });
             
             // TODO: Initialize actual elevation chart component
             container.innerHTML = `
@@ -420,7 +427,7 @@ class ActivityDetail extends Component {
                     <div class="viz-header">
                         <h4>⛰️ Elevation Profile</h4>
                         <div class="viz-stats">
-                            <span class="stat">${elevData.total_points} elevation points</span>
+                            <span class="stat">${elevData.downsampling?.source_points ?? elevData.length} elevation points</span>
                             <span class="stat">${elevData.stats.total_distance_km}km distance</span>
                         </div>
                     </div>
@@ -468,31 +475,41 @@ class ActivityDetail extends Component {
 
     getSystemExclusionRanges(hrData) {
         const ranges = [];
-        const excludedPoints = hrData.data.filter(point => point.excluded);
         
-        if (excludedPoints.length === 0) return ranges;
+        // Downsampled series carry the full-resolution excluded spans
+        const spans = hrData.downsampling?.excluded_spans
+            ? hrData.downsampling.excluded_spans.map(span => ({
+                start: span.start_seconds / 60,
+                end: span.end_seconds / 60,
+                reason: span.reason
+            }))
+            : hrData.data.filter(point => point.excluded).map(point => ({
+                start: point.time_seconds / 60,
+                end: point.time_seconds / 60,
+                reason: point.exclusion_reason
+            }));
+        
+        if (spans.length === 0) return ranges;
         
         // Group consecutive excluded points into ranges
         let currentRange = null;
         
-        excludedPoints.forEach(point => {
-            const timeMinutes = point.time_seconds / 60;
-            
+        spans.forEach(span => {
             if (!currentRange) {
                 currentRange = {
-                    startTime: timeMinutes,
-                    endTime: timeMinutes,
-                    reason: point.exclusion_reason,
+                    startTime: span.start,
+                    endTime: span.end,
+                    reason: span.reason,
                     isSystem: true
                 };
-            } else if (Math.abs(timeMinutes - currentRange.endTime) < 0.5) { // Within 30 seconds
-                currentRange.endTime = timeMinutes;
+            } else if (Math.abs(span.start - currentRange.endTime) < 0.5) { // Within 30 seconds
+                currentRange.endTime = span.end;
             } else {
                 ranges.push(currentRange);
                 currentRange = {
-                    startTime: timeMinutes,
-                    endTime: timeMinutes,
-                    reason: point.exclusion_reason,
+                    startTime: span.start,
+                    endTime: span.end,
+                    reason: span.reason,
                     isSystem: true
                 };
             }
@@ -1,155 +1,242 @@
-// Sporter - Analytics Page (Placeholder)
+// Sporter - Analytics Page
 
 class AnalyticsPage extends Page {
     constructor() {
         super('analytics');
-        
-        // No additional properties needed for this page
-        // Now manually call init
+
+        // Initialize properties after calling super()
+        this.currentUserId = null;
+        this.period = 'week';
+        this.rollups = [];
+        this.trainingLoad = null;
+        this.isLoading = false;
+
+        // Now manually call init with properties set up
         this.init();
     }
 
     init() {
         this.render();
+        this.setupEventListeners();
+    }
+
+    setupEventListeners() {
+        this.subscribe(Events.USER_PROFILE_LOADED, (data) => {
+            this.currentUserId = data.user?.id;
+            if (this.isVisible) this.loadRollups();
+        });
+
+        this.subscribe(Events.USER_PROFILE_UPDATED, (data) => {
+            this.currentUserId = data.user?.id;
+            if (this.isVisible) this.loadRollups();
+        });
+
+        // Rollups change with every import/delete
+        this.subscribe(Events.ACTIVITY_UPLOADED, () => {
+            if (this.isVisible) this.loadRollups();
+        });
+
+        this.subscribe(Events.ACTIVITY_DELETED, () => {
+            if (this.isVisible) this.loadRollups();
+        });
     }
 
     renderContent() {
         this.setContent(`
             <div class="analytics-page">
-                <!-- Hero Section -->
-                <div class="page-hero">
-                    <div class="hero-content">
-                        <h1>📈 Analytics Dashboard</h1>
-                        <p class="hero-subtitle">Advanced training analysis and insights</p>
-                        <div class="coming-soon-badge">Coming Soon</div>
+                <div class="page-header">
+                    <h1>📈 Analytics Dashboard</h1>
+                    <p>Training totals per ${this.period}</p>
+
+                    <div class="header-actions">
+                        <button class="btn ${this.period === 'week' ? 'btn-primary' : 'btn-secondary'}" data-action="period" data-period="week">
+                            Weekly
+                        </button>
+                        <button class="btn ${this.period === 'month' ? 'btn-primary' : 'btn-secondary'}" data-action="period" data-period="month">
+                            Monthly
+                        </button>
                     </div>
                 </div>
 
-                <!-- Feature Preview Cards -->
-                <div class="feature-grid">
-                    <div class="feature-card">
-                        <div class="feature-icon">📊</div>
-                        <h3>Training Load Analysis</h3>
-                        <p>Comprehensive analysis of your training load patterns, recovery, and performance trends over time.</p>
-                        <ul class="feature-list">
-                            <li>Weekly/monthly training load</li>
-                            <li>TSS (Training Stress Score)</li>
-                            <li>Recovery metrics</li>
-                        </ul>
-                    </div>
+                ${this.renderTrainingLoad()}
 
-                    <div class="feature-card">
-                        <div class="feature-icon">📅</div>
-                        <h3>Progress Tracking</h3>
-                        <p>Track your progress across different activities and training zones with detailed historical data.</p>
-                        <ul class="feature-list">
-                            <li>Performance progression</li>
-                            <li>Personal records tracking</li>
-                            <li>Seasonal comparisons</li>
-                        </ul>
-                    </div>
+                <div id="analytics-rollups">
+                    ${this.isLoading ? this.renderLoadingState() : this.renderRollups()}
+                </div>
+            </div>
+        `);
 
-                    <div class="feature-card">
-                        <div class="feature-icon">🎯</div>
-                        <h3>Goal Setting & Planning</h3>
-                        <p>Set training goals and get personalized recommendations based on your current fitness level.</p>
-                        <ul class="feature-list">
-                            <li>Smart goal recommendations</li>
-                            <li>Training plan suggestions</li>
-                            <li>Progress towards goals</li>
-                        </ul>
-                    </div>
+        this.setupPageEventListeners();
+    }
 
-                    <div class="feature-card">
-                        <div class="feature-icon">📈</div>
-                        <h3>Performance Trends</h3>
-                        <p>Advanced statistical analysis of your performance metrics and training adaptations.</p>
-                        <ul class="feature-list">
-                            <li>Fitness trends analysis</li>
-                            <li>Heart rate zones evolution</li>
-                            <li>Power/pace improvements</li>
-                        </ul>
-                    </div>
+    setupPageEventListeners() {
+        this.element.querySelectorAll('[data-action="period"]').forEach(btn => {
+            btn.addEventListener('click', () => {
+                this.period = btn.dataset.period;
+                this.loadRollups();
+            });
+        });
+    }
 
-                    <div class="feature-card">
-                        <div class="feature-icon">🏆</div>
-                        <h3>Activity Comparisons</h3>
-                        <p>Compare activities and identify patterns in your best performances.</p>
-                        <ul class="feature-list">
-                            <li>Side-by-side comparisons</li>
-                            <li>Segment analysis</li>
-                            <li>Weather impact analysis</li>
-                        </ul>
-                    </div>
+    // Periods newest first, activity types of a period summed into one row
+    groupByPeriod() {
+        const periods = new Map();
+        for (const rollup of this.rollups) {
+            const total = periods.get(rollup.period_start) || {
+                period_start: rollup.period_start,
+                activity_count: 0,
+                distance_km: 0,
+                duration_seconds: 0,
+                elevation_gain_m: 0,
+                hr_load: 0,
+                types: []
+            };
+            total.activity_count += rollup.activity_count;
+            total.distance_km += rollup.distance_km;
+            total.duration_seconds += rollup.duration_seconds;
+            total.elevation_gain_m += rollup.elevation_gain_m;
+            total.hr_load += rollup.hr_load;
+            total.types.push(rollup.activity_type);
+            periods.set(rollup.period_start, total);
+        }
+        return [...periods.values()].reverse();
+    }
 
-                    <div class="feature-card">
-                        <div class="feature-icon">⚡</div>
-                        <h3>Real-time Insights</h3>
-                        <p>Get intelligent insights and recommendations based on your training data.</p>
-                        <ul class="feature-list">
-                            <li>Recovery recommendations</li>
-                            <li>Training intensity suggestions</li>
-                            <li>Performance predictions</li>
-                        </ul>
-                    </div>
+    renderRollups() {
+        if (!this.currentUserId) {
+            return `
+                <div class="empty-state">
+                    <p>Select a user to see training totals</p>
                 </div>
+            `;
+        }
 
-                <!-- Development Roadmap -->
-                <div class="roadmap-section">
-                    <h2>🚀 Development Roadmap</h2>
-                    <div class="roadmap-timeline">
-                        <div class="timeline-item">
-                            <div class="timeline-marker current"></div>
-                            <div class="timeline-content">
-                                <h4>Phase 1: Foundation</h4>
-                                <p>Basic activity tracking and HR analysis</p>
-                                <span class="timeline-status completed">✅ Completed</span>
-                            </div>
-                        </div>
-                        
-                        <div class="timeline-item">
-                            <div class="timeline-marker upcoming"></div>
-                            <div class="timeline-content">
-                                <h4>Phase 2: Analytics Engine</h4>
-                                <p>Training load calculation and performance metrics</p>
-                                <span class="timeline-status">🔄 In Planning</span>
-                            </div>
-                        </div>
-                        
-                        <div class="timeline-item">
-                            <div class="timeline-marker future"></div>
-                            <div class="timeline-content">
-                                <h4>Phase 3: Advanced Features</h4>
-                                <p>Goal setting, comparisons, and AI insights</p>
-                                <span class="timeline-status">📋 Future</span>
-                            </div>
-                        </div>
-                    </div>
+        const periods = this.groupByPeriod();
+        if (periods.length === 0) {
+            return `
+                <div class="empty-state">
+                    <p>🏃‍♂️ No activities yet</p>
+                    <p>Upload GPX files to see weekly and monthly totals</p>
                 </div>
+            `;
+        }
 
-                <!-- Call to Action -->
-                <div class="cta-section">
-                    <h3>Want to be notified when Analytics is ready?</h3>
-                    <p>Analytics features are being developed based on user feedback and usage patterns.</p>
-                    <div class="cta-buttons">
-                        <button class="btn btn-primary" onclick="alert('Analytics features coming soon! Keep using the Activities page to build your training data.')">
-                            Stay Updated
-                        </button>
-                        <button class="btn btn-secondary" onclick="navigation.navigateToPage('activities')">
-                            Back to Activities
-                        </button>
-                    </div>
+        return `
+            <table class="analytics-table">
+                <thead>
+                    <tr>
+                        <th>${this.period === 'week' ? 'Week of' : 'Month'}</th>
+                        <th>Activities</th>
+                        <th>Distance</th>
+                        <th>Time</th>
+                        <th>Elevation</th>
+                        <th>HR load</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    ${periods.map(total => `
+                        <tr>
+                            <td>${formatDate(total.period_start)}</td>
+                            <td>${total.activity_count} ${total.types.map(type => getActivityIcon(type)).join('')}</td>
+                            <td>${total.distance_km.toFixed(1)} km</td>
+                            <td>${this.formatHours(total.duration_seconds)}</td>
+                            <td>${Math.round(total.elevation_gain_m)} m</td>
+                            <td>${total.hr_load ? total.hr_load.toLocaleString() : '-'}</td>
+                        </tr>
+                    `).join('')}
+                </tbody>
+            </table>
+        `;
+    }
+
+    // Today's fitness (CTL), fatigue (ATL) and form (TSB)
+    renderTrainingLoad() {
+        const current = this.trainingLoad?.current;
+        if (!current) return '';
+
+        return `
+            <div class="training-load-summary">
+                <div class="training-load-card">
+                    <span class="training-load-label">Fitness (CTL)</span>
+                    <span class="training-load-value">${current.ctl.toFixed(0)}</span>
+                </div>
+                <div class="training-load-card">
+                    <span class="training-load-label">Fatigue (ATL)</span>
+                    <span class="training-load-value">${current.atl.toFixed(0)}</span>
+                </div>
+                <div class="training-load-card">
+                    <span class="training-load-label">Form (TSB)</span>
+                    <span class="training-load-value">${current.tsb > 0 ? '+' : ''}${current.tsb.toFixed(0)}</span>
                 </div>
             </div>
-        `);
+        `;
+    }
+
+    renderLoadingState() {
+        return `
+            <div class="loading-state">
+                <div class="loading-spinner"></div>
+                <p>Loading training totals...</p>
+            </div>
+        `;
+    }
+
+    // Shown range: last 26 weeks or 24 months
+    rangeStart() {
+        const start = new Date();
+        if (this.period === 'week') {
+            start.setDate(start.getDate() - 26 * 7);
+        } else {
+            start.setMonth(start.getMonth() - 24);
+        }
+        return start;
+    }
+
+    formatHours(seconds) {
+        const hours = Math.floor(seconds / 3600);
+        const minutes = Math.floor((seconds % 3600) / 60);
+        return `${hours}h ${String(minutes).padStart(2, '0')}m`;
+    }
+
+    async loadRollups() {
+        if (!this.currentUserId) {
+            this.currentUserId = userSettings?.getCurrentUser()?.id || null;
+        }
+        if (!this.currentUserId) {
+            this.rollups = [];
+            this.trainingLoad = null;
+            this.render();
+            return;
+        }
+
+        try {
+            this.isLoading = true;
+            this.render();
+            const [result, trainingLoad] = await Promise.all([
+                api.getTrainingRollups(this.currentUserId, {
+                    period: this.period,
+                    fromDate: this.rangeStart().toISOString().slice(0, 10)
+                }),
+                api.getTrainingLoad(this.currentUserId)
+            ]);
+            this.rollups = result.rollups;
+            this.trainingLoad = trainingLoad;
+        } catch (error) {
+            this.handleError(error, ' while loading training totals');
+            this.rollups = [];
+            this.trainingLoad = null;
+        } finally {
+            this.isLoading = false;
+            this.render();
+        }
     }
 
     onShow() {
-        // Could load some preview data or statistics here
+        this.loadRollups();
     }
 
     onHide() {
-        // Cleanup if needed
+        // Nothing to clean up
     }
 }
 
@@ -4,10 +4,20 @@ class ApiClient {
     constructor() {
         this.baseUrl = Config.API_BASE_URL;
         this.timeout = Config.API_TIMEOUT;
+        // Raw GET bodies with their validators (ETag / Last-Modified / Cache-Control), LRU ordered
+        this.responseCache = new Map();
     }
 
-    async _request(endpoint, options = {}) {
+    async _request(endpoint, { columns = false, ...options } = {}) {
         const url = `${this.baseUrl}${endpoint}`;
+        const cacheKey = (options.method || 'GET') === 'GET' ? `${columns ? 'columns' : 'json'} ${url}` : null;
+        const cached = cacheKey ? this._cachedResponse(cacheKey) : null;
+        
+        // Immutable / still fresh responses are reused without a request
+        if (cached && cached.freshUntil > Date.now()) {
+            return this._decodeBody(cached.body, columns);
+        }
+        
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), this.timeout);
         
@@ -16,6 +26,13 @@ class ApiClient {
             const headers = options.headers === undefined 
                 ? {} 
                 : { 'Content-Type': 'application/json', ...options.headers };
+            
+            // Revalidate a stored copy - the server answers 304 without running its queries
+            if (cached && cached.etag) {
+                headers['If-None-Match'] = cached.etag;
+            } else if (cached && cached.lastModified) {
+                headers['If-Modified-Since'] = cached.lastModified;
+            }
                 
             const response = await fetch(url, {
                 ...options,
@@ -25,6 +42,11 @@ class ApiClient {
             
             clearTimeout(timeoutId);
             
+            if (response.status === 304 && cached) {
+                this._storeResponse(cacheKey, response, cached.body);
+                return this._decodeBody(cached.body, columns);
+            }
+            
             if (!response.ok) {
                 const errorData = await response.json().catch(() => ({}));
                 throw new ApiError(
@@ -34,7 +56,11 @@ class ApiClient {
                 );
             }
             
-            return await response.json();
+            const body = columns ? await response.arrayBuffer() : await response.text();
+            if (cacheKey) {
+                this._storeResponse(cacheKey, response, body);
+            }
+            return this._decodeBody(body, columns);
         } catch (error) {
             clearTimeout(timeoutId);
             
@@ -50,10 +76,116 @@ class ApiClient {
         }
     }
 
+    _decodeBody(body, columns) {
+        // Fresh objects on every call so callers may mutate results without touching the cache
+        return columns ? ApiClient.decodeColumns(body.slice(0)) : JSON.parse(body);
+    }
+
+    _cachedResponse(cacheKey) {
+        const cached = this.responseCache.get(cacheKey);
+        if (cached) {
+            this.responseCache.delete(cacheKey);
+            this.responseCache.set(cacheKey, cached);
+        }
+        return cached;
+    }
+
+    _storeResponse(cacheKey, response, body) {
+        const cacheControl = response.headers.get('Cache-Control') || '';
+        const etag = response.headers.get('ETag');
+        const lastModified = response.headers.get('Last-Modified');
+        if (/no-store/.test(cacheControl) || (!etag && !lastModified)) {
+            this.responseCache.delete(cacheKey);
+            return;
+        }
+
+        const maxAge = /no-cache/.test(cacheControl) ? null : /max-age=(\d+)/.exec(cacheControl);
+        this.responseCache.delete(cacheKey);
+        this.responseCache.set(cacheKey, {
+            body,
+            etag,
+            lastModified,
+            freshUntil: maxAge ? Date.now() + Number(maxAge[1]) * 1000 : 0
+        });
+
+        while (this.responseCache.size > Config.HTTP_CACHE_MAX_ENTRIES) {
+            this.responseCache.delete(this.responseCache.keys().next().value);
+        }
+    }
+
     async get(endpoint) {
         return this._request(endpoint);
     }
 
+    async getColumns(endpoint) {
+        return this._request(endpoint, {
+            headers: { 'Accept': ApiClient.COLUMNS_MEDIA_TYPE },
+            columns: true
+        });
+    }
+
+    /**
+     * Decode the columnar binary series format (app/services/series_format.py):
+     * "SPC1" | uint32 header length | JSON header | padding | 8-byte aligned columns.
+     * Returns the header fields plus `columns` holding typed array views (no copies)
+     * and `latitude`/`longitude` Float64Arrays when the header carries a polyline.
+     */
+    static decodeColumns(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+        if (magic !== 'SPC1') {
+            throw new ApiError('Unexpected series format', 0);
+        }
+
+        const headerLength = view.getUint32(4, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+        const dataStart = Math.ceil((8 + headerLength) / 8) * 8;
+
+        // Typed arrays use platform byte order - little endian on every supported browser
+        const columns = {};
+        for (const column of header.columns) {
+            const ArrayType = ApiClient.TYPED_ARRAYS[column.dtype];
+            columns[column.name] = new ArrayType(buffer, dataStart + column.offset, header.length);
+        }
+
+        const series = { ...header, columns };
+        if (header.polyline !== undefined) {
+            Object.assign(series, ApiClient.decodePolyline(header.polyline, header.polyline_precision));
+        }
+        return series;
+    }
+
+    static decodePolyline(encoded, precision = 5) {
+        const factor = Math.pow(10, precision);
+        const values = [];
+        let index = 0;
+
+        while (index < encoded.length) {
+            let result = 0;
+            let shift = 0;
+            let byte;
+            do {
+                byte = encoded.charCodeAt(index++) - 63;
+                result |= (byte & 0x1f) << shift;
+                shift += 5;
+            } while (byte >= 0x20);
+            values.push(result & 1 ? ~(result >> 1) : result >> 1);
+        }
+
+        const count = values.length / 2;
+        const latitude = new Float64Array(count);
+        const longitude = new Float64Array(count);
+        let lat = 0;
+        let lon = 0;
+        for (let i = 0; i < count; i++) {
+            lat += values[2 * i];
+            lon += values[2 * i + 1];
+            latitude[i] = lat / factor;
+            longitude[i] = lon / factor;
+        }
+        return { latitude, longitude };
+    }
+
     async post(endpoint, data) {
         const options = {
             method: 'POST'
@@ -76,6 +208,21 @@ class ApiClient {
         return this.get(`/activities/${params}`);
     }
 
+    // Activities whose route crosses bbox [minLon, minLat, maxLon, maxLat] or passes near { lat, lon, radiusM }
+    async searchActivities({ bbox = null, lat = null, lon = null, radiusM = null, userId = null, activityType = null } = {}) {
+        const params = new URLSearchParams();
+        if (bbox) {
+            params.set('bbox', bbox.join(','));
+        } else {
+            params.set('lat', lat);
+            params.set('lon', lon);
+            params.set('radius_m', radiusM);
+        }
+        if (userId) params.set('user_id', userId);
+        if (activityType) params.set('activity_type', activityType);
+        return this.get(`/activities/search?${params}`);
+    }
+
     async getActivity(id) {
         return this.get(`/activities/${id}`);
     }
@@ -84,17 +231,62 @@ class ApiClient {
         return this.post('/activities/upload', formData);
     }
 
-    async getTrackpoints(activityId, limit = null) {
-        const params = limit ? `?limit=${limit}` : '';
-        return this.get(`/activities/${activityId}/trackpoints${params}`);
+    async getImportJob(jobId) {
+        return this.get(`/activities/import-jobs/${jobId}`);
+    }
+
+    async getTrackpoints(activityId, { toleranceM = null, ...window } = {}) {
+        // maxPoints / toleranceM return a simplified route, limit pages through it
+        const params = ApiClient.seriesQuery(window);
+        if (toleranceM) params.set('tolerance_m', toleranceM);
+        const query = params.toString() ? `?${params}` : '';
+        return this.get(`/activities/${activityId}/trackpoints${query}`);
+    }
+
+    async getTrackpointSeries(activityId, { toleranceM = null, ...window } = {}) {
+        const params = ApiClient.seriesQuery(window);
+        if (toleranceM) params.set('tolerance_m', toleranceM);
+        const query = params.toString() ? `?${params}` : '';
+        return this.getColumns(`/activities/${activityId}/trackpoints${query}`);
     }
 
-    async getHeartRateData(activityId) {
-        return this.get(`/activities/${activityId}/heart-rate`);
+    static seriesQuery({ fromSeconds = null, toSeconds = null, limit = null, after = null, maxPoints = null } = {}) {
+        // Elapsed-time window, keyset paging and point budget shared by the series endpoints
+        const params = new URLSearchParams();
+        if (maxPoints) params.set('max_points', maxPoints);
+        if (fromSeconds !== null) params.set('from_seconds', fromSeconds);
+        if (toSeconds !== null) params.set('to_seconds', toSeconds);
+        if (limit) params.set('limit', limit);
+        if (after) params.set('after', after);
+        return params;
     }
 
-    async getElevationData(activityId) {
-        return this.get(`/activities/${activityId}/elevation`);
+    async getHeartRateData(activityId, window = {}) {
+        const params = ApiClient.seriesQuery(window);
+        const query = params.toString() ? `?${params}` : '';
+        return this.get(`/activities/${activityId}/heart-rate${query}`);
+    }
+
+    async getHeartRateSeries(activityId, window = {}) {
+        const params = ApiClient.seriesQuery(window);
+        const query = params.toString() ? `?${params}` : '';
+        return this.getColumns(`/activities/${activityId}/heart-rate${query}`);
+    }
+
+    async getElevationData(activityId, window = {}) {
+        const params = ApiClient.seriesQuery(window);
+        const query = params.toString() ? `?${params}` : '';
+        return this.get(`/activities/${activityId}/elevation${query}`);
+    }
+
+    async getElevationSeries(activityId, window = {}) {
+        const params = ApiClient.seriesQuery(window);
+        const query = params.toString() ? `?${params}` : '';
+        return this.getColumns(`/activities/${activityId}/elevation${query}`);
+    }
+
+    async getActivityHRZones(activityId) {
+        return this.get(`/activities/${activityId}/hr-zones`);
     }
 
     async clearHRExclusions(activityId) {
@@ -122,6 +314,31 @@ class ApiClient {
         return this.delete(`/activities/${activityId}`);
     }
 
+    // Analytics endpoints
+    // {z}/{x}/{y} URL template of the route vector tiles, for map libraries
+    tileUrlTemplate({ userId = null, activityType = null } = {}) {
+        const params = new URLSearchParams();
+        if (userId) params.set('user_id', userId);
+        if (activityType) params.set('activity_type', activityType);
+        const query = params.toString();
+        return `${this.baseUrl}/tiles/{z}/{x}/{y}.mvt${query ? `?${query}` : ''}`;
+    }
+
+    async getTrainingRollups(userId, { period = 'week', fromDate = null, toDate = null, activityType = null } = {}) {
+        const params = new URLSearchParams({ user_id: userId, period });
+        if (fromDate) params.set('from_date', fromDate);
+        if (toDate) params.set('to_date', toDate);
+        if (activityType) params.set('activity_type', activityType);
+        return this.get(`/analytics/rollups?${params}`);
+    }
+
+    async getTrainingLoad(userId, { fromDate = null, toDate = null } = {}) {
+        const params = new URLSearchParams({ user_id: userId });
+        if (fromDate) params.set('from_date', fromDate);
+        if (toDate) params.set('to_date', toDate);
+        return this.get(`/analytics/training-load?${params}`);
+    }
+
     // User endpoints
     async getUsers() {
         return this.get('/users/');
@@ -165,6 +382,17 @@ class ApiClient {
     }
 }
 
+ApiClient.COLUMNS_MEDIA_TYPE = 'application/vnd.sporter.columns';
+ApiClient.TYPED_ARRAYS = {
+    float64: Float64Array,
+    float32: Float32Array,
+    int32: Int32Array,
+    uint32: Uint32Array,
+    int16: Int16Array,
+    uint16: Uint16Array,
+    uint8: Uint8Array
+};
+
 class ApiError extends Error {
     constructor(message, status, data = null) {
         super(message);
@@ -4,9 +4,12 @@ const Config = {
     // API Configuration
     API_BASE_URL: '/api/v1',
     API_TIMEOUT: 30000, // 30 seconds
+    HTTP_CACHE_MAX_ENTRIES: 100, // revalidated GET responses kept by ApiClient
     
     // UI Configuration
     DEFAULT_PAGE: 'activities',
+    MAP_MAX_POINTS: 500, // simplified route size for the activity map
+    CHART_MAX_POINTS: 1000, // LTTB-downsampled series size for HR/elevation charts
     
     // Activity Types
     ACTIVITY_TYPES: [
@@ -8,6 +8,8 @@ class FileUpload extends Component {
         this.loadingElement = null;
         this.allowedFileTypes = ['.gpx'];
         this.maxFileSize = 50 * 1024 * 1024; // 50MB
+        this.jobPollInterval = 1000; // 1 second
+        this.jobPollTimeout = 10 * 60 * 1000; // 10 minutes
     }
 
     init() {
@@ -87,14 +89,17 @@ class FileUpload extends Component {
                 formData.append('user_id', userId);
             }
             
-            const data = await api.uploadActivity(formData);
+            const queued = await api.uploadActivity(formData);
+            
+            this.showLoading(`Importing ${file.name}...`);
+            const data = await this.waitForImport(queued.job_id);
             
             this.showSuccessMessage(data);
             this.clearFileInput();
             
             // Emit event for other components
             this.emit(Events.ACTIVITY_UPLOADED, { 
-                activity: data.activity,
+                activity: { id: data.activity_id },
                 stats: data.stats 
             });
             
@@ -112,6 +117,26 @@ class FileUpload extends Component {
         }
     }
 
+    async waitForImport(jobId) {
+        // Uploads are imported by background workers - poll the job until it finishes
+        const deadline = Date.now() + this.jobPollTimeout;
+        
+        while (Date.now() < deadline) {
+            const job = await api.getImportJob(jobId);
+            
+            if (job.status === 'done') {
+                return job;
+            }
+            if (job.status === 'failed') {
+                throw new ApiError(`Failed to import GPX: ${job.error || 'unknown error'}`, 400, job);
+            }
+            
+            await new Promise(resolve => setTimeout(resolve, this.jobPollInterval));
+        }
+        
+        throw new ApiError('Import is taking longer than expected, check the activity list later', 408);
+    }
+
     showSuccessMessage(data) {
         if (!this.resultContainer) return;
         
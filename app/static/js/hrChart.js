@@ -8,6 +8,12 @@ class HRChart {
         this.userProfile = userProfile;
         this.hrZones = null;
         
+        // Drag-to-zoom state: overview data is kept to restore on double click
+        this.overviewData = null;
+        this.zoomWindow = null;
+        this.dragStartX = null;
+        this.zoomCanvas = null;
+        
         this.calculateHRZones();
     }
 
@@ -65,6 +71,8 @@ class HRChart {
 
         // Store exclusion ranges for annotations
         this.userExclusionRanges = userExclusionRanges;
+        this.overviewData = hrData;
+        this.zoomWindow = null;
 
         // Destroy existing chart
         if (this.chart) {
@@ -77,8 +85,88 @@ class HRChart {
         this.chart = new Chart(this.canvas, {
             type: 'line',
             data: chartData,
-            options: chartOptions
+            options: chartOptions,
+            plugins: [this.excludedSpansPlugin()]
+        });
+
+        this.bindZoomHandlers();
+    }
+
+    excludedSpansPlugin() {
+        // Shades full-resolution excluded spans of a downsampled series behind the line
+        return {
+            id: 'excludedSpans',
+            beforeDatasetsDraw: (chart) => {
+                const spans = this.zoomWindow ? null : this.overviewData?.downsampling?.excluded_spans;
+                if (!spans?.length) return;
+
+                const { ctx, chartArea, scales } = chart;
+                ctx.save();
+                ctx.fillStyle = 'rgba(220, 53, 69, 0.08)';
+                spans.forEach(span => {
+                    const left = scales.x.getPixelForValue(span.start_seconds / 60);
+                    const right = scales.x.getPixelForValue(span.end_seconds / 60);
+                    ctx.fillRect(left, chartArea.top, Math.max(1, right - left), chartArea.bottom - chartArea.top);
+                });
+                ctx.restore();
+            }
+        };
+    }
+
+    bindZoomHandlers() {
+        if (this.zoomCanvas === this.canvas) return;
+        this.zoomCanvas = this.canvas;
+
+        this.canvas.addEventListener('mousedown', (event) => {
+            this.dragStartX = event.offsetX;
+        });
+
+        this.canvas.addEventListener('mouseup', (event) => {
+            if (this.dragStartX === null || !this.chart) return;
+            const startX = this.dragStartX;
+            this.dragStartX = null;
+
+            // Ignore clicks - only a real drag selects a window
+            if (Math.abs(event.offsetX - startX) < 10) return;
+
+            const xScale = this.chart.scales.x;
+            const fromMinutes = xScale.getValueForPixel(Math.min(startX, event.offsetX));
+            const toMinutes = xScale.getValueForPixel(Math.max(startX, event.offsetX));
+            this.zoomTo(Math.max(0, fromMinutes * 60), toMinutes * 60);
         });
+
+        this.canvas.addEventListener('dblclick', () => this.resetZoom());
+    }
+
+    async zoomTo(fromSeconds, toSeconds) {
+        if (!this.overviewData?.activity_id || toSeconds <= fromSeconds) return;
+
+        try {
+            // Full resolution for the visible window only
+            const windowData = await api.getHeartRateData(this.overviewData.activity_id, {
+                fromSeconds: Math.floor(fromSeconds),
+                toSeconds: Math.ceil(toSeconds)
+            });
+            if (!this.chart) return;
+
+            this.zoomWindow = { fromSeconds, toSeconds };
+            this.chart.data = this.prepareChartData(windowData);
+            this.chart.options.scales.x.min = fromSeconds / 60;
+            this.chart.options.scales.x.max = toSeconds / 60;
+            this.chart.update();
+        } catch (error) {
+            console.error('Failed to load HR window:', error);
+        }
+    }
+
+    resetZoom() {
+        if (!this.chart || !this.zoomWindow) return;
+
+        this.zoomWindow = null;
+        this.chart.data = this.prepareChartData(this.overviewData);
+        delete this.chart.options.scales.x.min;
+        delete this.chart.options.scales.x.max;
+        this.chart.update();
     }
 
     prepareChartData(hrData) {
@@ -303,6 +391,10 @@ class HRChart {
         // Re-render if chart exists
         if (this.chart) {
             this.chart.options = this.getChartOptions();
+            if (this.zoomWindow) {
+                this.chart.options.scales.x.min = this.zoomWindow.fromSeconds / 60;
+                this.chart.options.scales.x.max = this.zoomWindow.toSeconds / 60;
+            }
             this.chart.update();
         }
     }
@@ -316,9 +408,21 @@ class HRChart {
         if (includedPoints.length === 0) return null;
 
         const heartRates = includedPoints.map(p => p.heart_rate);
-        const avgHR = Math.round(heartRates.reduce((a, b) => a + b, 0) / heartRates.length);
-        const maxHR = Math.max(...heartRates);
-        const minHR = Math.min(...heartRates);
+        let avgHR = Math.round(heartRates.reduce((a, b) => a + b, 0) / heartRates.length);
+        let maxHR = Math.max(...heartRates);
+        let minHR = Math.min(...heartRates);
+
+        // Downsampled series: counts and HR stats come from the full-resolution server stats
+        // (zone distribution below stays an approximation from the plotted points)
+        let totalPoints = hrData.data.length;
+        let excludedCount = excludedPoints.length;
+        if (hrData.downsampling && hrData.stats) {
+            totalPoints = hrData.stats.total_hr_points;
+            excludedCount = hrData.stats.excluded_points;
+            avgHR = hrData.stats.avg_hr ?? avgHR;
+            maxHR = hrData.stats.max_hr ?? maxHR;
+            minHR = hrData.stats.min_hr ?? minHR;
+        }
 
         let zoneDistribution = null;
         if (this.hrZones) {
@@ -347,10 +451,10 @@ class HRChart {
             avgHR,
             maxHR,
             minHR,
-            totalPoints: hrData.data.length,
-            includedPoints: includedPoints.length,
-            excludedPoints: excludedPoints.length,
-            exclusionRate: Math.round((excludedPoints.length / hrData.data.length) * 100),
+            totalPoints,
+            includedPoints: totalPoints - excludedCount,
+            excludedPoints: excludedCount,
+            exclusionRate: Math.round((excludedCount / totalPoints) * 100),
             zoneDistribution
         };
     }
@@ -361,5 +465,7 @@ class HRChart {
             this.chart = null;
         }
         this.canvas = null;
+        this.overviewData = null;
+        this.zoomWindow = null;
     }
 }
\ No newline at end of file
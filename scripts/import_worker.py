@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import argparse
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+# Add app to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.config import settings
+from app.core.database import get_sync_engine, get_sync_session
+from app.services.import_queue import claim_next_job, requeue_stale_jobs, run_import_job
+
+def worker_loop(worker_id: int, poll_interval: float):
+    """Claim and run queued import jobs until interrupted"""
+    print(f"Import worker {worker_id} started")
+    try:
+        while True:
+            with get_sync_session() as db:
+                job_id = claim_next_job(db)
+            
+            if job_id is None:
+                time.sleep(poll_interval)
+                continue
+            
+            started = time.perf_counter()
+            print(f"[worker {worker_id}] Running import job {job_id}")
+            run_import_job(job_id)
+            print(f"[worker {worker_id}] Job {job_id} finished in {time.perf_counter() - started:.1f}s")
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background GPX import workers')
+    parser.add_argument('--workers', type=int, default=settings.import_workers, help='Number of worker processes')
+    parser.add_argument('--poll-interval', type=float, default=settings.import_poll_interval_seconds,
+                        help='Seconds to sleep when the queue is empty')
+    
+    args = parser.parse_args()
+    
+    # Recover jobs left running by a previous worker crash
+    with get_sync_session() as db:
+        requeued = requeue_stale_jobs(db, settings.import_job_timeout_seconds)
+    if requeued:
+        print(f"Requeued {requeued} stale import jobs")
+    
+    # Children must open their own connections
+    get_sync_engine().dispose()
+    
+    processes = [
+        multiprocessing.Process(target=worker_loop, args=(i, args.poll_interval), daemon=True)
+        for i in range(max(1, args.workers))
+    ]
+    for process in processes:
+        process.start()
+    
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("Stopping import workers...")
+        for process in processes:
+            process.terminate()
+
+if __name__ == "__main__":
+    main()
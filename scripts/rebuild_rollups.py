@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add app to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import select
+from app.core.database import dispose_engines, get_sync_session
+from app.models.activity import Activity
+from app.services import hr_zones, training_load, training_rollups
+
+async def recompute_trimp(user_ids):
+    """TRIMP and HR zone distributions from trackpoints (also rebuilds each user's training load)"""
+    try:
+        for user_id in user_ids:
+            await hr_zones.recompute_user_hr_zones(user_id)
+    finally:
+        await dispose_engines()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rebuild training rollups and the training load series from activities (both are '
+                    'otherwise maintained incrementally by imports, deletes and exclusion changes). '
+                    'Uses DATABASE_URL.'
+    )
+    parser.add_argument('--user-id', type=int, help='Rebuild only this user (default: all users)')
+    parser.add_argument('--recompute-trimp', action='store_true',
+                        help='First recompute activity TRIMP from trackpoints (e.g. after upgrading)')
+    
+    args = parser.parse_args()
+    
+    try:
+        started = time.perf_counter()
+        scope = f"user {args.user_id}" if args.user_id else "all users"
+        
+        if args.recompute_trimp:
+            with get_sync_session() as db:
+                query = select(Activity.user_id).where(Activity.user_id.isnot(None)).distinct()
+                if args.user_id:
+                    query = query.where(Activity.user_id == args.user_id)
+                user_ids = db.execute(query).scalars().all()
+            asyncio.run(recompute_trimp(user_ids))
+        
+        with get_sync_session() as db:
+            rollup_rows = training_rollups.rebuild(db, args.user_id)
+        with get_sync_session() as db:
+            load_days = training_load.rebuild(db, args.user_id)
+        
+        print(f"✅ Rebuilt {rollup_rows} rollup rows and {load_days} training load days for {scope} "
+              f"in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"❌ Error rebuilding rollups: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
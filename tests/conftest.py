@@ -0,0 +1,60 @@
+"""Database fixtures: tests using them run against TEST_DATABASE_URL and are skipped without it.
+
+TEST_DATABASE_URL must point to a disposable PostGIS database - all tables
+are dropped and recreated from the models at the start of the session.
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+
+    from app.core.database import Base
+    import app.models  # noqa: F401 - registers every table
+
+    engine = create_engine(make_url(TEST_DATABASE_URL).set(drivername="postgresql+psycopg2"))
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def sync_db(db_engine):
+    """Sync session; every table is emptied after the test"""
+    from app.core.database import Base
+
+    with Session(db_engine, expire_on_commit=False) as session:
+        yield session
+    with db_engine.begin() as conn:
+        tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+@pytest.fixture
+def run_async(db_engine):
+    """run_async(fn) runs `await fn(session)` with an AsyncSession on the test database"""
+    def run(fn):
+        async def main():
+            engine = create_async_engine(make_url(TEST_DATABASE_URL).set(drivername="postgresql+asyncpg"))
+            try:
+                async with AsyncSession(engine, expire_on_commit=False) as session:
+                    return await fn(session)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,54 @@
+"""analytics_cache.get_or_compute transaction handling"""
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+from app.models.activity import Activity
+from app.models.analytics_cache import AnalyticsCache
+from app.services import analytics_cache
+
+START = datetime(2025, 10, 2, 18, 0, tzinfo=timezone.utc)
+
+
+def add_activity(sync_db) -> int:
+    activity = Activity(name="Cached", activity_type="running", start_time=START)
+    sync_db.add(activity)
+    sync_db.commit()
+    return activity.id
+
+
+def test_get_or_compute_without_commit_leaves_the_transaction_to_the_caller(sync_db, run_async):
+    activity_id = add_activity(sync_db)
+
+    async def scenario(db):
+        activity = await db.get(Activity, activity_id)
+        activity.name = "Pending rename"
+        result = await analytics_cache.get_or_compute(
+            db, activity_id, "test_metric", {"max_points": 10}, lambda: {"points": [1, 2, 3]}, commit=False
+        )
+        assert result == {"points": [1, 2, 3]}
+        # Visible inside the unit of work: the second call is a hit
+        assert await analytics_cache.get_or_compute(
+            db, activity_id, "test_metric", {"max_points": 10}, lambda: {"points": []}, commit=False
+        ) == {"points": [1, 2, 3]}
+        await db.rollback()
+
+    run_async(scenario)
+    sync_db.expire_all()
+    assert sync_db.get(Activity, activity_id).name == "Cached"
+    assert sync_db.scalar(select(func.count()).select_from(AnalyticsCache)) == 0
+
+
+def test_get_or_compute_commits_by_default(sync_db, run_async):
+    activity_id = add_activity(sync_db)
+
+    async def compute():
+        return {"zones": []}
+
+    async def scenario(db):
+        await analytics_cache.get_or_compute(db, activity_id, "test_metric", None, compute)
+        await db.rollback()
+
+    run_async(scenario)
+    stored = sync_db.scalars(select(AnalyticsCache.computed_data)).all()
+    assert stored == [{"zones": []}]
@@ -0,0 +1,78 @@
+"""Elevation gain/loss backfill migration (c4f8b1e6a293) on activities with and without elevation data"""
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import insert
+
+from app.models.activity import Activity
+from app.models.trackpoint import Trackpoint
+from app.services.track_analysis import elevation_gain_loss, smooth_elevation
+
+START = datetime(2025, 9, 14, 7, 30, tzinfo=timezone.utc)
+MIGRATION = Path(__file__).resolve().parent.parent / "alembic" / "versions" / \
+    "c4f8b1e6a293_backfill_activity_elevation_gain_loss.py"
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("backfill_elevation_gain_loss", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def hill(n=400):
+    return 120.0 + 35.0 * np.sin(np.linspace(0, 3 * np.pi, n))
+
+
+def test_gain_loss_without_elevation_is_none():
+    migration = load_migration()
+    assert migration.elevation_gain_loss_m([]) == (None, None)
+    assert migration.elevation_gain_loss_m([None] * 50) == (None, None)
+    assert migration.elevation_gain_loss_m([None, 120.5, None]) == (None, None)
+
+
+def test_gain_loss_matches_import_computation():
+    migration = load_migration()
+    elevation = hill()
+    gain, loss = elevation_gain_loss(smooth_elevation(elevation))
+    assert migration.elevation_gain_loss_m(elevation.tolist()) == (round(gain, 2), round(loss, 2))
+
+
+def test_upgrade_skips_activities_without_elevation(sync_db):
+    activities = {
+        "GPX without <ele>": [None] * 300,
+        "Single elevation sample": [None] * 150 + [210.0] + [None] * 149,
+        "Hills": hill(300).round(2).tolist()
+    }
+    ids = {}
+    for name, elevation in activities.items():
+        activity = Activity(name=name, activity_type="running", start_time=START)
+        sync_db.add(activity)
+        sync_db.flush()
+        sync_db.execute(insert(Trackpoint), [{
+            "activity_id": activity.id,
+            "point_order": i,
+            "coordinates": f"POINT({17.0 + i * 1e-5} 51.1)",
+            "recorded_at": START + timedelta(seconds=i),
+            "elevation": value
+        } for i, value in enumerate(elevation)])
+        ids[name] = activity.id
+    sync_db.commit()
+
+    migration = load_migration()
+    with Operations.context(MigrationContext.configure(sync_db.connection())):
+        migration.upgrade()
+    sync_db.commit()
+    sync_db.expire_all()
+
+    for name in ("GPX without <ele>", "Single elevation sample"):
+        activity = sync_db.get(Activity, ids[name])
+        assert activity.elevation_gain_m is None and activity.elevation_loss_m is None
+
+    expected = migration.elevation_gain_loss_m(activities["Hills"])
+    activity = sync_db.get(Activity, ids["Hills"])
+    assert (float(activity.elevation_gain_m), float(activity.elevation_loss_m)) == expected
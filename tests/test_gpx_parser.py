@@ -0,0 +1,176 @@
+"""Streaming GPX parser and TrackpointColumns against the original DOM / per-point implementation"""
+import math
+import statistics
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from scripts.import_gpx import GPXParser
+
+GPX_FILES = sorted((Path(__file__).parent.parent / "gpx").rglob("*.gpx"))
+
+SYNTHETIC_GPX = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx xmlns="http://www.topografix.com/GPX/1/1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1"
+     xmlns:gpxdata="http://www.cluetrust.com/XML/GPXDATA/1/0" version="1.1">
+  <metadata><name>metadata name</name></metadata>
+  <wpt lat="1.0" lon="1.0"><time>2025-01-01T00:00:00Z</time></wpt>
+  <trk>
+    <name>Morning ride</name>
+    <type>Cycling</type>
+    <trkseg>
+      <trkpt lat="51.1" lon="17.0"><ele>100.5</ele><time>2025-01-01T10:00:00Z</time>
+        <extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>90</gpxtpx:hr></gpxtpx:TrackPointExtension></extensions>
+      </trkpt>
+      <trkpt lat="51.1001" lon="17.0001"><time>2025-01-01T10:00:01Z</time>
+        <extensions><gpxdata:hr>95</gpxdata:hr></extensions>
+      </trkpt>
+      <trkpt lat="51.1002" lon="17.0002"><ele>101</ele></trkpt>
+    </trkseg>
+    <trkseg>
+      <trkpt lat="51.1003" lon="17.0003"><ele>102</ele><time>2025-01-01T10:00:03Z</time></trkpt>
+    </trkseg>
+  </trk>
+  <trk>
+    <name>Second track</name>
+    <trkseg><trkpt lat="0" lon="0"><time>2025-01-01T11:00:00Z</time></trkpt></trkseg>
+  </trk>
+</gpx>
+"""
+
+
+def reference_trackpoints(parser: GPXParser, path) -> list:
+    """Original implementation: full DOM, first track, every trkpt of its segments"""
+    track = ET.parse(path).getroot().find('.//gpx:trk', parser.ns)
+    trackpoints = []
+    for segment in track.findall('.//gpx:trkseg', parser.ns):
+        for point in segment.findall('gpx:trkpt', parser.ns):
+            trackpoint = parser._parse_trackpoint(point, len(trackpoints))
+            if trackpoint:
+                trackpoints.append(trackpoint)
+    return trackpoints
+
+
+def reference_metrics(trackpoints: list) -> dict:
+    """Original per-point metric loop (distance, gaps, speed, startup + MAD HR outliers)"""
+    def distance(a, b):
+        lat1, lon1, lat2, lon2 = map(math.radians, map(float, (a['latitude'], a['longitude'],
+                                                              b['latitude'], b['longitude'])))
+        h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        return 6371000 * 2 * math.atan2(math.sqrt(h), math.sqrt(1 - h))
+
+    start = trackpoints[0]['recorded_at']
+    points = [{'distance': None, 'gap': None, 'speed': None, 'excluded': False, 'reason': None}
+              for _ in trackpoints]
+    total_distance, speeds = 0.0, []
+    for i in range(1, len(trackpoints)):
+        d = distance(trackpoints[i - 1], trackpoints[i])
+        dt = (trackpoints[i]['recorded_at'] - trackpoints[i - 1]['recorded_at']).total_seconds()
+        points[i].update(distance=d, gap=int(dt))
+        total_distance += d
+        if dt > 0 and d > 0:
+            points[i]['speed'] = d / dt
+            speeds.append(d / dt)
+
+    hr = [i for i, tp in enumerate(trackpoints) if tp['heart_rate'] is not None]
+    if len(hr) >= 10:
+        average = sum(trackpoints[i]['heart_rate'] for i in hr) / len(hr)
+        for i in hr:
+            if ((trackpoints[i]['recorded_at'] - start).total_seconds() < 300
+                    and trackpoints[i]['heart_rate'] > average):
+                points[i].update(excluded=True, reason='hr_startup')
+        values = [trackpoints[i]['heart_rate'] for i in hr if not points[i]['excluded']]
+        if len(values) > 20:
+            median = statistics.median(values)
+            mad = statistics.median([abs(v - median) for v in values])
+            threshold = 3 * mad if mad > 0 else 50
+            for i in hr:
+                if not points[i]['excluded'] and abs(trackpoints[i]['heart_rate'] - median) > threshold:
+                    points[i].update(excluded=True, reason='hr_statistical_outlier')
+
+    valid_hr = [trackpoints[i]['heart_rate'] for i in hr if not points[i]['excluded']]
+    return {
+        'points': points,
+        'duration_seconds': int((trackpoints[-1]['recorded_at'] - start).total_seconds()),
+        'distance_km': Decimal(str(round(total_distance / 1000, 3))),
+        'avg_speed_ms': sum(speeds) / len(speeds) if speeds else None,
+        'max_speed_ms': max(speeds) if speeds else None,
+        'avg_heart_rate': int(sum(valid_hr) / len(valid_hr)) if valid_hr else None,
+        'max_heart_rate': max(valid_hr) if valid_hr else None,
+        'min_heart_rate': min(valid_hr) if valid_hr else None,
+        'valid_hr_trackpoints': len(valid_hr)
+    }
+
+
+@pytest.fixture
+def synthetic_gpx(tmp_path):
+    path = tmp_path / "synthetic.gpx"
+    path.write_text(SYNTHETIC_GPX)
+    return path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5000])
+def test_streaming_parser_matches_dom_on_synthetic_file(synthetic_gpx, chunk_size):
+    parser = GPXParser()
+    track_info = {}
+    chunks = list(parser.iter_trackpoint_chunks(str(synthetic_gpx), chunk_size, track_info))
+
+    assert all(0 < len(chunk) <= chunk_size for chunk in chunks)
+    assert [tp for chunk in chunks for tp in chunk] == reference_trackpoints(parser, synthetic_gpx)
+    # Only the first track, its own name/type (not the metadata's), the point without time skipped
+    assert track_info == {'found': True, 'name': 'Morning ride', 'type': 'Cycling'}
+    assert sum(len(chunk) for chunk in chunks) == 3
+
+
+@pytest.mark.parametrize("path", GPX_FILES, ids=lambda p: p.name)
+def test_streaming_parser_matches_dom_on_sample_files(path):
+    parser = GPXParser()
+    streamed = [tp for chunk in parser.iter_trackpoint_chunks(str(path), 997) for tp in chunk]
+    assert streamed == reference_trackpoints(parser, path)
+
+
+@pytest.mark.parametrize("path", GPX_FILES, ids=lambda p: p.name)
+def test_trackpoint_columns_match_per_point_metrics(path):
+    parser = GPXParser()
+    data = parser.parse_file(str(path), chunk_size=997)
+    activity, columns = data['activity'], data['trackpoints']
+    expected = reference_metrics(reference_trackpoints(parser, path))
+
+    assert activity['duration_seconds'] == expected['duration_seconds']
+    assert activity['distance_km'] == expected['distance_km']
+    assert float(activity['avg_speed_ms']) == pytest.approx(expected['avg_speed_ms'], abs=1e-3)
+    assert float(activity['max_speed_ms']) == pytest.approx(expected['max_speed_ms'], abs=1e-3)
+    for key in ('valid_hr_trackpoints', 'avg_heart_rate', 'max_heart_rate', 'min_heart_rate'):
+        assert activity.get(key) == expected[key], key
+
+    rows = list(columns.iter_rows())
+    assert len(rows) == len(expected['points'])
+    for row, point in zip(rows, expected['points']):
+        assert row['exclude_from_hr_analysis'] == point['excluded']
+        assert row['exclusion_reason'] == point['reason']
+        assert row['time_gap_seconds'] == point['gap']
+        if point['distance'] is None:
+            assert row['distance_from_previous_m'] is None
+        else:
+            assert row['distance_from_previous_m'] == pytest.approx(point['distance'], abs=1e-6)
+        if point['speed'] is None:
+            assert row['speed_ms'] is None
+        else:
+            assert row['speed_ms'] == Decimal(str(round(point['speed'], 3)))
+
+    # Cumulative distance is the running sum of the per-point distances
+    cumulative = np.cumsum([p['distance'] or 0.0 for p in expected['points']])
+    assert [row['cumulative_distance_m'] for row in rows] == pytest.approx(cumulative.tolist(), abs=1e-6)
+
+
+def test_importer_does_not_need_fastapi():
+    """scripts/docker_import.sh installs only the importer's dependencies (no fastapi)"""
+    code = "import sys; sys.modules['fastapi'] = None; import scripts.import_gpx"
+    root = Path(__file__).parent.parent
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
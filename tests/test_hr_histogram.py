@@ -0,0 +1,124 @@
+"""Incremental HR histogram maintenance vs recomputing it from scratch"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import insert
+
+from app.api.activities import _update_hr_stats_for_range, _valid_hr_histogram
+from app.models.activity import Activity
+from app.models.exclusion_range import ExclusionRange
+from app.models.trackpoint import Trackpoint
+from app.services.track_analysis import (
+    HR_HISTOGRAM_BINS, hr_histogram, hr_stats, histogram_stats, pack_hr_histogram, unpack_hr_histogram
+)
+
+START = datetime(2025, 8, 28, 9, 0, tzinfo=timezone.utc)
+
+
+def reference_stats(values) -> dict:
+    """Original list-based HR stats"""
+    if not values:
+        return {'avg_heart_rate': None, 'max_heart_rate': None, 'min_heart_rate': None, 'valid_hr_trackpoints': 0}
+    return {
+        'avg_heart_rate': int(sum(values) / len(values)),
+        'max_heart_rate': max(values),
+        'min_heart_rate': min(values),
+        'valid_hr_trackpoints': len(values)
+    }
+
+
+def sample_track(n=600, hr_start=37, seed=5):
+    """HR from point hr_start on (late sensor), a few flagged points, one point per second"""
+    rng = np.random.default_rng(seed)
+    heart_rate = rng.integers(80, 190, n).astype(np.float64)
+    heart_rate[:hr_start] = np.nan
+    heart_rate[rng.random(n) < 0.03] = np.nan
+    excluded = rng.random(n) < 0.05
+    return np.arange(n, dtype=np.float64), heart_rate, excluded
+
+
+def reference_histogram(elapsed, heart_rate, excluded, ranges) -> np.ndarray:
+    """From scratch: HR points not flagged and outside every range (times from the first HR point)"""
+    has_hr = ~np.isnan(heart_rate)
+    origin = elapsed[np.argmax(has_hr)]
+    valid = has_hr & ~excluded
+    for start, end in ranges:
+        valid &= ~((elapsed >= start + origin) & (elapsed <= end + origin))
+    return hr_histogram(heart_rate, valid)
+
+
+def test_histogram_stats_match_list_stats():
+    rng = np.random.default_rng(2)
+    heart_rate = rng.integers(40, 220, 5000).astype(np.float64)
+    heart_rate[rng.random(5000) < 0.1] = np.nan
+    valid = rng.random(5000) < 0.9
+
+    expected = reference_stats([int(v) for v in heart_rate[valid & ~np.isnan(heart_rate)]])
+    assert hr_stats(heart_rate, valid) == expected
+    assert histogram_stats(np.zeros(HR_HISTOGRAM_BINS, dtype=np.int64)) == reference_stats([])
+
+
+def test_histogram_add_and_remove_is_exact():
+    """Stats after subtracting / re-adding a subset equal stats computed on the remaining values"""
+    rng = np.random.default_rng(4)
+    heart_rate = rng.integers(60, 200, 3000).astype(np.float64)
+    full = hr_histogram(heart_rate, np.ones(3000, dtype=bool))
+    subset = np.zeros(3000, dtype=bool)
+    subset[1000:1400] = True
+
+    removed = full - hr_histogram(heart_rate, subset)
+    assert histogram_stats(removed) == reference_stats([int(v) for v in heart_rate[~subset]])
+    np.testing.assert_array_equal(removed + hr_histogram(heart_rate, subset), full)
+    np.testing.assert_array_equal(unpack_hr_histogram(pack_hr_histogram(removed)), removed)
+
+
+def test_incremental_range_updates_match_full_recompute(sync_db, run_async):
+    elapsed, heart_rate, excluded = sample_track()
+    activity = Activity(name="HR ranges", activity_type="running", start_time=START,
+                        hr_histogram=pack_hr_histogram(reference_histogram(elapsed, heart_rate, excluded, [])))
+    sync_db.add(activity)
+    sync_db.flush()
+    sync_db.execute(insert(Trackpoint), [{
+        "activity_id": activity.id,
+        "point_order": i,
+        "coordinates": f"POINT({17.0 + i * 1e-5} 51.1)",
+        "recorded_at": START + timedelta(seconds=float(elapsed[i])),
+        "elapsed_seconds": float(elapsed[i]),
+        "heart_rate": None if np.isnan(heart_rate[i]) else int(heart_rate[i]),
+        "exclude_from_hr_analysis": bool(excluded[i])
+    } for i in range(len(elapsed))])
+    sync_db.commit()
+    activity_id = activity.id
+
+    async def scenario(db):
+        activity = await db.get(Activity, activity_id)
+        active = {}
+
+        async def check():
+            expected = reference_histogram(elapsed, heart_rate, excluded, list(active.values()))
+            np.testing.assert_array_equal(unpack_hr_histogram(activity.hr_histogram), expected)
+            np.testing.assert_array_equal(await _valid_hr_histogram(db, activity_id), expected)
+            for field, value in histogram_stats(expected).items():
+                assert getattr(activity, field) == value
+
+        # Overlapping, nested and disjoint ranges, then removals in a different order
+        ranges = [(10, 60), (40, 100), (300, 320), (90, 95), (0, 5)]
+        created = []
+        for start, end in ranges:
+            exclusion_range = ExclusionRange(activity_id=activity_id, start_time_seconds=start,
+                                             end_time_seconds=end, exclusion_type='user_range')
+            db.add(exclusion_range)
+            await db.flush()
+            active[exclusion_range.id] = (start, end)
+            await _update_hr_stats_for_range(db, activity, exclusion_range, added=True)
+            await check()
+            created.append(exclusion_range)
+
+        for exclusion_range in (created[1], created[0], created[4]):
+            await db.delete(exclusion_range)
+            await db.flush()
+            del active[exclusion_range.id]
+            await _update_hr_stats_for_range(db, activity, exclusion_range, added=False)
+            await check()
+
+    run_async(scenario)
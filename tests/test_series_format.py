@@ -0,0 +1,97 @@
+"""Polyline and SPC1 column encoders against straightforward reference codecs"""
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from app.services.series_format import (
+    COLUMNS_MAGIC, accepts_columns, encode_polyline, pack_columns
+)
+
+
+def reference_polyline(latitude, longitude, precision=5) -> str:
+    """Scalar Google polyline encoder (one value at a time)"""
+    factor = 10 ** precision
+    out, previous = [], (0, 0)
+    for lat, lon in zip(latitude, longitude):
+        point = (int(round(lat * factor)), int(round(lon * factor)))
+        for delta in (point[0] - previous[0], point[1] - previous[1]):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        previous = point
+    return "".join(out)
+
+
+def reference_unpack(data: bytes):
+    """Decode SPC1 the way ApiClient.decodeColumns does (typed-array views at aligned offsets)"""
+    assert data[:4] == COLUMNS_MAGIC
+    header_length = struct.unpack('<I', data[4:8])[0]
+    header = json.loads(data[8:8 + header_length])
+    start = 8 + header_length
+    start += -start % 8
+    assert data[8 + header_length:start].strip() == b""
+    columns = {}
+    for column in header["columns"]:
+        assert column["offset"] % 8 == 0
+        dtype = np.dtype(column["dtype"]).newbyteorder('<')
+        columns[column["name"]] = np.frombuffer(
+            data, dtype=dtype, count=header["length"], offset=start + column["offset"]
+        )
+    return header, columns
+
+
+def test_polyline_matches_documented_example():
+    assert encode_polyline(np.array([38.5, 40.7, 43.252]), np.array([-120.2, -120.95, -126.453])) \
+        == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_polyline_matches_reference_encoder():
+    rng = np.random.default_rng(7)
+    latitude = 51.1 + np.cumsum(rng.normal(0, 0.001, 2000))
+    longitude = 17.0 + np.cumsum(rng.normal(0, 0.001, 2000))
+    # Large jumps need the longest 5-bit group chains
+    latitude[500], longitude[500] = -89.99999, 179.99999
+
+    assert encode_polyline(latitude, longitude) == reference_polyline(latitude, longitude)
+    assert encode_polyline(latitude, longitude, precision=6) == reference_polyline(latitude, longitude, 6)
+    assert encode_polyline(np.empty(0), np.empty(0)) == ""
+
+
+def test_pack_columns_round_trip():
+    rng = np.random.default_rng(3)
+    columns = {
+        "time": np.cumsum(rng.uniform(0, 2, 101)).astype(np.float32),
+        "heart_rate": rng.integers(60, 200, 101).astype(np.uint8),
+        "point_order": np.arange(101, dtype=np.int32),
+        "distance": rng.uniform(0, 10, 101)
+    }
+    data = pack_columns(columns, {"activity_id": 5, "next_cursor": None})
+
+    header, decoded = reference_unpack(data)
+    assert header["length"] == 101
+    assert header["activity_id"] == 5 and header["next_cursor"] is None
+    assert list(decoded) == list(columns)
+    for name, values in columns.items():
+        assert decoded[name].dtype.name == values.dtype.name
+        np.testing.assert_array_equal(decoded[name], values)
+
+
+def test_pack_columns_empty_and_invalid():
+    header, decoded = reference_unpack(pack_columns({"time": np.empty(0, dtype=np.float32)}))
+    assert header["length"] == 0 and len(decoded["time"]) == 0
+
+    with pytest.raises(ValueError):
+        pack_columns({"a": np.zeros(2, dtype=np.float32), "b": np.zeros(3, dtype=np.float32)})
+    with pytest.raises(ValueError):
+        pack_columns({"a": np.zeros(2, dtype=np.int64)})
+
+
+def test_accepts_columns():
+    assert accepts_columns("application/vnd.sporter.columns")
+    assert accepts_columns("application/json;q=0.5, application/vnd.sporter.columns;q=1")
+    assert not accepts_columns("application/json")
+    assert not accepts_columns(None)
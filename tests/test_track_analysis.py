@@ -0,0 +1,154 @@
+"""Vectorized track analysis helpers against brute-force references"""
+import numpy as np
+import pytest
+
+from app.services.track_analysis import (
+    EARTH_RADIUS_M, douglas_peucker_tolerances, downsample_indices, lttb_indices, range_exclusion_index,
+    smooth_elevation
+)
+
+
+def random_track(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return (51.1 + np.cumsum(rng.normal(0, 0.0002, n)),
+            17.0 + np.cumsum(rng.normal(0, 0.0002, n)))
+
+
+def reference_douglas_peucker(latitude, longitude, tolerance: float) -> set:
+    """Classic recursive Douglas-Peucker at one tolerance (same local projection)"""
+    lat0 = np.radians(np.mean(latitude))
+    x = np.radians(longitude) * np.cos(lat0) * EARTH_RADIUS_M
+    y = np.radians(latitude) * EARTH_RADIUS_M
+    kept = {0, len(latitude) - 1}
+
+    def simplify(first, last):
+        if last - first < 2:
+            return
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        length = np.hypot(dx, dy)
+        best, index = -1.0, None
+        for i in range(first + 1, last):
+            px, py = x[i] - x[first], y[i] - y[first]
+            distance = abs(dx * py - dy * px) / length if length > 0 else np.hypot(px, py)
+            if distance > best:
+                best, index = distance, i
+        if best > tolerance:
+            kept.add(index)
+            simplify(first, index)
+            simplify(index, last)
+
+    simplify(0, len(latitude) - 1)
+    return kept
+
+
+def reference_lttb(x, y, threshold: int) -> list:
+    """Largest-Triangle-Three-Buckets as originally published (scalar loops)"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        avg_start, avg_end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+        best, next_a = -1.0, None
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best:
+                best, next_a = area, j
+        selected.append(next_a)
+        a = next_a
+    selected.append(n - 1)
+    return selected
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_douglas_peucker_levels_match_classic_algorithm(seed):
+    latitude, longitude = random_track(400, seed)
+    tolerances = douglas_peucker_tolerances(latitude, longitude)
+
+    assert np.isinf(tolerances[0]) and np.isinf(tolerances[-1])
+    for tolerance in (0.0, 0.5, 2.0, 10.0, 50.0, 500.0):
+        assert set(np.flatnonzero(tolerances > tolerance)) == reference_douglas_peucker(latitude, longitude, tolerance)
+
+
+def test_douglas_peucker_short_and_degenerate_tracks():
+    assert len(douglas_peucker_tolerances(np.empty(0), np.empty(0))) == 0
+    assert np.isinf(douglas_peucker_tolerances(np.array([51.0, 51.1]), np.array([17.0, 17.1]))).all()
+
+    # Closed loop: first and last point coincide
+    latitude = np.array([51.0, 51.001, 51.001, 51.0, 51.0])
+    longitude = np.array([17.0, 17.0, 17.001, 17.001, 17.0])
+    tolerances = douglas_peucker_tolerances(latitude, longitude)
+    for tolerance in (0.0, 50.0, 100.0, 200.0):
+        assert set(np.flatnonzero(tolerances > tolerance)) == reference_douglas_peucker(latitude, longitude, tolerance)
+
+
+@pytest.mark.parametrize("n,threshold", [(1000, 100), (1000, 3), (257, 256), (50, 50), (10, 2)])
+def test_lttb_matches_reference(n, threshold):
+    rng = np.random.default_rng(n + threshold)
+    x = np.cumsum(rng.uniform(0.1, 1.0, n))
+    y = np.cumsum(rng.normal(0, 1, n))
+    assert lttb_indices(x, y, threshold).tolist() == reference_lttb(x.tolist(), y.tolist(), threshold)
+
+
+def test_downsample_keeps_extremes_and_forced_points_within_budget():
+    rng = np.random.default_rng(11)
+    x = np.arange(5000, dtype=np.float64)
+    y = np.cumsum(rng.normal(0, 1, 5000))
+    keep = np.array([17, 2500, 4998])
+
+    selected = downsample_indices(x, y, 200, keep=keep)
+
+    assert len(selected) <= 200
+    assert np.all(np.diff(selected) > 0)
+    assert {0, 4999, int(np.argmax(y)), int(np.argmin(y)), *keep.tolist()} <= set(selected.tolist())
+    forced = {int(np.argmax(y)), int(np.argmin(y)), *keep.tolist()}
+    assert set(selected.tolist()) == set(reference_lttb(x.tolist(), y.tolist(), 200 - len(forced))) | forced
+
+
+def test_downsample_returns_everything_below_budget():
+    x = np.arange(10, dtype=np.float64)
+    assert downsample_indices(x, x, 10).tolist() == list(range(10))
+
+
+def reference_range_index(times, ranges) -> list:
+    """First range (in start order) whose inclusive bounds contain each time, -1 if none"""
+    return [next((i for i, (start, end) in enumerate(ranges) if start <= t <= end), -1) for t in times]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_range_exclusion_index_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    # Overlapping and nested ranges, integer bounds like ExclusionRange, sorted by start
+    starts = np.sort(rng.integers(0, 3000, 25)).astype(np.float64)
+    ends = starts + rng.integers(1, 400, 25)
+    # Points on the bounds, inside, between and outside all ranges
+    times = np.concatenate([rng.uniform(-10, 3500, 2000), starts, ends, starts - 0.5, ends + 0.5])
+
+    index = range_exclusion_index(times, starts, ends)
+    assert index.tolist() == reference_range_index(times.tolist(), list(zip(starts, ends)))
+
+
+def test_range_exclusion_index_without_ranges_or_points():
+    assert range_exclusion_index(np.array([1.0, 2.0]), np.empty(0), np.empty(0)).tolist() == [-1, -1]
+    assert len(range_exclusion_index(np.empty(0), np.array([0.0]), np.array([1.0]))) == 0
+
+
+def reference_smooth(values: list, window: int) -> list:
+    """Mean over the samples within the centered window (NaN skipped and kept)"""
+    valid = [v for v in values if not np.isnan(v)]
+    half = (window - 1) // 2
+    means = [np.mean(valid[max(0, i - half):i - half + window]) for i in range(len(valid))]
+    it = iter(means)
+    return [v if np.isnan(v) else next(it) for v in values]
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 4, 5, 6, 50])
+def test_smooth_elevation_matches_reference_on_short_tracks(n):
+    rng = np.random.default_rng(n)
+    elevation = rng.uniform(100, 200, n + 3)
+    elevation[rng.choice(n + 3, 3, replace=False)] = np.nan
+    np.testing.assert_allclose(smooth_elevation(elevation, window=5),
+                               reference_smooth(elevation.tolist(), 5), equal_nan=True)
@@ -0,0 +1,121 @@
+"""CTL/ATL series: closed-form decay and incremental shifts vs a day-by-day EWMA"""
+from datetime import date, datetime, time, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.models.activity import Activity
+from app.models.training_load import TrainingLoadDay
+from app.models.user import User
+from app.services import training_load, training_rollups
+from app.services.training_load import ATL_K, CTL_K
+
+
+def reference_ewma(loads: dict, first: date, last: date) -> dict:
+    """Day-by-day EWMA over every calendar day: {day: (ctl, atl)}"""
+    ctl = atl = 0.0
+    values = {}
+    day = first
+    while day <= last:
+        trimp = loads.get(day, 0.0)
+        ctl += (trimp - ctl) * CTL_K
+        atl += (trimp - atl) * ATL_K
+        values[day] = (ctl, atl)
+        day += timedelta(days=1)
+    return values
+
+
+def random_loads(seed: int, days: int = 400, count: int = 120) -> dict:
+    rng = np.random.default_rng(seed)
+    start = date(2024, 1, 1)
+    offsets = sorted(set(rng.integers(0, days, count).tolist()))
+    # A long break (beyond the ATL horizon) in the middle of the history
+    offsets = [offset if offset < days // 2 else offset + 250 for offset in offsets]
+    return {start + timedelta(days=offset): float(rng.uniform(10, 250)) for offset in offsets}
+
+
+def test_series_rows_match_daily_ewma():
+    loads = {1: random_loads(1), 2: random_loads(2, days=60, count=20)}
+    daily_loads = [(user_id, day, trimp) for user_id in sorted(loads) for day, trimp in sorted(loads[user_id].items())]
+
+    rows = training_load.series_rows(daily_loads)
+
+    assert [(row['user_id'], row['day']) for row in rows] == [(user_id, day) for user_id, day, _ in daily_loads]
+    for user_id, user_loads in loads.items():
+        expected = reference_ewma(user_loads, min(user_loads), max(user_loads))
+        for row in (row for row in rows if row['user_id'] == user_id):
+            assert row['ctl'] == pytest.approx(expected[row['day']][0], rel=1e-9, abs=1e-9)
+            assert row['atl'] == pytest.approx(expected[row['day']][1], rel=1e-9, abs=1e-9)
+
+
+def test_daily_series_fills_rest_days_and_lags_tsb():
+    loads = random_loads(3, days=120, count=40)
+    stored = [SimpleNamespace(**row) for row in training_load.series_rows(
+        (1, day, trimp) for day, trimp in sorted(loads.items())
+    )]
+    first = min(loads)
+    start, end = first + timedelta(days=30), first + timedelta(days=90)
+    expected = reference_ewma(loads, first, end)
+
+    anchor = max((row for row in stored if row.day < start), key=lambda row: row.day)
+    series = training_load.daily_series(anchor, [row for row in stored if start <= row.day <= end], start, end)
+
+    assert [entry['date'] for entry in series] == [(start + timedelta(days=i)).isoformat() for i in range(61)]
+    for entry in series:
+        day = date.fromisoformat(entry['date'])
+        ctl, atl = expected[day]
+        previous_ctl, previous_atl = expected[day - timedelta(days=1)]
+        assert entry['ctl'] == round(ctl, 1)
+        assert entry['atl'] == round(atl, 1)
+        assert entry['tsb'] == round(previous_ctl - previous_atl, 1)
+        assert entry['trimp'] == round(loads.get(day, 0.0), 1)
+
+
+def test_incremental_updates_match_full_rebuild(sync_db):
+    """Add, re-score and delete activities with apply_sync, then compare with rebuild()"""
+    user = User(name="Load test")
+    sync_db.add(user)
+    sync_db.flush()
+
+    rng = np.random.default_rng(9)
+    loads = random_loads(4, days=300, count=90)
+    activities = []
+    for day, trimp in loads.items():
+        # Some days get two activities
+        for part in ((trimp,) if rng.random() < 0.7 else (trimp / 3, 2 * trimp / 3)):
+            activity = Activity(user_id=user.id, name="a", activity_type="running", duration_seconds=3600,
+                                start_time=datetime.combine(day, time(7, 30), tzinfo=timezone.utc),
+                                trimp=round(part, 1))
+            sync_db.add(activity)
+            sync_db.flush()
+            training_load.apply_sync(sync_db, None, training_rollups.contribution(activity))
+            activities.append(activity)
+
+    # Out-of-order edits: re-scored, deleted and back-dated activities
+    for activity in activities[::7]:
+        before = training_rollups.contribution(activity)
+        activity.trimp = round(activity.trimp * 1.5 + 3, 1)
+        training_load.apply_sync(sync_db, before, training_rollups.contribution(activity))
+    for activity in activities[3::11]:
+        training_load.apply_sync(sync_db, training_rollups.contribution(activity), None)
+        sync_db.delete(activity)
+    sync_db.flush()
+    sync_db.commit()
+
+    def stored():
+        return [(row.day, row.trimp, row.ctl, row.atl) for row in sync_db.execute(
+            select(TrainingLoadDay).where(TrainingLoadDay.user_id == user.id).order_by(TrainingLoadDay.day)
+        ).scalars()]
+
+    incremental = stored()
+    training_load.rebuild(sync_db, user.id)
+    sync_db.expire_all()
+    rebuilt = stored()
+
+    assert [row[0] for row in incremental] == [row[0] for row in rebuilt]
+    for (_, trimp, ctl, atl), (_, expected_trimp, expected_ctl, expected_atl) in zip(incremental, rebuilt):
+        assert trimp == pytest.approx(expected_trimp, abs=1e-6)
+        assert ctl == pytest.approx(expected_ctl, abs=1e-6)
+        assert atl == pytest.approx(expected_atl, abs=1e-6)